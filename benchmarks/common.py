@@ -0,0 +1,91 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Helpers shared by the benchmarks: timing and generation of valid DFU packages.
+"""
+
+# Python standard library
+import json
+import time
+import hashlib
+import zipfile
+
+# Nordic libraries
+from nordicsemi.dfu.package import Package
+from nordicsemi.dfu.init_packet_pb import InitPacketPB, DFUType, HashTypes
+
+REPEAT = 10
+
+
+def measure(func, repeat=REPEAT):
+    """
+    Returns the best wall time of func() out of repeat runs.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def init_packet(firmware):
+    """
+    Returns an application init packet matching the firmware, as nrfutil pkg generate writes it.
+    """
+    packet = InitPacketPB(hash_bytes=hashlib.sha256(firmware).digest()[::-1],
+                          hash_type=HashTypes.SHA256,
+                          dfu_type=DFUType.APPLICATION,
+                          app_size=len(firmware))
+    return packet.get_init_packet_pb_bytes()
+
+
+def make_package(path, firmware, compression=zipfile.ZIP_STORED):
+    """
+    Writes an application package of the firmware, which passes the checks made before a DFU.
+
+    :param str path: Path of the zip file to write.
+    :param bytes firmware: Application image.
+    :param int compression: Compression of the zip members, e.g. zipfile.ZIP_DEFLATED.
+    """
+    manifest = {'manifest': {'application': {'bin_file': 'app.bin', 'dat_file': 'app.dat'}}}
+    with zipfile.ZipFile(path, 'w', compression=compression) as pkg:
+        pkg.writestr(Package.MANIFEST_FILENAME, json.dumps(manifest))
+        pkg.writestr('app.dat', init_packet(firmware))
+        pkg.writestr('app.bin', firmware)
@@ -0,0 +1,220 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Memory benchmark of the firmware data path.
+
+Streams an image through DfuTransportSerial.send_firmware into an in-process loopback port that
+answers like the bootloader, and through a copy of the previous data path (bytes slices, opcode
+concatenation, per-frame lists and the per-byte encoder). Each variant runs in its own process
+so peak RSS is not shared between them. The transfer is timed once untraced, then repeated
+under tracemalloc for the peak of memory allocated by the data path.
+
+USAGE:
+    python -m benchmarks.datapath [image size in bytes]
+"""
+
+# Python standard library
+import os
+import sys
+import json
+import time
+import struct
+import binascii
+import resource
+import subprocess
+import tracemalloc
+
+# Nordic libraries
+from nordicsemi.dfu import dfu_transport_serial
+from nordicsemi.dfu.dfu_transport_serial import Slip, SlipDecoder, DfuTransportSerial
+from nordicsemi.dfu.dfu_transport import DfuTransport
+
+from benchmarks.slip import legacy_encode, legacy_get_message
+
+IMAGE_SIZE = 1024 * 1024
+MAX_SIZE   = 4096
+MTU        = 131
+
+OP_CODE = DfuTransportSerial.OP_CODE
+
+
+class LoopbackPort:
+    """
+    Stands in for serial.Serial and answers the DFU requests written to it, like a bootloader
+    with unlimited speed would.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.decoder   = SlipDecoder()
+        self.rx        = bytearray()
+        self.prn       = 0
+        self.prn_count = 0
+        self.offset    = 0
+        self.crc       = 0
+        self.timeout   = kwargs.get('timeout')
+
+    @property
+    def in_waiting(self):
+        return len(self.rx)
+
+    @property
+    def out_waiting(self):
+        return 0
+
+    def read(self, size=1):
+        data = bytes(self.rx[:size])
+        del self.rx[:size]
+        return data
+
+    def write(self, data):
+        for frame in self.decoder.feed(bytes(data)):
+            self.__handle(frame)
+        return len(data)
+
+    def close(self):
+        pass
+
+    def __respond(self, op_code, payload=b''):
+        self.rx += Slip.encode_bytes(bytes([OP_CODE['Response'], op_code,
+                                            DfuTransport.RES_CODE['Success']]) + payload)
+
+    def __handle(self, frame):
+        op_code = frame[0]
+        if op_code == OP_CODE['WriteObject']:
+            self.offset += len(frame) - 1
+            self.crc     = binascii.crc32(frame[1:], self.crc) & 0xFFFFFFFF
+            self.prn_count += 1
+            if self.prn and self.prn_count == self.prn:
+                self.prn_count = 0
+                self.__respond(OP_CODE['CalcChecSum'], struct.pack('<II', self.offset, self.crc))
+        elif op_code == OP_CODE['SetPRN']:
+            (self.prn,) = struct.unpack('<H', frame[1:3])
+            self.__respond(op_code)
+        elif op_code == OP_CODE['GetSerialMTU']:
+            self.__respond(op_code, struct.pack('<H', MTU))
+        elif op_code == OP_CODE['ReadObject']:
+            self.__respond(op_code, struct.pack('<III', MAX_SIZE, 0, 0))
+        elif op_code == OP_CODE['CalcChecSum']:
+            self.__respond(op_code, struct.pack('<II', self.offset, self.crc))
+        elif op_code == OP_CODE['Ping']:
+            self.__respond(op_code, frame[1:2])
+        else:
+            if op_code == OP_CODE['CreateObject']:
+                self.prn_count = 0
+            self.__respond(op_code)
+
+
+def legacy_request(port, message):
+    port.write(bytes(legacy_encode(message)))
+    return legacy_get_message(port)
+
+
+def legacy_send_firmware(port, firmware):
+    """ The data path of send_firmware and __stream_data before they used memoryview slicing. """
+    crc = 0
+    for i in range(0, len(firmware), MAX_SIZE):
+        data = firmware[i:i + MAX_SIZE]
+        legacy_request(port, [OP_CODE['CreateObject'], 0x02] + list(struct.pack('<L', len(data))))
+        for j in range(0, len(data), (MTU - 1) // 2 - 1):
+            to_transmit = data[j:j + (MTU - 1) // 2 - 1]
+            to_transmit = struct.pack('B', OP_CODE['WriteObject']) + to_transmit
+            port.write(bytes(legacy_encode(list(to_transmit))))
+            crc = binascii.crc32(to_transmit[1:], crc) & 0xFFFFFFFF
+        response = legacy_request(port, [OP_CODE['CalcChecSum']])
+        assert struct.unpack('<II', bytearray(response[3:]))[1] == crc
+        legacy_request(port, [OP_CODE['Execute']])
+
+
+def send_firmware(firmware, coalesce=None):
+    dfu_transport_serial.Serial = LoopbackPort
+    transport = DfuTransportSerial('loopback', do_ping=False, coalesce=coalesce)
+    transport.open()
+    transport.send_firmware(firmware)
+    transport.close()
+
+
+VARIANTS = {
+    'legacy':    lambda firmware: legacy_send_firmware(LoopbackPort(), firmware),
+    'unbatched': lambda firmware: send_firmware(firmware, coalesce=False),
+    'coalesced': lambda firmware: send_firmware(firmware, coalesce=True),
+}
+
+
+def run_variant(variant, size):
+    firmware = os.urandom(size)
+    send     = VARIANTS[variant]
+
+    start = time.perf_counter()
+    send(firmware)
+    elapsed = time.perf_counter() - start
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    send(firmware)
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {'variant':     variant,
+            'seconds':     elapsed,
+            'traced_peak': peak,
+            'rss_growth':  (rss_after - rss_before) * 1024,
+            'rss_peak':    rss_after * 1024}
+
+
+def main(argv):
+    if len(argv) > 2 and argv[1] == '--variant':
+        print(json.dumps(run_variant(argv[2], int(argv[3]))))
+        return
+
+    size = int(argv[1]) if len(argv) > 1 else IMAGE_SIZE
+    mb   = size / (1024.0 * 1024.0)
+    print("Data path, {0} bytes image, MTU {1}, objects of {2} bytes".format(size, MTU, MAX_SIZE))
+    print("{0:<10} {1:>10} {2:>18} {3:>18} {4:>14}".format(
+        'variant', 'seconds', 'traced peak KB/MB', 'RSS growth KB/MB', 'peak RSS MB'))
+    for variant in VARIANTS:
+        output = subprocess.check_output([sys.executable, '-m', 'benchmarks.datapath',
+                                          '--variant', variant, str(size)])
+        result = json.loads(output.decode().splitlines()[-1])
+        print("{0:<10} {1:>10.3f} {2:>18.1f} {3:>18.1f} {4:>14.1f}".format(
+            variant, result['seconds'], result['traced_peak'] / 1024.0 / mb,
+            result['rss_growth'] / 1024.0 / mb, result['rss_peak'] / 1024.0 / 1024.0))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
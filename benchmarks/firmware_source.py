@@ -0,0 +1,144 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark of the host memory used to send one large firmware image.
+
+The simulated bootloader runs in its own process so that only the host side is measured.
+The image is sent as:
+
+    bytes       the whole image, encoded by one TransferPlan up front
+    buffer      a BufferFirmware over the whole image in memory
+    streamed    a StreamedFirmware reading the image file one object at a time
+
+For each, the wall time, the host CPU time and the peak memory traced while sending are
+printed. Every run sends a new random image, so no TransferPlan is reused from a previous run.
+
+USAGE:
+    python -m benchmarks.firmware_source [--sizes 1048576,8388608]
+"""
+
+# Python standard library
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+# Nordic libraries
+from nordicsemi.dfu.dfu_transport_serial import DfuTransportSerial
+from nordicsemi.dfu.firmware_source      import BufferFirmware, StreamedFirmware
+
+SIZES = [1024 * 1024, 8 * 1024 * 1024]
+
+
+def start_bootloader():
+    process = subprocess.Popen([sys.executable, '-m', 'nordicsemi.dfu.sim_bootloader', '--mtu', '259',
+                                '--page-erase-time', '0', '--page-write-time', '0'],
+                               stdout=subprocess.PIPE, universal_newlines=True)
+    return process, process.stdout.readline().strip()
+
+
+def flash(make_firmware, path, size, trace):
+    """
+    Returns the wall time, host CPU time and peak traced memory of one send_firmware.
+    """
+    with open(path, 'wb') as f:
+        f.write(os.urandom(size))
+    (process, port) = start_bootloader()
+    try:
+        transport = DfuTransportSerial(port)
+        transport.open()
+        try:
+            transport.send_init_packet(os.urandom(64))
+            firmware = make_firmware(path)
+            if trace:
+                tracemalloc.start()
+            cpu_time  = time.thread_time()
+            wall_time = time.perf_counter()
+            transport.send_firmware(firmware)
+            wall_time = time.perf_counter() - wall_time
+            cpu_time  = time.thread_time() - cpu_time
+            peak      = tracemalloc.get_traced_memory()[1] if trace else 0
+            if trace:
+                tracemalloc.stop()
+            if hasattr(firmware, 'close'):
+                firmware.close()
+        finally:
+            transport.close()
+        return wall_time, cpu_time, peak
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+VARIANTS = (('bytes',    read_file),
+            ('buffer',   lambda path: BufferFirmware(read_file(path))),
+            ('streamed', lambda path: StreamedFirmware(path, os.path.getsize(path))))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Host memory used to send a firmware image against its size.')
+    parser.add_argument('--sizes', type=lambda text: [int(size) for size in text.split(',')], default=SIZES)
+    options = parser.parse_args(argv[1:])
+
+    logging.basicConfig(level=logging.CRITICAL)
+    work_dir = tempfile.mkdtemp(prefix="nrf_dfu_bench_")
+    try:
+        print("{0:>10} {1:>10} {2:>10} {3:>10} {4:>12}".format('bytes', 'source', 'wall s', 'cpu s', 'peak KiB'))
+        path = os.path.join(work_dir, 'firmware.bin')
+        for size in options.sizes:
+            for (name, make_firmware) in VARIANTS:
+                (wall_time, cpu_time, _) = flash(make_firmware, path, size, trace=False)
+                (_, _, peak)             = flash(make_firmware, path, size, trace=True)
+                print("{0:>10} {1:>10} {2:10.3f} {3:10.3f} {4:12.1f}".format(size, name, wall_time, cpu_time,
+                                                                             peak / 1024.0))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
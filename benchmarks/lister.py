@@ -0,0 +1,154 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark of the sysfs device lister on a fake USB tree.
+
+Builds a sysfs tree under a temporary directory: a root hub, levels of 4-port hubs and 64
+devices behind them, nRF52 bootloaders with one CDC ACM port and J-Link probes with two,
+along with legacy UARTs and virtual terminals that the lister must skip. Then times:
+
+    scan        a full scan of the tree, SysfsLister.scan
+    enumerate   SysfsLister.enumerate with the scan cached
+    get_device  DeviceLister.get_device of the last port, with the scan cached
+
+USAGE:
+    python -m benchmarks.lister [--devices 64]
+"""
+
+# Python standard library
+import os
+import sys
+import argparse
+import tempfile
+
+# Nordic libraries
+from nordicsemi.lister.sysfs_lister  import SysfsLister
+from nordicsemi.lister.device_lister import DeviceLister
+from benchmarks.common               import measure
+
+DEVICES = 64
+REPEAT  = 20
+
+
+def write_attributes(path, **attributes):
+    os.makedirs(path, exist_ok=True)
+    for (name, value) in attributes.items():
+        with open(os.path.join(path, name), 'w') as f:
+            f.write(value + '\n')
+
+
+def add_tty(root, name, tty_parent, device):
+    """ Adds a tty below tty_parent, with its class link and device link. """
+    tty = os.path.join(tty_parent, 'tty', name)
+    os.makedirs(tty)
+    os.symlink(os.path.relpath(device, tty), os.path.join(tty, 'device'))
+    os.symlink(os.path.relpath(tty, os.path.join(root, 'class', 'tty')), os.path.join(root, 'class', 'tty', name))
+
+
+def make_sysfs(root, devices):
+    """
+    Builds a fake sysfs under root with devices USB serial devices behind a hub tree.
+
+    :return int: Number of serial ports of the USB devices.
+    """
+    os.makedirs(os.path.join(root, 'class', 'tty'))
+    usb = os.path.join(root, 'devices', 'pci0000:00', '0000:00:14.0', 'usb1')
+    write_attributes(usb, idVendor='1d6b', idProduct='0002', serial='0000:00:14.0')
+
+    for i in range(32):
+        uart = os.path.join(root, 'devices', 'platform', 'serial8250', 'serial8250:0.{}'.format(i))
+        os.makedirs(uart)
+        add_tty(root, 'ttyS{}'.format(i), uart, uart)
+    for i in range(64):
+        os.makedirs(os.path.join(root, 'devices', 'virtual', 'tty', 'tty{}'.format(i)))
+        os.symlink(os.path.relpath(os.path.join(root, 'devices', 'virtual', 'tty', 'tty{}'.format(i)),
+                                   os.path.join(root, 'class', 'tty')),
+                   os.path.join(root, 'class', 'tty', 'tty{}'.format(i)))
+
+    levels = 1
+    while 4 ** levels < devices:
+        levels += 1
+
+    ports = 0
+    for n in range(devices):
+        # 1-1.a.b.c behind hubs 1-1, 1-1.a and 1-1.a.b for 64 devices
+        path  = usb
+        name  = '1'
+        for hop in ['1'] + [str(n // 4 ** level % 4 + 1) for level in reversed(range(levels))]:
+            name  = name + ('-' if name == '1' else '.') + hop
+            path  = os.path.join(path, name)
+            write_attributes(path, idVendor='2109', idProduct='2817')
+        jlink = n % 2 == 1
+        write_attributes(path, idVendor='1366' if jlink else '1915', idProduct='1015' if jlink else '521f',
+                         serial='{:012d}'.format(n))
+        for interface in range(2 if jlink else 1):
+            interface_path = os.path.join(path, '{}:1.{}'.format(name, interface * 2))
+            write_attributes(interface_path, bInterfaceNumber='{:02x}'.format(interface * 2))
+            add_tty(root, 'ttyACM{}'.format(ports), interface_path, interface_path)
+            ports += 1
+    return ports
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='sysfs device lister scan time.')
+    parser.add_argument('--devices', type=int, default=DEVICES)
+    options = parser.parse_args(argv[1:])
+
+    with tempfile.TemporaryDirectory() as root:
+        ports  = make_sysfs(os.path.join(root, 'sys'), options.devices)
+        os.makedirs(os.path.join(root, 'dev'))
+        # Directories modified just now are not cached
+        os.utime(os.path.join(root, 'sys', 'class', 'tty'), ns=(0, 0))
+        os.utime(os.path.join(root, 'dev'), ns=(0, 0))
+        lister = SysfsLister(os.path.join(root, 'sys'), os.path.join(root, 'dev'))
+        last   = os.path.join(root, 'dev', 'ttyACM{}'.format(ports - 1))
+
+        found  = lister.scan()
+        assert len(found) == options.devices, found
+        assert sum(len(device.com_ports) for device in found) == ports
+        assert DeviceLister(lister).get_device(com=last) is not None
+
+        print("{0} USB devices, {1} ports".format(options.devices, ports))
+        for (name, func) in (('scan', lister.scan),
+                             ('enumerate', lister.enumerate),
+                             ('get_device', lambda: DeviceLister(lister).get_device(com=last))):
+            print("{0:<12} {1:10.3f} ms".format(name, measure(func, REPEAT) * 1e3))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
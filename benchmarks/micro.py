@@ -0,0 +1,194 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Micro-benchmarks of the per-byte and per-file primitives of the DFU path.
+
+Every primitive runs on random inputs from a 4 KB object up to a multi-MB external application
+image: SLIP encoding and decoding, CRC16, the CRC32 of an image prefix recomputed by
+send_firmware's recovery, the SHA-256 and CRC of a firmware file computed by Package, and the
+parsing of a signed init packet. The best of several runs is reported in ns/byte and ops/s.
+
+USAGE:
+    python -m benchmarks.micro [--sizes 4096,65536,1048576,4194304] [--filter crc] [--output micro.json]
+"""
+
+# Python standard library
+import os
+import sys
+import json
+import time
+import argparse
+import binascii
+import platform
+import tempfile
+
+# Nordic libraries
+from nordicsemi.dfu.dfu_transport_serial import Slip, SlipDecoder
+from nordicsemi.dfu.crc16 import calc_crc16
+from nordicsemi.dfu.package import Package
+from nordicsemi.dfu.init_packet_pb import InitPacketPB, DFUType, HashTypes, SigningTypes, ValidationTypes
+
+SIZES       = [4 * 1024, 64 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+MIN_TIME    = 0.2   # Seconds a primitive is repeated for on each input
+MAX_RUNS    = 50
+
+
+def measure(func, min_time=MIN_TIME, max_runs=MAX_RUNS):
+    """
+    Returns the best wall time of func() over runs lasting at least min_time, and at least one run.
+    """
+    best    = None
+    elapsed = 0.0
+    runs    = 0
+    while runs < max_runs and (runs == 0 or elapsed < min_time):
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        best     = duration if best is None else min(best, duration)
+        elapsed += duration
+        runs    += 1
+    return best
+
+
+def decode_add_byte(stream):
+    """ Decodes stream one byte at a time with Slip.decode_add_byte, as the transport used to. """
+    state  = Slip.SLIP_STATE_DECODING
+    frames = 0
+    frame  = []
+    for byte in stream:
+        (finished, state, frame) = Slip.decode_add_byte(byte, frame, state)
+        if finished:
+            frames += 1
+            frame   = []
+    return frames
+
+
+def init_packet(size):
+    """ Returns a signed application init packet, as found in a package, for a size bytes image. """
+    packet = InitPacketPB(hash_bytes=os.urandom(32),
+                          hash_type=HashTypes.SHA256,
+                          boot_validation_type=[ValidationTypes.VALIDATE_ECDSA_P256_SHA256],
+                          boot_validation_bytes=[os.urandom(64)],
+                          dfu_type=DFUType.APPLICATION,
+                          fw_version=1,
+                          hw_version=52,
+                          app_size=size,
+                          sd_req=[0x0100, 0x0101])
+    packet.set_signature(os.urandom(64), SigningTypes.ECDSA_P256_SHA256)
+    return packet.get_init_packet_pb_bytes()
+
+
+def benchmarks(size, directory):
+    """
+    Returns the (name, input size in bytes, function) of every primitive for a size bytes input.
+    """
+    data    = os.urandom(size)
+    frames  = b''.join(Slip.encode_bytes(data[i:i + 64]) for i in range(0, size, 64))
+    path    = os.path.join(directory, 'firmware_{0}.bin'.format(size))
+    with open(path, 'wb') as f:
+        f.write(data)
+    image   = memoryview(data)
+    command = init_packet(size)
+
+    return [
+        ('Slip.encode',                 size,           lambda: Slip.encode(data)),
+        ('Slip.encode_bytes',           size,           lambda: Slip.encode_bytes(data)),
+        ('Slip.decode_add_byte',        len(frames),    lambda: decode_add_byte(frames)),
+        ('SlipDecoder.feed',            len(frames),    lambda: SlipDecoder().feed(frames)),
+        ('crc16.calc_crc16',            size,           lambda: calc_crc16(data)),
+        ('crc32 recovery prefix',       size,           lambda: binascii.crc32(image[:size]) & 0xFFFFFFFF),
+        ('Package.calculate_sha256_hash', size,         lambda: Package.calculate_sha256_hash(path)),
+        ('Package.calculate_crc(32)',   size,           lambda: Package.calculate_crc(32, path)),
+        ('Package.calculate_crc(16)',   size,           lambda: Package.calculate_crc(16, path)),
+        ('InitPacketPB(from_bytes)',    len(command),   lambda: InitPacketPB(from_bytes=command)),
+    ]
+
+
+def protobuf_implementation():
+    try:
+        from google.protobuf.internal import api_implementation
+        return api_implementation.Type()
+    except ImportError:
+        return 'unknown'
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of the DFU primitives.')
+    parser.add_argument('--sizes', type=lambda text: [int(size) for size in text.split(',')], default=SIZES,
+                        help="Input sizes in bytes (default: 4 KB to 4 MB).")
+    parser.add_argument('--filter', default='', help="Only run primitives whose name contains this text.")
+    parser.add_argument('--min-time', type=float, default=MIN_TIME,
+                        help="Seconds each primitive is repeated for (default: %(default)s).")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    options = parser.parse_args(argv[1:])
+
+    print("Python {0}, protobuf {1} implementation".format(platform.python_version(), protobuf_implementation()))
+    print("{0:<32} {1:>10} {2:>12} {3:>10} {4:>12} {5:>10}".format(
+        'primitive', 'bytes', 'best ms', 'ns/byte', 'ops/s', 'MB/s'))
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='nrf_dfu_micro_') as directory:
+        for size in options.sizes:
+            for (name, length, func) in benchmarks(size, directory):
+                if options.filter not in name:
+                    continue
+                if name.startswith('InitPacketPB') and size != options.sizes[0]:
+                    # The init packet does not grow with the image.
+                    continue
+
+                best = measure(func, options.min_time)
+                result = {
+                    'name':       name,
+                    'bytes':      length,
+                    'best_s':     best,
+                    'ns_per_byte': best * 1e9 / length,
+                    'ops_per_s':  1 / best,
+                }
+                results.append(result)
+                print("{0:<32} {1:>10} {2:12.3f} {3:10.2f} {4:12.1f} {5:10.1f}".format(
+                    name, length, best * 1e3, result['ns_per_byte'], result['ops_per_s'],
+                    length / best / 1e6), flush=True)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'protobuf': protobuf_implementation(),
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
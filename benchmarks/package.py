@@ -0,0 +1,125 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark of the host side latency of loading a DFU package before the first byte is sent.
+
+A package with a single application image is generated and loaded as Dfu does it, up to the
+init packet and firmware in memory:
+
+    unpack      Package.unpack_package to a temporary directory, reading both files back,
+                then removing the directory
+    reader      PackageReader on the zip file, then PackageReader.read of both files
+
+Packages are written with their members stored and deflated. The firmware is half random,
+half zeroes, so deflating it is worth it.
+
+USAGE:
+    python -m benchmarks.package [--sizes 65536,1048576,16777216]
+"""
+
+# Python standard library
+import os
+import sys
+import shutil
+import zipfile
+import argparse
+import tempfile
+
+# Nordic libraries
+from nordicsemi.dfu.package import Package, PackageReader
+from benchmarks.common      import measure, make_package
+
+SIZES       = [64 * 1024, 1024 * 1024, 16 * 1024 * 1024]
+COMPRESSION = (('stored', zipfile.ZIP_STORED), ('deflated', zipfile.ZIP_DEFLATED))
+
+
+def unpack(path):
+    temp_dir = tempfile.mkdtemp(prefix="nrf_dfu_")
+    try:
+        unpacked_zip_path = os.path.join(temp_dir, 'unpacked_zip')
+        manifest          = Package.unpack_package(path, unpacked_zip_path)
+        with open(os.path.join(unpacked_zip_path, manifest.application.dat_file), 'rb') as f:
+            init_packet = f.read()
+        with open(os.path.join(unpacked_zip_path, manifest.application.bin_file), 'rb') as f:
+            firmware    = f.read()
+        return init_packet, firmware
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def image(package):
+    """ Returns the init packet and firmware of the application of an open package. """
+    application = package.manifest.application
+    return package.read(application.dat_file), package.read(application.bin_file)
+
+
+def reader(path):
+    return image(PackageReader(path))
+
+
+VARIANTS = (('unpack', unpack),
+            ('reader', reader))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Package loading latency against image size.')
+    parser.add_argument('--sizes', type=lambda text: [int(size) for size in text.split(',')], default=SIZES)
+    options = parser.parse_args(argv[1:])
+
+    work_dir = tempfile.mkdtemp(prefix="nrf_dfu_bench_")
+    try:
+        print("{0:>10} {1:>10} ".format('bytes', 'members')
+              + " ".join("{0:>12}".format(name) for (name, _) in VARIANTS) + "   (ms per load)")
+        for size in options.sizes:
+            firmware = os.urandom(size // 2) + bytes(size - size // 2)
+            for (members, compression) in COMPRESSION:
+                path = os.path.join(work_dir, 'package.zip')
+                make_package(path, firmware, compression)
+
+                timings = []
+                for (name, variant) in VARIANTS:
+                    assert bytes(variant(path)[1]) == firmware, name
+                    timings.append(measure(lambda: variant(path)))
+                print("{0:>10} {1:>10} ".format(size, members)
+                      + " ".join("{0:12.2f}".format(timing * 1e3) for timing in timings))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
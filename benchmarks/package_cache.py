@@ -0,0 +1,105 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark of the host side latency of loading a DFU package that was already loaded before.
+
+A package with a single application image is generated and loaded as Dfu does it, up to the
+init packet and firmware in memory:
+
+    reader      PackageReader on the zip file, then PackageReader.read of both files
+    cached      PackageCache.open on a cache already holding the package, then read
+
+Packages are written with their members stored and deflated. The firmware is half random,
+half zeroes, so deflating it is worth it. The package is dated a minute back, as a package
+flashed again would be, so its SHA-256 is remembered by the cache after the first load.
+
+USAGE:
+    python -m benchmarks.package_cache [--sizes 65536,1048576,16777216]
+"""
+
+# Python standard library
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+# Nordic libraries
+from nordicsemi.dfu.package_cache import PackageCache
+from benchmarks.common            import measure, make_package
+from benchmarks.package           import SIZES, COMPRESSION, image, reader
+
+
+def cached(cache, path):
+    package = cache.open(path)
+    try:
+        return image(package)
+    finally:
+        package.close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Cached package loading latency against image size.')
+    parser.add_argument('--sizes', type=lambda text: [int(size) for size in text.split(',')], default=SIZES)
+    options = parser.parse_args(argv[1:])
+
+    work_dir = tempfile.mkdtemp(prefix="nrf_dfu_bench_")
+    try:
+        cache = PackageCache(os.path.join(work_dir, 'cache'))
+        print("{0:>10} {1:>10} {2:>12} {3:>12} {4:>12}   (ms per load)".format(
+            'bytes', 'members', 'reader', 'cached', 'first'))
+        for size in options.sizes:
+            firmware = os.urandom(size // 2) + bytes(size - size // 2)
+            for (members, compression) in COMPRESSION:
+                path = os.path.join(work_dir, 'package.zip')
+                make_package(path, firmware, compression)
+                created = time.time() - 60
+                os.utime(path, (created, created))
+
+                first = measure(lambda: cached(cache, path), repeat=1)
+                assert bytes(cached(cache, path)[1]) == firmware
+                print("{0:>10} {1:>10} {2:12.2f} {3:12.2f} {4:12.2f}".format(
+                    size, members, measure(lambda: reader(path)) * 1e3,
+                    measure(lambda: cached(cache, path)) * 1e3, first * 1e3))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
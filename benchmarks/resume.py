@@ -0,0 +1,124 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark of the host side latency of resuming an interrupted firmware transfer.
+
+When send_firmware resumes, it needs the CRC32 of the image up to the offset reported by the
+target, and after a CRC mismatch again up to the start of that object. The resume point is
+placed in the middle of the last object and both CRCs are computed:
+
+    bytes prefix    binascii.crc32 of bytes slices, copying the prefix
+    view prefix     binascii.crc32 of memoryview slices, hashing the whole prefix
+    index, cold     a new Crc32Index of the image, computing its checkpoints on the first lookup
+    index, warm     two lookups in an index whose checkpoints are already computed, as a
+                    TransferPlan or a FirmwareSource keeps it for the whole transfer
+
+USAGE:
+    python -m benchmarks.resume [--sizes 65536,1048576,16777216]
+"""
+
+# Python standard library
+import os
+import sys
+import argparse
+import binascii
+
+# Nordic libraries
+from nordicsemi.dfu.crc32 import Crc32Index
+from benchmarks.common    import measure
+
+SIZES       = [64 * 1024, 512 * 1024, 1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024]
+OBJECT_SIZE = 4096
+REPEAT      = 20
+
+
+def resume_offsets(size):
+    """ Returns the offset reported by the target and the start of its object. """
+    offset = size - OBJECT_SIZE // 2
+    return offset, offset - offset % OBJECT_SIZE
+
+
+def bytes_prefix(firmware, offsets):
+    return [binascii.crc32(firmware[:offset]) & 0xFFFFFFFF for offset in offsets]
+
+
+def view_prefix(firmware, offsets):
+    view = memoryview(firmware)
+    return [binascii.crc32(view[:offset]) & 0xFFFFFFFF for offset in offsets]
+
+
+def index_cold(firmware, offsets):
+    index = Crc32Index(firmware, OBJECT_SIZE)
+    return [index.crc_at(offset) for offset in offsets]
+
+
+def index_warm(index, offsets):
+    return [index.crc_at(offset) for offset in offsets]
+
+
+def variants(firmware):
+    """ Returns the name and function of the offsets of every variant, for firmware. """
+    index = Crc32Index(firmware, OBJECT_SIZE)
+    index.crc_at(len(firmware))
+    return (('bytes prefix', lambda offsets: bytes_prefix(firmware, offsets)),
+            ('view prefix', lambda offsets: view_prefix(firmware, offsets)),
+            ('index, cold', lambda offsets: index_cold(firmware, offsets)),
+            ('index, warm', lambda offsets: index_warm(index, offsets)))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Resume CRC latency against image size.')
+    parser.add_argument('--sizes', type=lambda text: [int(size) for size in text.split(',')], default=SIZES)
+    options = parser.parse_args(argv[1:])
+
+    names = [name for (name, _) in variants(b'')]
+    print("{0:>10} ".format('bytes') + " ".join("{0:>16}".format(name) for name in names) + "   (us per resume)")
+    for size in options.sizes:
+        firmware = os.urandom(size)
+        offsets  = resume_offsets(size)
+        expected = bytes_prefix(firmware, offsets)
+
+        timings = []
+        for (name, variant) in variants(firmware):
+            assert variant(offsets) == expected, name
+            timings.append(measure(lambda: variant(offsets), REPEAT))
+        print("{0:>10} ".format(size) + " ".join("{0:16.1f}".format(timing * 1e6) for timing in timings))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
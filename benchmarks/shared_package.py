@@ -0,0 +1,144 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Benchmark of the memory used by worker processes loading the same DFU package.
+
+A package with a single application image is generated. Each of N worker processes loads
+it, reads the init packet and the firmware and computes their CRC32, as the DFUs of a
+worker would read every byte of them:
+
+    reader      each worker opens the package with its own PackageReader
+    shared      the parent loads it once with SharedPackage.create, workers attach to it
+
+Packages are written with their members stored and deflated. The firmware is half random,
+half zeroes. For each worker count, the private memory and the proportional set size (PSS,
+shared pages divided between the processes mapping them) that loading the package added to
+a worker are printed, averaged over the workers. Linux only: both are read from
+/proc/self/smaps_rollup.
+
+USAGE:
+    python -m benchmarks.shared_package [--size 16777216] [--workers 1,2,4,8]
+"""
+
+# Python standard library
+import os
+import sys
+import shutil
+import zipfile
+import argparse
+import binascii
+import tempfile
+import multiprocessing
+
+# Nordic libraries
+from nordicsemi.dfu.package        import PackageReader
+from nordicsemi.dfu.shared_package import SharedPackage
+from benchmarks.common             import make_package
+from benchmarks.package            import image
+
+SIZE        = 16 * 1024 * 1024
+WORKERS     = [1, 2, 4, 8]
+COMPRESSION = (('stored', zipfile.ZIP_STORED), ('deflated', zipfile.ZIP_DEFLATED))
+
+
+def memory():
+    """ Returns the private memory and PSS of the calling process in bytes. """
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return fields['Private_Clean'] + fields['Private_Dirty'], fields['Pss']
+
+
+def load(package, barrier):
+    """
+    Reads the application image of package, a path or a SharedPackage.
+
+    :return: Private memory and PSS added by loading the package, measured once all workers loaded it.
+    """
+    (private, pss) = memory()
+    package = PackageReader(package) if isinstance(package, str) else package
+    with package:
+        crc = 0
+        for data in image(package):
+            crc = binascii.crc32(data, crc)
+        del data
+        barrier.wait()
+        (loaded_private, loaded_pss) = memory()
+        barrier.wait()
+    return loaded_private - private, loaded_pss - pss
+
+
+def run(workers, package):
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager:
+        barrier = manager.Barrier(workers)
+        with context.Pool(workers) as pool:
+            results = pool.starmap(load, [(package, barrier)] * workers)
+    return (sum(private for (private, _) in results) / workers,
+            sum(pss for (_, pss) in results) / workers)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Worker memory used by a package against the number of workers.')
+    parser.add_argument('--size', type=int, default=SIZE)
+    parser.add_argument('--workers', type=lambda text: [int(count) for count in text.split(',')], default=WORKERS)
+    options = parser.parse_args(argv[1:])
+
+    work_dir = tempfile.mkdtemp(prefix="nrf_dfu_bench_")
+    try:
+        firmware = os.urandom(options.size // 2) + bytes(options.size - options.size // 2)
+        print("{0:>10} {1:>10} {2:>8} {3:>14} {4:>14}   (MiB per worker)".format(
+            'members', 'package', 'workers', 'private', 'pss'))
+        for (members, compression) in COMPRESSION:
+            path = os.path.join(work_dir, 'package.zip')
+            make_package(path, firmware, compression)
+            for workers in options.workers:
+                with SharedPackage.create(path) as shared:
+                    for (name, package) in (('reader', path), ('shared', shared)):
+                        (private, pss) = run(workers, package)
+                        print("{0:>10} {1:>10} {2:>8} {3:14.2f} {4:14.2f}".format(
+                            members, name, workers, private / 2 ** 20, pss / 2 ** 20))
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
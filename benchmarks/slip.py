@@ -0,0 +1,181 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Micro-benchmark of the SLIP encoder and decoder.
+
+Compares Slip.encode_bytes against the previous per-byte implementation on a SoftDevice sized
+image. A real image can be passed on the command line, otherwise 1 MB of random data is used.
+
+Compares DFUAdapter.get_message against the previous byte-at-a-time reads on a stream of
+CalcChecSum responses, counting the read calls made on the serial port.
+
+USAGE:
+    python -m benchmarks.slip [image.bin]
+"""
+
+# Python standard library
+import os
+import sys
+import time
+import struct
+
+# Nordic libraries
+from nordicsemi.dfu.dfu_transport_serial import Slip, DFUAdapter
+from benchmarks.common                   import measure
+
+IMAGE_SIZE     = 1024 * 1024
+RESPONSE_COUNT = 20000
+REPEAT         = 5
+
+
+def legacy_encode(data):
+    """ The per-byte encoder Slip.encode used before it was table driven. """
+    newData = []
+    for elem in data:
+        if elem == Slip.SLIP_BYTE_END:
+            newData.append(Slip.SLIP_BYTE_ESC)
+            newData.append(Slip.SLIP_BYTE_ESC_END)
+        elif elem == Slip.SLIP_BYTE_ESC:
+            newData.append(Slip.SLIP_BYTE_ESC)
+            newData.append(Slip.SLIP_BYTE_ESC_ESC)
+        else:
+            newData.append(elem)
+    newData.append(Slip.SLIP_BYTE_END)
+    return newData
+
+
+def legacy_get_message(serial_port):
+    """ The byte-at-a-time DFUAdapter.get_message used before the chunked decoder. """
+    current_state = Slip.SLIP_STATE_DECODING
+    finished = False
+    decoded_data = []
+
+    while finished == False:
+        byte = serial_port.read(1)
+        if byte:
+            (byte) = struct.unpack('B', byte)[0]
+            (finished, current_state, decoded_data) \
+               = Slip.decode_add_byte(byte, decoded_data, current_state)
+        else:
+            return None
+
+    return decoded_data
+
+
+class BufferedPort:
+    """ Stands in for serial.Serial with everything already received by the OS. """
+
+    timeout = None  # Reads never block
+
+    def __init__(self, data):
+        self.data  = data
+        self.pos   = 0
+        self.reads = 0
+
+    @property
+    def in_waiting(self):
+        return len(self.data) - self.pos
+
+    def read(self, size=1):
+        self.reads += 1
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        return chunk
+
+
+def checksum_responses(count):
+    """ Returns count SLIP encoded CalcChecSum responses as a single received stream. """
+    stream = bytearray()
+    for i in range(count):
+        stream += Slip.encode_bytes(struct.pack('<BBBII', 0x60, 0x03, 0x01, i * 64, i * 0x9E3779B1 & 0xFFFFFFFF))
+    return bytes(stream)
+
+
+def decode_all(receiver, stream, count):
+    """
+    Returns the wall time, CPU time and read calls needed to receive count frames from stream.
+
+    :param receiver: Called with the port, returns the function receiving a single frame.
+    """
+    port = BufferedPort(stream)
+    get_message = receiver(port)
+    start, start_cpu = time.perf_counter(), time.process_time()
+    for _ in range(count):
+        assert get_message() is not None
+    return time.perf_counter() - start, time.process_time() - start_cpu, port.reads
+
+
+def load_image(argv):
+    if len(argv) > 1:
+        with open(argv[1], 'rb') as f:
+            return f.read()
+    return os.urandom(IMAGE_SIZE)
+
+
+def report(name, elapsed, size):
+    print("{0:<28} {1:10.3f} ms {2:10.1f} MB/s {3:10.2f} ns/byte".format(
+        name, elapsed * 1e3, size / elapsed / 1e6, elapsed * 1e9 / size))
+
+
+def main(argv):
+    data = load_image(argv)
+    assert bytes(legacy_encode(data)) == Slip.encode_bytes(data)
+
+    print("SLIP encode, {0} bytes".format(len(data)))
+    legacy = measure(lambda: legacy_encode(data), repeat=3)
+    report("legacy per-byte encode", legacy, len(data))
+    current = measure(lambda: Slip.encode_bytes(data), REPEAT)
+    report("Slip.encode_bytes", current, len(data))
+    report("Slip.encode (list wrapper)", measure(lambda: Slip.encode(data), REPEAT), len(data))
+    print("speedup: {0:.1f}x".format(legacy / current))
+
+    stream = checksum_responses(RESPONSE_COUNT)
+    print()
+    print("SLIP decode, {0} CalcChecSum responses, {1} bytes".format(RESPONSE_COUNT, len(stream)))
+    results = (("legacy read(1) decode",
+                decode_all(lambda port: lambda: legacy_get_message(port), stream, RESPONSE_COUNT)),
+               ("DFUAdapter.get_message",
+                decode_all(lambda port: DFUAdapter(port).get_message, stream, RESPONSE_COUNT)))
+    for name, (elapsed, cpu, reads) in results:
+        print("{0:<28} {1:10.3f} ms {2:10.3f} ms cpu {3:8.2f} us/response {4:10} reads".format(
+            name, elapsed * 1e3, cpu * 1e3, elapsed * 1e6 / RESPONSE_COUNT, reads))
+    print("speedup: {0:.1f}x".format(results[0][1][0] / results[1][1][0]))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,314 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+End-to-end DFU throughput benchmark.
+
+Runs complete Dfu.dfu_send_images transfers of a generated application package through
+DfuTransportSerial against a SimulatedBootloader on a pseudo-terminal. The simulator models the
+UART line rate, so the baud rate is the speed of the link. By default every parameter is swept
+on its own around a base case; --full runs every combination.
+
+For each case the best of --repeat runs is recorded: wall time, firmware bytes per second,
+WriteObject frames and bytes sent, system calls made by the transport thread and its CPU time.
+
+Results are written as JSON with --output. --compare checks them against a previous result
+file and exits with status 1 if a case regressed by more than --threshold.
+
+USAGE:
+    python -m benchmarks.throughput [--output results.json] [--compare baseline.json]
+                                    [--prn 0,8] [--size 65536] [--full]
+"""
+
+# Python standard library
+import os
+import sys
+import json
+import time
+import fcntl
+import select
+import argparse
+import platform
+import tempfile
+import threading
+import itertools
+
+# Nordic libraries
+from nordicsemi.dfu.dfu import Dfu
+from nordicsemi.dfu.dfu_transport_serial import DfuTransportSerial
+from nordicsemi.dfu.sim_bootloader import SimulatedBootloader
+from benchmarks import common
+
+BASE_CASE = {
+    'baud':         1000000,
+    'prn':          0,
+    'mtu':          131,
+    'max_size':     4096,
+    'flow_control': True,
+    'size':         64 * 1024,
+}
+
+SWEEP = {
+    'baud':         [115200, 460800, 1000000],
+    'prn':          [0, 1, 8, 32],
+    'mtu':          [67, 131, 259],
+    'max_size':     [1024, 2048, 4096],
+    'flow_control': [True, False],
+    'size':         [16 * 1024, 64 * 1024, 256 * 1024],
+}
+
+DEFAULT_REPEAT    = 3
+DEFAULT_THRESHOLD = 0.1     # Relative change flagged as a regression
+MIN_CPU_CHANGE    = 0.005   # Seconds, CPU time changes below are noise
+
+
+class SyscallCounter:
+    """
+    Counts the system calls pyserial makes from the thread that created the counter.
+
+    The simulator answers from its own threads with the same calls, those are not counted.
+    """
+
+    CALLS = ((os, 'read'), (os, 'write'), (select, 'select'), (fcntl, 'ioctl'))
+
+    def __init__(self):
+        self.thread = threading.get_ident()
+        self.counts = {name: 0 for (_, name) in SyscallCounter.CALLS}
+        self.saved  = []
+
+    def __enter__(self):
+        for (module, name) in SyscallCounter.CALLS:
+            function = getattr(module, name)
+            self.saved.append((module, name, function))
+            setattr(module, name, self.__counted(name, function))
+        return self
+
+    def __exit__(self, *args):
+        for (module, name, function) in self.saved:
+            setattr(module, name, function)
+        self.saved = []
+
+    def __counted(self, name, function):
+        def counted(*args, **kwargs):
+            if threading.get_ident() == self.thread:
+                self.counts[name] += 1
+            return function(*args, **kwargs)
+        return counted
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+
+def case_key(case):
+    return " ".join("{0}={1}".format(name, int(case[name]) if isinstance(case[name], bool) else case[name])
+                    for name in BASE_CASE)
+
+
+def make_package(directory, size):
+    """
+    Writes an application package with size bytes of random firmware.
+
+    :return tuple: Path of the package and the firmware.
+    """
+    firmware = os.urandom(size)
+    path     = os.path.join(directory, 'app_{0}.zip'.format(size))
+    common.make_package(path, firmware)
+    return path, firmware
+
+
+def run_once(case, package, firmware, options):
+    with SimulatedBootloader(mtu=case['mtu'], max_size=case['max_size'], baud_rate=case['baud'],
+                             page_erase_time=options.page_erase_time,
+                             page_write_time=options.page_write_time,
+                             latency=options.latency) as sim:
+        transport = DfuTransportSerial(sim.port, baud_rate=case['baud'], flow_control=case['flow_control'],
+                                       prn=case['prn'])
+        dfu = Dfu(package, transport, connect_delay=0)
+
+        with SyscallCounter() as syscalls:
+            start, start_cpu, start_process = time.perf_counter(), time.thread_time(), time.process_time()
+            dfu.dfu_send_images()
+            wall    = time.perf_counter() - start
+            cpu     = time.thread_time() - start_cpu
+            process = time.process_time() - start_process
+
+        if sim.firmware != firmware:
+            raise Exception("Firmware received by the simulator differs from the package")
+
+    return {
+        'wall_s':        wall,
+        'bytes_per_s':   len(firmware) / wall,
+        'frames':        transport.stats['frames'],
+        'wire_bytes':    transport.stats['wire_bytes'],
+        'syscalls':      syscalls.total,
+        'syscall_counts': dict(syscalls.counts),
+        'cpu_s':         cpu,
+        'process_cpu_s': process,
+    }
+
+
+def run_case(case, packages, options):
+    """
+    Returns the metrics of the fastest of options.repeat transfers of case.
+    """
+    (package, firmware) = packages[case['size']]
+    runs = [run_once(case, package, firmware, options) for _ in range(options.repeat)]
+    best = min(runs, key=lambda run: run['wall_s'])
+    return dict(case, key=case_key(case), **best)
+
+
+def build_cases(sweep, full):
+    if full:
+        names = list(BASE_CASE)
+        return [dict(zip(names, values)) for values in itertools.product(*(sweep[name] for name in names))]
+
+    cases = [dict(BASE_CASE)]
+    for name in BASE_CASE:
+        for value in sweep[name]:
+            case = dict(BASE_CASE, **{name: value})
+            if case not in cases:
+                cases.append(case)
+    return cases
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints the change of every case found in baseline.
+
+    :return int: Number of cases that regressed.
+    """
+    previous    = {result['key']: result for result in baseline['results']}
+    regressions = 0
+    print()
+    print("Compared to baseline, threshold {0:.0%}".format(threshold))
+    for result in results:
+        base = previous.get(result['key'])
+        if base is None:
+            print("{0:<70} not in baseline".format(result['key']))
+            continue
+
+        flags = []
+        if result['bytes_per_s'] < base['bytes_per_s'] * (1 - threshold):
+            flags.append('throughput')
+        if (result['cpu_s'] > base['cpu_s'] * (1 + threshold)
+                and result['cpu_s'] - base['cpu_s'] > MIN_CPU_CHANGE):
+            flags.append('cpu')
+        if result['syscalls'] > base['syscalls'] * (1 + threshold):
+            flags.append('syscalls')
+        regressions += bool(flags)
+
+        print("{0:<70} {1:+7.1%} B/s {2:+7.1%} cpu {3:+7.1%} syscalls {4}".format(
+            result['key'],
+            result['bytes_per_s'] / base['bytes_per_s'] - 1,
+            result['cpu_s'] / base['cpu_s'] - 1 if base['cpu_s'] else 0.0,
+            result['syscalls'] / base['syscalls'] - 1 if base['syscalls'] else 0.0,
+            "REGRESSION: " + ", ".join(flags) if flags else ""))
+    return regressions
+
+
+def parse_list(convert):
+    def parse(text):
+        return [convert(value) for value in text.split(',')]
+    return parse
+
+
+def parse_bool(text):
+    return text.lower() in ('1', 'true', 'yes', 'on')
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='End-to-end DFU throughput benchmark against a simulated bootloader.')
+    parser.add_argument('--baud', type=parse_list(int), default=SWEEP['baud'])
+    parser.add_argument('--prn', type=parse_list(int), default=SWEEP['prn'])
+    parser.add_argument('--mtu', type=parse_list(int), default=SWEEP['mtu'])
+    parser.add_argument('--max-size', dest='max_size', type=parse_list(int), default=SWEEP['max_size'])
+    parser.add_argument('--flow-control', dest='flow_control', type=parse_list(parse_bool),
+                        default=SWEEP['flow_control'])
+    parser.add_argument('--size', type=parse_list(int), default=SWEEP['size'])
+    parser.add_argument('--full', action='store_true', help="Run every combination of the swept values.")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--latency', type=float, default=0.0, help="Response latency of the target in seconds.")
+    parser.add_argument('--page-erase-time', type=float, default=0.0)
+    parser.add_argument('--page-write-time', type=float, default=0.0)
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--compare', help="Compare the results with this JSON file.")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    options = parser.parse_args(argv[1:])
+
+    sweep = {name: getattr(options, name) for name in BASE_CASE}
+    if not options.full:
+        # A value given on the command line replaces the base case of a single valued parameter.
+        for name, values in sweep.items():
+            if len(values) == 1:
+                BASE_CASE[name] = values[0]
+    cases = build_cases(sweep, options.full)
+
+    print("{0:<70} {1:>8} {2:>10} {3:>7} {4:>9} {5:>8}".format(
+        'case', 'wall s', 'kB/s', 'frames', 'syscalls', 'cpu ms'))
+    results = []
+    with tempfile.TemporaryDirectory(prefix='nrf_dfu_bench_') as directory:
+        packages = {size: make_package(directory, size) for size in sorted(set(case['size'] for case in cases))}
+        for case in cases:
+            result = run_case(case, packages, options)
+            results.append(result)
+            print("{0:<70} {1:8.3f} {2:10.1f} {3:7} {4:9} {5:8.1f}".format(
+                result['key'], result['wall_s'], result['bytes_per_s'] / 1000, result['frames'],
+                result['syscalls'], result['cpu_s'] * 1000), flush=True)
+
+    report = {
+        'python':    platform.python_version(),
+        'platform':  platform.platform(),
+        'time':      time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'options':   {name: getattr(options, name) for name in ('repeat', 'latency',
+                                                                 'page_erase_time', 'page_write_time')},
+        'results':   results,
+    }
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, options.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
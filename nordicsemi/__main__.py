@@ -40,15 +40,16 @@ import signal
 import os
 import sys
 import argparse
-import time
 import logging
 import re
-from serial import Serial
 sys.path.append(os.getcwd())
 
 from nordicsemi.dfu.dfu import Dfu
+from nordicsemi.dfu.dfu_batch import DfuBatch
 from nordicsemi.dfu.dfu_transport import DfuEvent, TRANSPORT_LOGGING_LEVEL
 from nordicsemi.dfu.dfu_transport_serial import DfuTransportSerial
+from nordicsemi.dfu.package_cache import PackageCache
+from nordicsemi.dfu.pacing import PACING
 from nordicsemi import version as nrfutil_version
 
 logger = logging.getLogger(__name__)
@@ -66,30 +67,15 @@ def update_progress(progress=0):
         global_bar.update(progress)
      
      
-def send_text_message(device, baudrate, text, flow_control):
-    if not text: # nothing to send
-        return
-
-    logger.debug("Serial: send_text_message [%s]" % text)
-    try:
-        serial = Serial(port=device, baudrate=baudrate, rtscts=flow_control, timeout=2)
-        serial.write(text.encode('utf-8'))
-        serial.close()
-        time.sleep(1)
-    except Exception as e:
-        logger.exception('send_text_message')
-        raise Exception("Serial port could not be opened on {0}. Reason: {1}".format(device, e))
-
-
-
-
 def do_serial(package, port, connect_delay, flow_control, packet_receipt_notification, baud_rate, ping,
-              timeout, dfuStart = None):
+              timeout, dfuStart = None, pacing = None, prn_window = None, cache = None):
 
     if flow_control is None:
         flow_control = DfuTransportSerial.DEFAULT_FLOW_CONTROL
     if packet_receipt_notification is None:
         packet_receipt_notification = DfuTransportSerial.DEFAULT_PRN
+    if prn_window is None:
+        prn_window = DfuTransportSerial.DEFAULT_PRN_WINDOW
     if baud_rate is None:
         baud_rate = DfuTransportSerial.DEFAULT_BAUD_RATE
     if ping is None:
@@ -104,15 +90,11 @@ def do_serial(package, port, connect_delay, flow_control, packet_receipt_notific
                             .format(port, flow_control, baud_rate, ping))
     serial_backend = DfuTransportSerial(com_port=str(port), baud_rate=baud_rate,
                                         flow_control=flow_control, prn=packet_receipt_notification, do_ping=ping,
-                                        timeout=timeout)
+                                        timeout=timeout, pacing=pacing, prn_window=prn_window, dfu_start=dfuStart)
     serial_backend.register_events_callback(DfuEvent.PROGRESS_EVENT, update_progress)
-    
-    if dfuStart:
-        logger.info('Enterring DFU mode ...')
-        send_text_message(str(port), baud_rate, dfuStart, flow_control)
-        logger.info('Done')
-    
-    dfu = Dfu(zip_file_path = package, dfu_transport = serial_backend, connect_delay = connect_delay)
+
+    dfu = Dfu(zip_file_path = package, dfu_transport = serial_backend, connect_delay = connect_delay,
+              package = PackageCache(cache).open(package) if cache else None)
 
     if logger.getEffectiveLevel() > logging.INFO:
         with click.progressbar(length=dfu.dfu_get_total_size()) as bar:
@@ -126,6 +108,39 @@ def do_serial(package, port, connect_delay, flow_control, packet_receipt_notific
 
 
 
+def do_batch(package, ports, jobs, flow_control, packet_receipt_notification, baud_rate, timeout,
+             dfuStart = None, pacing = None, prn_window = None, cache = None):
+
+    if flow_control is None:
+        flow_control = DfuTransportSerial.DEFAULT_FLOW_CONTROL
+    if packet_receipt_notification is None:
+        packet_receipt_notification = DfuTransportSerial.DEFAULT_PRN
+    if prn_window is None:
+        prn_window = DfuTransportSerial.DEFAULT_PRN_WINDOW
+    if baud_rate is None:
+        baud_rate = DfuTransportSerial.DEFAULT_BAUD_RATE
+    if timeout is None:
+        timeout = DfuTransportSerial.DEFAULT_TIMEOUT
+
+    def transport(port):
+        return DfuBatch.serial_transport(port, baud_rate=baud_rate, flow_control=flow_control,
+                                         prn=packet_receipt_notification, do_ping=False, timeout=timeout,
+                                         pacing=pacing, prn_window=prn_window, dfu_start=dfuStart)
+
+    batch = DfuBatch(package, ports, transport_factory=transport, concurrency=jobs,
+                     package=PackageCache(cache).open(package) if cache else None)
+    logger.info("Updating {0} devices, {1} at a time, flow_control: {2}, baud_rate: {3}"
+                            .format(len(batch.ports), batch.concurrency, flow_control, baud_rate))
+
+    results = batch.run()
+    failed  = [result.port for result in results if not result.success]
+    if failed:
+        raise Exception("DFU failed on {0} of {1} devices: {2}".format(len(failed), len(results), ", ".join(failed)))
+
+    logger.info("All devices programmed.")
+
+
+
 def do_main():
     logging.basicConfig(format='%(asctime)s %(message)s', level=logging.DEBUG)
 
@@ -140,14 +155,29 @@ def do_main():
     parser = argparse.ArgumentParser(description = 'Perform a Device Firmware Update over serial transport given a DFU package (zip file).')
     parser.add_argument('-pkg', '--package', dest = 'package', nargs = 1, type = str, required = True,
                         help = "File name of the DFU package.")
-    parser.add_argument('-p', '--port', dest = 'port', nargs = 1, type = str, required = True,
-                        help = "Serial port address to which the device is connected. (e.g. COM1 in windows systems, /dev/ttyACM0 in linux/mac)")
+    parser.add_argument('-p', '--port', dest = 'port', nargs = '+', type = str, required = True,
+                        help = "Serial port address to which the device is connected. (e.g. COM1 in windows systems, /dev/ttyACM0 in linux/mac)"
+                               " Several ports or a glob such as '/dev/ttyACM*' update all of the devices.")
+    parser.add_argument('-j', '--jobs', dest = 'jobs', type = int, required = False,
+                        help = "Number of devices updated at the same time (default: all).")
     parser.add_argument('-dfus', '--dfuStart', dest = 'dfuStart', nargs = '?', type = str, required = False,
                         help = "The dfu entering mode string.")
     parser.add_argument('-fc', '--flow-control', dest = 'fc', nargs = 1, type = int, required = False,
                         help = "To enable flow control set this flag to 1.")
-    parser.add_argument('-t', '--timeout', dest = 'fc', nargs = 1, type = int, required = False,
-                        help = "Set the timeout in seconds for board to respond (default: 30 seconds).")
+    parser.add_argument('-t', '--timeout', dest = 'timeout', type = float, required = False,
+                        help = "Set the timeout in seconds for board to respond (default: 30 seconds)."
+                               " Responses are otherwise timed out from the measured round-trip times.")
+    parser.add_argument('-pc', '--pacing', dest = 'pacing', type = str, required = False,
+                        choices = list(PACING),
+                        help = "WriteObject frame pacing (default: none with flow control, baud without).")
+    parser.add_argument('-prn', '--prn', dest = 'prn', type = int, required = False,
+                        help = "Packet receipt notification interval in WriteObject frames (default: 0, disabled).")
+    parser.add_argument('-w', '--prn-window', dest = 'prn_window', type = int, required = False,
+                        help = "PRN intervals sent before waiting for the oldest checksum response (default: 1).")
+    parser.add_argument('-c', '--cache', dest = 'cache', nargs = '?', type = str, required = False,
+                        const = PackageCache.default_dir(),
+                        help = "Keep the loaded package in a cache directory, skipping its unpacking when the"
+                               " same package is flashed again (default directory: {0}).".format(PackageCache.default_dir()))
     parser.add_argument("-v", "--version", action="store_true",
                         help = "get Version info")
     args = parser.parse_args()
@@ -156,9 +186,17 @@ def do_main():
         version()
     
     try:
-        do_serial(package = args.package[0], port = args.port[0], connect_delay = 0, 
-                flow_control = args.fc[0], packet_receipt_notification = None , 
-                baud_rate = 115200, ping = False, timeout = 2, dfuStart = args.dfuStart)
+        ports = DfuBatch.expand_ports(args.port)
+        if len(ports) > 1 or args.jobs:
+            do_batch(package = args.package[0], ports = ports, jobs = args.jobs,
+                    flow_control = args.fc[0] if args.fc else None, packet_receipt_notification = args.prn,
+                    baud_rate = 115200, timeout = args.timeout, dfuStart = args.dfuStart,
+                    pacing = args.pacing, prn_window = args.prn_window, cache = args.cache)
+        else:
+            do_serial(package = args.package[0], port = ports[0] if ports else None, connect_delay = 0, 
+                    flow_control = args.fc[0] if args.fc else None, packet_receipt_notification = args.prn, 
+                    baud_rate = 115200, ping = False, timeout = args.timeout, dfuStart = args.dfuStart,
+                    pacing = args.pacing, prn_window = args.prn_window, cache = args.cache)
     except:
         logger.exception('')
 
@@ -40,13 +40,13 @@ def calc_crc16(binary_data: bytes, crc=0xffff):
     Calculates CRC16 on binary_data
 
     :param int crc: CRC value to start calculation with
-    :param bytearray binary_data: Array with data to run CRC16 calculation on
+    :param bytes binary_data: Bytes-like object with data to run CRC16 calculation on
     :return int: Calculated CRC value of binary_data
     """
 
     for b in binary_data:
         crc = (crc >> 8 & 0x00FF) | (crc << 8 & 0xFF00)
-        crc ^= ord(b)
+        crc ^= b
         crc ^= (crc & 0x00FF) >> 4
         crc ^= (crc << 8) << 4
         crc ^= ((crc & 0x00FF) << 4) << 1
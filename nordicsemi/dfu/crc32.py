@@ -0,0 +1,100 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# Python standard library
+import binascii
+import threading
+
+
+class Crc32Index:
+    """
+    CRC32 checkpoints of an image at every object boundary.
+
+    The CRC32 of the image up to any offset is extended from the checkpoint below it, hashing at
+    most one object of data instead of the whole prefix. Checkpoints are computed when first
+    needed, in a single pass over the image, and kept.
+    """
+
+    def __init__(self, data, object_size, checkpoints=None):
+        """
+        :param data: Image as a bytes-like object, or any sized object returning parts of the
+                     image when sliced, such as a FirmwareSource. The part of an object is always
+                     asked for as a whole, from its boundary.
+        :param int object_size: Distance between checkpoints, the maximum object size of the target.
+        :param checkpoints: CRC32 of data at every object boundary, starting with offset 0, if
+                            already known. The CRC32 at offset 0 may be the one of data preceding
+                            the image, all CRCs are then extended from it.
+        """
+        if object_size <= 0:
+            raise ValueError("Invalid object size {0}".format(object_size))
+
+        try:
+            self.data = memoryview(data)
+        except TypeError:
+            self.data = data
+        self.size        = len(data)
+        self.object_size = object_size
+        self.checkpoints = list(checkpoints) if checkpoints is not None else [0]
+        self.__lock      = threading.Lock()
+
+    def crc_at(self, offset):
+        """
+        Returns the CRC32 of the image up to offset.
+
+        :param int offset: Length of the prefix, at most the length of the image.
+        :return int: CRC32 of data[:offset].
+        """
+        if offset < 0 or offset > self.size:
+            raise ValueError("Offset {0} outside of image of {1} bytes".format(offset, self.size))
+
+        (index, remainder) = divmod(offset, self.object_size)
+        crc = self.__checkpoint(index)
+        if remainder == 0:
+            return crc
+
+        start = offset - remainder
+        data  = memoryview(self.data[start:start + self.object_size])
+        return binascii.crc32(data[:remainder], crc) & 0xFFFFFFFF
+
+    def __checkpoint(self, index):
+        """ Returns the CRC32 at the boundary of object index, computing the ones missing below it. """
+        with self.__lock:
+            while len(self.checkpoints) <= index:
+                start = (len(self.checkpoints) - 1) * self.object_size
+                crc   = binascii.crc32(self.data[start:start + self.object_size], self.checkpoints[-1])
+                self.checkpoints.append(crc & 0xFFFFFFFF)
+            return self.checkpoints[index]
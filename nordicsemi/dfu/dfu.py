@@ -36,15 +36,15 @@
 #
 
 # Python standard library
-import os
 import time
-import shutil
+import asyncio
 import logging
-import tempfile
 
 
 # Nordic libraries
-from nordicsemi.dfu.package         import Package
+from nordicsemi.dfu.package         import PackageReader
+from nordicsemi.dfu.firmware_source import FirmwareSource
+from nordicsemi.dfu.preflight       import Preflight
 
 logger = logging.getLogger(__name__)
 
@@ -52,98 +52,202 @@ logger = logging.getLogger(__name__)
 class Dfu:
     """ Class to handle upload of a new hex image to the device. """
 
-    def __init__(self, zip_file_path, dfu_transport, connect_delay):
+    STREAM_SIZE = 1024 * 1024  # Larger images are read from the package one object at a time
+
+    def __init__(self, zip_file_path, dfu_transport, connect_delay, package=None, session=True):
         """
-        Initializes the dfu upgrade, unpacks zip and registers callbacks.
+        Initializes the dfu upgrade, opens the zip and registers callbacks.
+
+        Images are read straight from the zip, see nordicsemi.dfu.package.PackageReader.
 
         @param zip_file_path: Path to the zip file with the firmware to upgrade
         @type zip_file_path: str
         @param dfu_transport: Transport backend to use to upgrade
         @type dfu_transport: nordicsemi.dfu.dfu_transport.DfuTransport
-        @param connect_delay: Delay in seconds before each connection to the DFU target
+        @param connect_delay: Fixed delay in seconds before each connection to the DFU target. None or 0
+                              to connect as soon as the transport finds the target's port
         @type connect_delay: int
+        @param package: Package already opened by the caller, zip_file_path is then ignored
+        @type package: nordicsemi.dfu.package.PackageReader or nordicsemi.dfu.shared_package.SharedPackage
+        @param session: Keep the transport open across the images of the package, reconnecting only
+                        when the target resets after activating an image. False opens and closes the
+                        transport once per image
+        @type session: bool
         @return
         """
-        self.temp_dir           = tempfile.mkdtemp(prefix="nrf_dfu_")
-        self.unpacked_zip_path  = os.path.join(self.temp_dir, 'unpacked_zip')
-        self.manifest           = Package.unpack_package(zip_file_path, self.unpacked_zip_path)
+        self.package            = package if package is not None else PackageReader(zip_file_path)
+        self.manifest           = self.package.manifest
 
         self.dfu_transport      = dfu_transport
 
-        if connect_delay is not None:
-            self.connect_delay = connect_delay
-        else:
-            self.connect_delay = 3
+        self.connect_delay      = connect_delay
+        self.session            = session
 
-    def __del__(self):
+    def _read_image(self, firmware):
         """
-        Destructor removes the temporary directory for the unpacked zip
-        :return:
+        Returns the init packet and the firmware of an image.
+
+        Images larger than STREAM_SIZE are returned as a FirmwareSource: the transport then
+        reads and encodes one object at a time, whatever the size of the image. Smaller images
+        are returned whole, their encoded frames are shared by the DFUs of a batch.
         """
-        shutil.rmtree(self.temp_dir)
+        init_packet = self.package.read(firmware.dat_file)
+        if self.package.size(firmware.bin_file) > Dfu.STREAM_SIZE:
+            return init_packet, self.package.firmware_source(firmware.bin_file)
+        return init_packet, self.package.read(firmware.bin_file)
 
 
-    def _dfu_send_image(self, firmware):
-        time.sleep(self.connect_delay)
-        self.dfu_transport.open()
+    def _images(self):
+        """
+        Returns the log message and firmware of every image in the stored manifest, in update order.
+        """
+        images = []
+        if self.manifest.softdevice_bootloader:
+            images.append(("Sending SoftDevice+Bootloader image.", self.manifest.softdevice_bootloader))
 
+        if self.manifest.softdevice:
+            images.append(("Sending SoftDevice image...", self.manifest.softdevice))
+
+        if self.manifest.bootloader:
+            images.append(("Sending Bootloader image.", self.manifest.bootloader))
+
+        if self.manifest.application:
+            images.append(("Sending Application image.", self.manifest.application))
+        return images
+
+
+    def _send_image_data(self, firmware):
         start_time = time.time()
+        init_packet, data = self._read_image(firmware)
 
-        logger.info("Sending init packet...")
-        with open(os.path.join(self.unpacked_zip_path, firmware.dat_file), 'rb') as f:
-            data    = f.read()
-            self.dfu_transport.send_init_packet(data)
+        try:
+            logger.info("Sending init packet...")
+            self.dfu_transport.send_init_packet(init_packet)
 
-        logger.info("Sending firmware file...")
-        with open(os.path.join(self.unpacked_zip_path, firmware.bin_file), 'rb') as f:
-            data    = f.read()
+            logger.info("Sending firmware file...")
             self.dfu_transport.send_firmware(data)
+        finally:
+            if isinstance(data, FirmwareSource):
+                data.close()
+
+        end_time = time.time()
+        logger.info("Image sent in {0}s".format(end_time - start_time))
+
+
+    async def _send_image_data_async(self, firmware):
+        start_time = time.time()
+        init_packet, data = self._read_image(firmware)
+
+        try:
+            logger.info("Sending init packet...")
+            await self.dfu_transport.send_init_packet(init_packet)
+
+            logger.info("Sending firmware file...")
+            await self.dfu_transport.send_firmware(data)
+        finally:
+            if isinstance(data, FirmwareSource):
+                data.close()
 
         end_time = time.time()
         logger.info("Image sent in {0}s".format(end_time - start_time))
 
-        self.dfu_transport.close()
+
+    def _dfu_send_image(self, firmware):
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+        self.dfu_transport.open()
+
+        try:
+            self._send_image_data(firmware)
+        finally:
+            self.dfu_transport.close()
+
+
+    async def _dfu_send_image_async(self, firmware):
+        if self.connect_delay:
+            await asyncio.sleep(self.connect_delay)
+        await self.dfu_transport.open()
+
+        try:
+            await self._send_image_data_async(firmware)
+        finally:
+            await self.dfu_transport.close()
 
 
     def dfu_send_images(self):
         """
         Does DFU for all firmware images in the stored manifest.
+
+        In session mode the transport is opened once. Before each image after the first, the
+        transport probes whether the target reset to activate the previous image and only then
+        reconnects, instead of waiting connect_delay and reconnecting for every image.
+
+        The package is verified first, see nordicsemi.dfu.preflight.Preflight.
         :return:
         """
-        if self.manifest.softdevice_bootloader:
-            logger.info("Sending SoftDevice+Bootloader image.")
-            self._dfu_send_image(self.manifest.softdevice_bootloader)
+        Preflight.verify(self.package)
 
-        if self.manifest.softdevice:
-            logger.info("Sending SoftDevice image...")
-            self._dfu_send_image(self.manifest.softdevice)
+        if not self.session:
+            for message, firmware in self._images():
+                logger.info(message)
+                self._dfu_send_image(firmware)
+            return
 
-        if self.manifest.bootloader:
-            logger.info("Sending Bootloader image.")
-            self._dfu_send_image(self.manifest.bootloader)
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+        self.dfu_transport.open()
 
-        if self.manifest.application:
-            logger.info("Sending Application image.")
-            self._dfu_send_image(self.manifest.application)
+        try:
+            for index, (message, firmware) in enumerate(self._images()):
+                if index:
+                    self.dfu_transport.wait_for_reset()
+                logger.info(message)
+                self._send_image_data(firmware)
+        finally:
+            self.dfu_transport.close()
+
+
+    async def dfu_send_images_async(self):
+        """
+        Does DFU for all firmware images in the stored manifest with an asyncio transport,
+        see nordicsemi.dfu.dfu_transport_serial_async.
+        :return:
+        """
+        Preflight.verify(self.package)
+
+        if not self.session:
+            for message, firmware in self._images():
+                logger.info(message)
+                await self._dfu_send_image_async(firmware)
+            return
+
+        if self.connect_delay:
+            await asyncio.sleep(self.connect_delay)
+        await self.dfu_transport.open()
+
+        try:
+            for index, (message, firmware) in enumerate(self._images()):
+                if index:
+                    await self.dfu_transport.wait_for_reset()
+                logger.info(message)
+                await self._send_image_data_async(firmware)
+        finally:
+            await self.dfu_transport.close()
 
 
     def dfu_get_total_size(self):
         total_size = 0
 
         if self.manifest.softdevice_bootloader:
-            total_size += os.path.getsize(os.path.join(self.unpacked_zip_path,
-                                                       self.manifest.softdevice_bootloader.bin_file))
+            total_size += self.package.size(self.manifest.softdevice_bootloader.bin_file)
 
         if self.manifest.softdevice:
-            total_size += os.path.getsize(os.path.join(self.unpacked_zip_path,
-                                                       self.manifest.softdevice.bin_file))
+            total_size += self.package.size(self.manifest.softdevice.bin_file)
 
         if self.manifest.bootloader:
-            total_size += os.path.getsize(os.path.join(self.unpacked_zip_path,
-                                                       self.manifest.bootloader.bin_file))
+            total_size += self.package.size(self.manifest.bootloader.bin_file)
 
         if self.manifest.application:
-            total_size += os.path.getsize(os.path.join(self.unpacked_zip_path,
-                                                       self.manifest.application.bin_file))
+            total_size += self.package.size(self.manifest.application.bin_file)
 
         return total_size
@@ -0,0 +1,227 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# Python standard library
+import os
+import glob
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Nordic libraries
+from nordicsemi.dfu.dfu                         import Dfu
+from nordicsemi.dfu.package                     import PackageReader, PackageException
+from nordicsemi.dfu.preflight                   import Preflight
+from nordicsemi.dfu.dfu_transport_serial        import DfuTransportSerial
+from nordicsemi.dfu.dfu_transport_serial_async  import DfuTransportSerialAsync
+
+logger = logging.getLogger(__name__)
+
+
+class DfuResult:
+    """ Outcome of the DFU of a single device of a DfuBatch. """
+
+    def __init__(self, port):
+        self.port       = port
+        self.size       = 0     # Firmware bytes sent, 0 unless the DFU succeeded
+        self.error      = None
+        self.start_time = None
+        self.end_time   = None
+
+    @property
+    def success(self):
+        return self.end_time is not None and self.error is None
+
+    @property
+    def duration(self):
+        if self.start_time is None or self.end_time is None:
+            return 0.0
+        return self.end_time - self.start_time
+
+    @property
+    def throughput(self):
+        """ Firmware bytes per second. """
+        return self.size / self.duration if self.duration else 0.0
+
+    def __str__(self):
+        if self.success:
+            return "{0}: OK, {1} bytes in {2:.1f}s ({3:.1f} kB/s)".format(
+                self.port, self.size, self.duration, self.throughput / 1000)
+        return "{0}: FAILED after {1:.1f}s: {2}".format(self.port, self.duration, self.error)
+
+
+class DfuBatch:
+    """
+    Updates a batch of devices with the same DFU package, several of them at a time.
+
+    The package is opened and validated once and shared by all DFUs. They run on a single
+    asyncio event loop: asyncio transports directly, blocking transports in a pool of
+    concurrency threads. A failure only ends the DFU of its own device.
+    """
+
+    def __init__(self, zip_file_path, ports, transport_factory=None, concurrency=None, connect_delay=0,
+                 package=None):
+        """
+        Opens and validates the package.
+
+        :param str zip_file_path: Path to the zip file with the firmware to upgrade.
+        :param ports: Serial ports of the devices, or glob patterns such as /dev/ttyACM*.
+        :param transport_factory: Called with a port, returns the DfuTransport to use for it.
+                                  Defaults to DfuBatch.serial_transport.
+        :param int concurrency: Maximum number of DFUs running at the same time, None for all.
+        :param int connect_delay: Delay in seconds before each connection to a DFU target.
+        :param package: Package already opened by the caller, zip_file_path is then ignored. E.g. a
+                        nordicsemi.dfu.shared_package.SharedPackage when ports are sharded across
+                        processes.
+        """
+        self.ports = DfuBatch.expand_ports(ports)
+        if not self.ports:
+            raise Exception("No serial port matches {0}".format(" ".join(ports)))
+
+        self.transport_factory = transport_factory or DfuBatch.serial_transport
+        self.concurrency       = concurrency or len(self.ports)
+        self.connect_delay     = connect_delay
+        self.duration          = 0.0
+        self.succeeded         = 0
+
+        self.package            = package if package is not None else PackageReader(zip_file_path)
+        self.manifest           = self.package.manifest
+        self.size               = self.validate()
+
+    @staticmethod
+    def expand_ports(ports):
+        """
+        Returns the serial ports matching a list of ports and glob patterns, without duplicates.
+
+        :param ports: Serial ports or glob patterns.
+        :return list: Ports in the order given, matches of a pattern sorted.
+        """
+        expanded = []
+        for port in ports:
+            matches = sorted(glob.glob(port)) if glob.has_magic(port) else [port]
+            expanded.extend(match for match in matches if match not in expanded)
+        return expanded
+
+    @staticmethod
+    def serial_transport(port, **kwargs):
+        """
+        Returns a serial transport for port: the asyncio transport where the event loop can watch
+        the port, a DfuTransportSerial otherwise.
+
+        :param str port: Serial port of the device.
+        :param kwargs: Settings passed to the transport.
+        """
+        if os.name == 'posix':
+            return DfuTransportSerialAsync(port, **kwargs)
+        return DfuTransportSerial(port, **kwargs)
+
+    def validate(self):
+        """
+        Checks that the package holds the files of every image of its manifest, and that every
+        image matches its init packet, see Preflight. Fails before any device is updated.
+
+        :return int: Total size of the firmware images in bytes.
+        """
+        firmwares = [firmware for firmware in (self.manifest.softdevice_bootloader,
+                                               self.manifest.softdevice,
+                                               self.manifest.bootloader,
+                                               self.manifest.application) if firmware]
+        if not firmwares:
+            raise PackageException("Package contains no firmware image.")
+
+        size = 0
+        for firmware in firmwares:
+            self.package.size(firmware.dat_file)
+            size += self.package.size(firmware.bin_file)
+        Preflight.verify(self.package)
+        return size
+
+    @property
+    def throughput(self):
+        """ Firmware bytes per second sent to all devices during the last run. """
+        return self.size * self.succeeded / self.duration if self.duration else 0.0
+
+    def run(self):
+        """
+        Updates all devices.
+
+        :return list: DfuResult of every port, in port order.
+        """
+        return asyncio.run(self.run_async())
+
+    async def run_async(self):
+        """
+        Updates all devices from a running event loop.
+
+        :return list: DfuResult of every port, in port order.
+        """
+        limit = asyncio.Semaphore(self.concurrency)
+        start = time.monotonic()
+        # Threads are only started for blocking transports.
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='dfu') as executor:
+            results = await asyncio.gather(*(self.__update(port, limit, executor) for port in self.ports))
+        self.duration  = time.monotonic() - start
+        self.succeeded = sum(result.success for result in results)
+
+        logger.info("Batch: {0} of {1} devices updated in {2:.1f}s, {3:.1f} kB/s in total".format(
+            self.succeeded, len(results), self.duration, self.throughput / 1000))
+        return results
+
+    async def __update(self, port, limit, executor):
+        result = DfuResult(port)
+        async with limit:
+            result.start_time = time.monotonic()
+            try:
+                transport = self.transport_factory(port)
+                dfu       = Dfu(None, transport, self.connect_delay, package=self.package)
+
+                logger.info("Batch: Updating device at {0}".format(port))
+                if asyncio.iscoroutinefunction(transport.open):
+                    await dfu.dfu_send_images_async()
+                else:
+                    await asyncio.get_running_loop().run_in_executor(executor, dfu.dfu_send_images)
+                result.size = self.size
+            except Exception as e:
+                result.error = e
+            result.end_time = time.monotonic()
+
+        if result.success:
+            logger.info("Batch: {0}".format(result))
+        else:
+            logger.error("Batch: {0}".format(result))
+        return result
@@ -49,6 +49,10 @@ TRANSPORT_LOGGING_LEVEL = 5
 class DfuEvent:
     PROGRESS_EVENT = 1
 
+class ValidationException(Exception):
+    """ Raised when the CRC or offset reported by the target does not match the data sent. """
+    pass
+
 class DfuTransport(ABC):
     """
     This class as an abstract base class inherited from when implementing transports.
@@ -147,6 +151,21 @@ class DfuTransport(ABC):
         pass
 
 
+    def wait_for_reset(self):
+        """
+        Called between two images of a session, after the first image was activated.
+
+        The target resets after a SoftDevice or bootloader update. A transport able to tell
+        whether it did should only reconnect when needed. By default the connection is
+        always re-established.
+
+        :return bool: True if the connection was re-established.
+        """
+        self.close()
+        self.open()
+        return True
+
+
     def register_events_callback(self, event_type, callback):
         """
         Register a callback.
@@ -36,18 +36,29 @@
 #
 
 # Python imports
+import os
 import time
-from datetime import datetime, timedelta
 import binascii
+import errno
 import logging
 import struct
+import threading
+from array import array
+from collections import deque, OrderedDict
+from concurrent.futures import Future
 
 # Python 3rd party imports
 from serial import Serial
 from serial.serialutil import SerialException
 
 # Nordic Semiconductor imports
-from nordicsemi.dfu.dfu_transport   import DfuTransport, DfuEvent, TRANSPORT_LOGGING_LEVEL
+from nordicsemi.dfu.dfu_transport   import DfuTransport, DfuEvent, ValidationException, TRANSPORT_LOGGING_LEVEL
+from nordicsemi.dfu.crc32           import Crc32Index
+from nordicsemi.dfu.firmware_source import FirmwareSource
+from nordicsemi.dfu.pacing          import select_pacing, NoPacing
+from nordicsemi.dfu.rtt             import RttEstimator
+from nordicsemi.lister.device_lister import DeviceLister
+from nordicsemi.lister.device_watcher import DeviceWatcher
 
 logger = logging.getLogger(__name__)
 
@@ -57,24 +68,40 @@ class Slip:
     SLIP_BYTE_ESC_END         = 0o334
     SLIP_BYTE_ESC_ESC         = 0o335
 
+    FRAME_END                 = bytes([SLIP_BYTE_END])
+    FRAME_ESC                 = bytes([SLIP_BYTE_ESC])
+    ESCAPED_END               = bytes([SLIP_BYTE_ESC, SLIP_BYTE_ESC_END])
+    ESCAPED_ESC               = bytes([SLIP_BYTE_ESC, SLIP_BYTE_ESC_ESC])
+
     SLIP_STATE_DECODING                 = 1
     SLIP_STATE_ESC_RECEIVED             = 2
     SLIP_STATE_CLEARING_INVALID_PACKET  = 3
 
     @staticmethod
     def encode(data):
-        newData = []
-        for elem in data:
-            if elem == Slip.SLIP_BYTE_END:
-                newData.append(Slip.SLIP_BYTE_ESC)
-                newData.append(Slip.SLIP_BYTE_ESC_END)
-            elif elem == Slip.SLIP_BYTE_ESC:
-                newData.append(Slip.SLIP_BYTE_ESC)
-                newData.append(Slip.SLIP_BYTE_ESC_ESC)
-            else:
-                newData.append(elem)
-        newData.append(Slip.SLIP_BYTE_END)
-        return newData
+        """
+        Compatibility wrapper around encode_bytes returning the encoded frame as a list of ints.
+
+        :param data: Frame payload as bytes, bytearray or an iterable of ints.
+        :return list: SLIP encoded frame including the terminating END byte.
+        """
+        return list(Slip.encode_bytes(data))
+
+    @staticmethod
+    def encode_bytes(data):
+        """
+        SLIP encodes data using bulk escape substitution.
+
+        ESC bytes have to be escaped before END bytes, otherwise the ESC of every escaped END
+        would be escaped a second time.
+
+        :param data: Frame payload as bytes, bytearray, memoryview or an iterable of ints.
+        :return bytes: SLIP encoded frame including the terminating END byte.
+        """
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        return data.replace(Slip.FRAME_ESC, Slip.ESCAPED_ESC) \
+                          .replace(Slip.FRAME_END, Slip.ESCAPED_END) + Slip.FRAME_END
 
     @staticmethod
     def decode_add_byte(c, decoded_data, current_state):
@@ -102,13 +129,137 @@ class Slip:
 
         return (finished, current_state, decoded_data)
 
+class SlipDecoder:
+    """
+    Incremental SLIP decoder splitting all complete frames out of a chunk of received bytes.
+
+    Bytes following the last END of a chunk are kept and completed by the next call to feed.
+    Invalid escape sequences are handled like in Slip.decode_add_byte: the packet is dropped
+    and everything up to the next END byte is discarded.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.state  = Slip.SLIP_STATE_DECODING
+
+    def reset(self):
+        """
+        Drops a partially received packet. The rest of it is discarded up to the next END byte.
+        """
+        if self.buffer:
+            self.state = Slip.SLIP_STATE_CLEARING_INVALID_PACKET
+        self.buffer.clear()
+
+    def feed(self, data):
+        """
+        Adds received bytes to the decoder.
+
+        :param data: Received bytes.
+        :return list: Decoded frames completed by data, as bytes. Empty frames are skipped.
+        """
+        self.buffer += data
+        if Slip.SLIP_BYTE_END not in data:
+            return []
+
+        raw_frames  = self.buffer.split(Slip.FRAME_END)
+        self.buffer = raw_frames.pop()
+
+        frames = []
+        for raw in raw_frames:
+            if self.state == Slip.SLIP_STATE_CLEARING_INVALID_PACKET:
+                self.state = Slip.SLIP_STATE_DECODING
+                continue
+
+            frame = SlipDecoder.unescape(raw)
+            if frame is None:
+                if raw.endswith(Slip.FRAME_ESC) and SlipDecoder.unescape(raw[:-1]) is not None:
+                    # The END byte was consumed as an invalid escaped byte
+                    # and the packet continues until the next END byte.
+                    self.state = Slip.SLIP_STATE_CLEARING_INVALID_PACKET
+            elif frame:
+                frames.append(frame)
+        return frames
+
+    @staticmethod
+    def unescape(raw):
+        """
+        Decodes the escape sequences of a single frame.
+
+        :param raw: Received bytes of a frame, without the terminating END byte.
+        :return bytes: Decoded frame or None if it contains an invalid escape sequence.
+        """
+        escapes = raw.count(Slip.FRAME_ESC)
+        if escapes == 0:
+            return bytes(raw)
+
+        if escapes != raw.count(Slip.ESCAPED_END) + raw.count(Slip.ESCAPED_ESC):
+            return None
+
+        return bytes(raw.replace(Slip.ESCAPED_END, Slip.FRAME_END)
+                        .replace(Slip.ESCAPED_ESC, Slip.FRAME_ESC))
+
 class DFUAdapter:
-    def __init__(self, serial_port):
+    READ_CHUNK_SIZE  = 4096
+    READ_TIMEOUT     = 0.05  # Serial port read timeout, set once: response deadlines are kept by get_message
+    WRITE_BLOCK_SIZE = 4096  # Size of the tty write buffer on Linux
+    MAX_QUEUED_SIZE  = 4 * WRITE_BLOCK_SIZE
+
+    def __init__(self, serial_port, write_block_size=WRITE_BLOCK_SIZE):
         self.serial_port = serial_port
+        self.decoder     = SlipDecoder()
+        self.frames      = deque()
+        self.receiver    = None
+        self.tx_buffer   = bytearray()
+        self.write_block_size = write_block_size
+
+    def send_packet(self, packet):
+        """
+        Writes SLIP encoded frames to the serial port, after any queued messages.
+
+        :param packet: One or more SLIP encoded frames as a bytes-like object.
+        :return int: Number of bytes written to the port.
+        """
+        if self.tx_buffer:
+            self.tx_buffer += packet
+            self.flush()
+        else:
+            self.__write(packet)
+        return len(packet)
+
+    def queue_packet(self, packet):
+        """
+        Queues SLIP encoded frames to be written together with the following ones.
+
+        Queued frames are written in blocks of at least write_block_size bytes. While the OS
+        still has a full block waiting to go out, frames keep being collected, up to
+        MAX_QUEUED_SIZE bytes, so they are handed over in a single larger write. Queued frames
+        are flushed before any frame is sent with send_packet or received with get_message.
+
+        :param packet: One or more SLIP encoded frames as a bytes-like object.
+        :return int: Number of bytes queued.
+        """
+        self.tx_buffer += packet
+        if len(self.tx_buffer) >= self.write_block_size:
+            if (len(self.tx_buffer) >= DFUAdapter.MAX_QUEUED_SIZE
+                    or self.__out_waiting() < self.write_block_size):
+                self.flush()
+        return len(packet)
+
+    def flush(self):
+        """
+        Writes all queued messages to the serial port.
+        """
+        if self.tx_buffer:
+            self.__write(self.tx_buffer)
+            self.tx_buffer = bytearray()
+
+    def __out_waiting(self):
+        try:
+            return self.serial_port.out_waiting
+        except (AttributeError, NotImplementedError, SerialException):
+            return 0
 
-    def send_message(self, data):
-        packet = Slip.encode(data)
-        #logger.debug('SLIP: --> ' + str(data))
+    def __write(self, packet):
         try:
             self.serial_port.write(packet)
         except SerialException as e:
@@ -116,34 +267,349 @@ class DFUAdapter:
                               'If MSD is enabled on the target device, try to disable it ref. '
                               'https://wiki.segger.com/index.php?title=J-Link-OB_SAM3U')
 
-    def get_message(self):
-        current_state = Slip.SLIP_STATE_DECODING
-        finished = False
-        decoded_data = []
-
-        while finished == False:
-            byte = self.serial_port.read(1)
-            if byte:
-                (byte) = struct.unpack('B', byte)[0]
-                (finished, current_state, decoded_data) \
-                   = Slip.decode_add_byte(byte, decoded_data, current_state)
-            else:
-                current_state = Slip.SLIP_STATE_CLEARING_INVALID_PACKET
+    def start_receiver(self):
+        """
+        Hands reading over to a SerialReceiver thread draining the port in the background.
+        """
+        self.receiver = SerialReceiver(self.serial_port, self.decoder, self.frames)
+        self.frames   = deque()
+        self.receiver.start()
+
+    def stop_receiver(self):
+        if self.receiver is not None:
+            self.receiver.stop()
+            self.receiver = None
+
+    def poll_message(self, opcode=None):
+        """
+        Returns the next received SLIP frame if it was already received, without waiting.
+
+        :param int opcode: Request opcode of the response to return. Only used with a receiver.
+        :return bytes: Decoded frame or None if no frame is available yet.
+        """
+        if self.receiver is not None:
+            return self.receiver.get(opcode)
+
+        if not self.frames:
+            size = min(self.serial_port.in_waiting, DFUAdapter.READ_CHUNK_SIZE)
+            if size:
+                self.frames.extend(self.decoder.feed(self.serial_port.read(size)))
+        return self.frames.popleft() if self.frames else None
+
+    def get_message(self, opcode=None, timeout=None):
+        """
+        Returns the next received SLIP frame.
+
+        Reads everything already buffered by the serial port, up to READ_CHUNK_SIZE bytes at a
+        time, instead of a single byte per read. Frames completed by the same read are queued
+        for the next calls.
+
+        The port keeps its read timeout: timeout is a deadline for the whole response, checked
+        between reads, so the port settings are not changed for every response. With a receiver
+        thread running, the frame is taken from its queue instead.
+
+        :param int opcode: Request opcode of the response to return. Only used with a receiver.
+        :param float timeout: Seconds to wait for the response, by default the read timeout of the port.
+        :return bytes: Decoded frame or None if nothing was received before the deadline.
+        """
+        self.flush()
+        if self.receiver is not None:
+            frame = self.receiver.get(opcode, timeout)
+            if frame is None:
+                logger.error('get_message empty! nothing received!')
+            return frame
+
+        deadline = time.monotonic() + (timeout if timeout is not None else self.serial_port.timeout or 0)
+        while not self.frames:
+            size = min(max(self.serial_port.in_waiting, 1), DFUAdapter.READ_CHUNK_SIZE)
+            data = self.serial_port.read(size)
+            if data:
+                self.frames.extend(self.decoder.feed(data))
+            elif time.monotonic() >= deadline:
+                self.decoder.reset()
                 logger.error('get_message empty! nothing received!')
                 return None
 
         #logger.debug('SLIP: <-- ' + str(decoded_data))
 
-        return decoded_data
+        return self.frames.popleft()
 
-class DfuTransportSerial(DfuTransport):
+class SerialReceiver(threading.Thread):
+    """
+    Background thread continuously draining the serial port into decoded SLIP frames.
 
-    DEFAULT_BAUD_RATE = 115200
-    DEFAULT_FLOW_CONTROL = True
-    DEFAULT_TIMEOUT = 30.0  # Timeout time for board response
-    DEFAULT_SERIAL_PORT_TIMEOUT = 1.0  # Timeout time on serial port read
-    DEFAULT_PRN                 = 0
-    DEFAULT_DO_PING = True
+    Frames are queued in the order they arrive and handed out per response opcode, so a
+    sender can keep writing while responses come in and pick them up with a deadline.
+    """
+
+    READ_TIMEOUT = DFUAdapter.READ_TIMEOUT  # Also bounds the time needed to stop the thread
+
+    def __init__(self, serial_port, decoder, frames=()):
+        super().__init__(name='dfu-serial-receiver', daemon=True)
+        self.serial_port = serial_port
+        self.decoder     = decoder
+        self.frames      = deque(frames)
+        self.condition   = threading.Condition()
+        self.running     = False
+        self.error       = None
+
+    def start(self):
+        if self.serial_port.timeout != SerialReceiver.READ_TIMEOUT:
+            self.serial_port.timeout = SerialReceiver.READ_TIMEOUT
+        self.running = True
+        super().start()
+
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        while self.running:
+            try:
+                size = min(max(self.serial_port.in_waiting, 1), DFUAdapter.READ_CHUNK_SIZE)
+                data = self.serial_port.read(size)
+            except (SerialException, OSError, TypeError) as e:
+                # pyserial raises TypeError when the port is closed while reading
+                with self.condition:
+                    self.error = e
+                    self.condition.notify_all()
+                return
+
+            if data:
+                frames = self.decoder.feed(data)
+                if frames:
+                    with self.condition:
+                        self.frames.extend(frames)
+                        self.condition.notify_all()
+
+    def get(self, opcode=None, timeout=None):
+        """
+        Returns the oldest received frame answering opcode.
+
+        :param int opcode: Request opcode of the response to return, None for any frame.
+        :param float timeout: Seconds to wait for the frame, None to only return a queued one.
+        :return bytes: Decoded frame or None if none was received before the deadline.
+        """
+        deadline = time.monotonic() + (timeout or 0)
+        with self.condition:
+            while True:
+                for frame in self.frames:
+                    if opcode is None or (len(frame) > 1 and frame[1] == opcode):
+                        self.frames.remove(frame)
+                        return frame
+
+                if self.error is not None:
+                    raise Exception('Reading from serial port failed: {}'.format(self.error))
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+class TransferPlan:
+    """
+    WriteObject frames of an image, SLIP encoded ahead of time, with the offset and CRC32 the
+    target reports after each of them.
+
+    The image is split into objects of max_size bytes and every object into frames sized for the
+    MTU, exactly as the transport streams them. All frames are stored back to back in a single
+    buffer, so any run of frames is written as one slice of it. The plan keeps a view of the
+    image instead of a copy. A plan only depends on the image and on the max_size and MTU of the
+    targets: for_image builds it once and shares it between all transports flashing that image.
+    Plans are read-only once built, can be used from several threads, and can be pickled to other
+    processes.
+    """
+
+    CACHE_BYTES = 16 * 1024 * 1024     # Images and frame buffers kept for reuse
+
+    __cache       = OrderedDict()
+    __cache_bytes = 0
+    __lock        = threading.Lock()
+
+    def __init__(self, data, max_size, mtu, offset=0, crc=0):
+        """
+        :param data: Image as a bytes-like object, which must not be modified while the plan is used.
+        :param int max_size: Maximum object size of the target.
+        :param int mtu: MTU reported by the target with GetSerialMTU.
+        :param int offset: Offset of data in the image, when planning the rest of an object.
+        :param int crc: CRC32 of the image up to offset.
+        """
+        self.data      = memoryview(data).cast('B')
+        self.max_size  = max_size
+        self.mtu       = mtu
+        self.offset    = offset
+
+        self.frame_ends    = array('I')     # End of every frame in encoded
+        self.frame_offsets = array('I')     # Image offset reached by every frame
+        self.frame_crcs    = array('I')     # CRC32 of the image up to frame_offsets
+        self.object_frames = array('I')     # First frame of every object, then the number of frames
+        self.checkpoints   = [crc]          # CRC32 of the image at every object boundary
+        self.crc_index     = None
+
+        opcode  = bytes([DfuSerialProtocol.OP_CODE['WriteObject']])
+        encoded = bytearray()
+        view    = self.data
+        frame   = DfuSerialProtocol.frame_payload_size(mtu)
+        for start in range(0, max(len(view), 1), max_size):
+            self.object_frames.append(len(self.frame_ends))
+            data = view[start:start + max_size]
+            i = 0
+            while i < len(data):
+                size    = min(frame, len(data) - i)
+                payload = data[i:i + size]
+                encoded += Slip.encode_bytes(opcode + payload)
+                crc      = binascii.crc32(payload, crc) & 0xFFFFFFFF
+                i       += size
+                self.frame_ends.append(len(encoded))
+                self.frame_offsets.append(offset + start + i)
+                self.frame_crcs.append(crc)
+            self.checkpoints.append(crc)
+        self.object_frames.append(len(self.frame_ends))
+        self.encoded = bytes(encoded)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['data']      = bytes(self.data)
+        state['crc_index'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.data = memoryview(self.data)
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    def read(self, offset, size):
+        """ Returns size bytes of the image from offset, as a FirmwareSource does. """
+        start = offset - self.offset
+        return self.data[start:start + size]
+
+    @property
+    def object_count(self):
+        return len(self.object_frames) - 1
+
+    def object_offset(self, index):
+        return self.offset + index * self.max_size
+
+    def object_size(self, index):
+        return len(self.data[index * self.max_size:(index + 1) * self.max_size])
+
+    def frames(self, first, last):
+        """
+        Returns the encoded frames first to last, excluded, as a slice of the frame buffer.
+        """
+        start = self.frame_ends[first - 1] if first else 0
+        return memoryview(self.encoded)[start:self.frame_ends[last - 1]]
+
+    def crc_at(self, offset):
+        """
+        Returns the CRC32 of the image up to offset, extended from the object boundary below it.
+
+        :param int offset: Image offset, from the offset of the plan to the end of its data.
+        """
+        if self.crc_index is None:
+            self.crc_index = Crc32Index(self.data, self.max_size, self.checkpoints)
+        return self.crc_index.crc_at(offset - self.offset)
+
+    def matches(self, max_size, mtu):
+        return self.offset == 0 and self.max_size == max_size and self.mtu == mtu
+
+    @staticmethod
+    def for_image(data, max_size, mtu):
+        """
+        Returns the plan of a whole image, reusing the plan built for the same image.
+
+        Images are matched by identity, e.g. the image returned by a PackageReader to all the
+        DFUs of a batch: the cache holds a reference to the image, which therefore cannot be
+        modified while it is cached. The plan of an image is only built once, even when several
+        threads ask for it at the same time. The most recently used plans are kept as long as
+        they and their images add up to at most CACHE_BYTES, larger images are planned for each
+        transfer.
+
+        :param data: Image as a bytes-like object.
+        :param int max_size: Maximum object size of the target.
+        :param int mtu: MTU reported by the target.
+        :return TransferPlan: Plan of data.
+        """
+        # The frame buffer is about the size of the image, plus SLIP escapes and frame headers
+        size = 2 * memoryview(data).nbytes
+        if size > TransferPlan.CACHE_BYTES:
+            return TransferPlan(data, max_size, mtu)
+
+        key = (id(data), max_size, mtu)
+
+        with TransferPlan.__lock:
+            (image, pending, _) = TransferPlan.__cache.get(key, (None, None, 0))
+            if pending is None or image is not data:
+                TransferPlan.__evict(key)
+                pending = Future()
+                TransferPlan.__cache[key]   = (data, pending, size)
+                TransferPlan.__cache_bytes += size
+                build   = True
+            else:
+                TransferPlan.__cache.move_to_end(key)
+                build   = False
+            while TransferPlan.__cache_bytes > TransferPlan.CACHE_BYTES:
+                TransferPlan.__evict(next(iter(TransferPlan.__cache)))
+
+        if build:
+            try:
+                pending.set_result(TransferPlan(data, max_size, mtu))
+            except Exception as e:
+                with TransferPlan.__lock:
+                    if TransferPlan.__cache.get(key, (None, None, 0))[1] is pending:
+                        TransferPlan.__evict(key)
+                pending.set_exception(e)
+
+        return pending.result()
+
+    @staticmethod
+    def __evict(key):
+        """ Drops a plan from the cache, with the lock held. """
+        entry = TransferPlan.__cache.pop(key, None)
+        if entry is not None:
+            TransferPlan.__cache_bytes -= entry[2]
+
+class DfuSerialProtocol:
+    """
+    State machine of the serial DFU protocol, shared by DfuTransportSerial and
+    DfuTransportSerialAsync.
+
+    The protocol does no I/O itself. Every operation is a generator yielding I/O requests to the
+    transport driving it. The transport performs each request on its port and sends the result
+    back into the generator, or throws the exception the request raised into it. The value the
+    generator returns is the result of the operation. Requests are tuples:
+
+        (SEND, packet)              Write SLIP encoded frames, after any queued ones.
+                                    Result: number of bytes written.
+        (QUEUE, packet)             Queue SLIP encoded frames, written in blocks.
+                                    Result: number of bytes queued.
+        (RECEIVE, opcode, timeout)  Write the queued frames, then wait up to timeout seconds for
+                                    the response to opcode. Result: frame, or None.
+        (POLL, opcode)              Result: response to opcode if already received, or None.
+        (SLEEP, delay)              Wait delay seconds.
+        (REOPEN, timeout)           Close the port and open it again as soon as it is back.
+    """
+
+    SEND    = 'send'
+    QUEUE   = 'queue'
+    RECEIVE = 'receive'
+    POLL    = 'poll'
+    SLEEP   = 'sleep'
+    REOPEN  = 'reopen'
+
+    DEFAULT_RESPONSE_TIMEOUT = 1.0  # Response timeout until the round-trip time is measured
+    RETRIES_NUMBER      = 3     # Attempts to send an object failing CRC or offset validation
+    PING_INTERVAL       = 0.01  # First Ping response timeout while waiting for the bootloader,
+    MAX_PING_INTERVAL   = 0.2   # doubled after every unanswered Ping up to MAX_PING_INTERVAL
+    RESET_TIMEOUT       = 0.25  # Time for the target to reset after activating an image
+    RESET_PROBE_TIMEOUT = 0.05  # Ping response timeout while probing for that reset
+    FLASH_PAGE_SIZE     = 4096  # Unit of flash work scaling the CreateObject and Execute deadlines
+    PRN_CHECKSUM        = 'PRN'  # Round-trip time estimate of the checksum responses to PRN
+    BITS_PER_BYTE       = 10    # Start, 8 data and stop bits of a byte on the wire
 
     OP_CODE = {
         'CreateObject'          : 0x01,
@@ -158,77 +624,128 @@ class DfuTransportSerial(DfuTransport):
         'Response'              : 0x60,
     }
 
-    def __init__(self,
-                 com_port,
-                 baud_rate=DEFAULT_BAUD_RATE,
-                 flow_control=DEFAULT_FLOW_CONTROL,
-                 timeout=DEFAULT_TIMEOUT,
-                 prn=DEFAULT_PRN,
-                 do_ping=DEFAULT_DO_PING):
-
-        #super(DfuTransportSerial, self).__init__() #python2
-        super().__init__()
-        self.com_port = com_port
-        self.baud_rate = baud_rate
-        self.flow_control = 1 if flow_control else 0
-        self.timeout = timeout
+    def __init__(self, timeout, baud_rate, prn, do_ping, pacing, coalesce, prn_window, dfu_start, send_event):
+        """
+        :param float timeout: Deadline of the session setup, and longest response timeout.
+        :param int baud_rate: Baud rate of the port, None if the data is not paced by the line.
+        :param int prn: Packet Receipt Notification interval, 0 to disable.
+        :param bool do_ping: Wait for the bootloader to answer a Ping before the session setup.
+        :param pacing: Frame pacing, see nordicsemi.dfu.pacing.
+        :param bool coalesce: Coalesce WriteObject frames, None to coalesce unpaced frames.
+        :param int prn_window: PRN intervals in flight before waiting for the oldest checksum.
+        :param str dfu_start: Text making the application reset into the bootloader, or None.
+        :param send_event: Called with the event_type and arguments of the progress events.
+        """
+        self.timeout     = timeout
         self.prn         = prn
-        self.serial_port = None
-        self.dfu_adapter = None
-        self.ping_id     = 0
         self.do_ping     = do_ping
+        self.pacing      = pacing
+        self.coalesce    = coalesce if coalesce is not None else pacing.name == NoPacing.name
+        self.prn_window  = max(prn_window, 1)
+        self.dfu_start   = dfu_start
+        self.send_event  = send_event
+        self.baud_rate   = baud_rate
+        self.rtt         = RttEstimator(DfuSerialProtocol.DEFAULT_RESPONSE_TIMEOUT, max_timeout=timeout)
+        self.ping_id     = 0
+        self.written     = 0            # Bytes of WriteObject frames sent so far
+        self.acknowledged = 0           # Bytes written before the last request answered
+        self.entry_latency = None       # Seconds from the DFU start text to the first Ping response
 
         self.mtu         = 0
+        self.stats       = {'objects': 0, 'frames': 0, 'payload_bytes': 0, 'wire_bytes': 0}
 
-        """:type: serial.Serial """
-
-    def send_text_message(self, text, flow_control = None):
-        if not text: # nothing to send
-            return
-
-        logger.debug("Serial: send_text_message [%s]" % text)
-        if self.serial_port is None:
+    def open(self):
+        """
+        Sets the session up on a newly opened port.
+        """
+        if self.dfu_start:
+            yield from self.__enter_bootloader()
+        elif self.do_ping:
+            yield from self.__wait_for_bootloader(self.timeout)
+
+        yield from self.__set_prn()
+        yield from self.__get_mtu()
+
+    def wait_for_reset(self, timeout=RESET_TIMEOUT):
+        """
+        Probes the target with Ping requests after an image was activated, keeping the port open.
+
+        A target resetting after a SoftDevice or bootloader update stops answering, or its port
+        goes away: the session is then re-established as soon as the bootloader answers again.
+        A target still answering after timeout seconds stayed in the bootloader.
+
+        :param float timeout: Time given to the target to reset.
+        :return bool: True if the target reset and the session was re-established.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
             try:
-                flow_control = flow_control if flow_control is not None else self.flow_control
-                serial = Serial(port=self.com_port,
-                                baudrate=self.baud_rate, rtscts=flow_control, timeout=self.timeout)
-                serial.write(text.encode('utf-8'))
-                serial.close()
+                answered = yield from self.__ping(DfuSerialProtocol.RESET_PROBE_TIMEOUT)
             except Exception as e:
-                logger.exception('send_text_message')
-                raise Exception("Serial port could not be opened on {0}. Reason: {1}".format(self.com_port, e))
-        else:
-            self.serial_port.write(text.encode('utf-8'))
+                logger.debug("Serial: Port lost after activation: {}".format(e))
+                answered = False
 
-    def open(self):
-        super().open()
-        try:
-            self.serial_port = Serial(port=self.com_port,
-                baudrate=self.baud_rate, rtscts=self.flow_control, timeout=self.DEFAULT_SERIAL_PORT_TIMEOUT)
-            self.dfu_adapter = DFUAdapter(self.serial_port)
-        except OSError as e:
-            raise Exception("Serial port could not be opened on {0}"
-              ". Reason: {1}".format(self.com_port, e.strerror))
+            if not answered:
+                break
+            if time.monotonic() >= deadline:
+                logger.debug("Serial: Target stayed in the bootloader, keeping the session")
+                return False
+            yield (DfuSerialProtocol.SLEEP, DfuSerialProtocol.PING_INTERVAL)
 
-        if self.do_ping:
-            ping_success = False
-            start = datetime.now()
-            while (datetime.now() - start < timedelta(seconds=self.timeout)
-                    and ping_success == False):
-                if self.__ping() == True:
-                    ping_success = True
+        logger.info("Serial: Target reset after activation, waiting for the bootloader")
+        pings = yield from self.__wait_for_bootloader(self.timeout)
+        logger.debug("Serial: Bootloader answered after {} pings".format(pings))
+        yield from self.__set_prn()
+        yield from self.__get_mtu()
+        return True
 
-            if ping_success == False:
-                raise Exception("No ping response after opening COM port")
+    def __enter_bootloader(self):
+        """
+        Sends the DFU start text to the application once, then waits for the bootloader to answer.
 
-        self.__set_prn()
-        self.__get_mtu()
+        The port is kept open when the bootloader shares it with the application. If the target
+        re-enumerates, the port is opened again as soon as it is back.
+        """
+        (text, self.dfu_start) = (self.dfu_start, None)
 
-    def close(self):
-        super().close()
-        self.serial_port.close()
+        logger.debug("Serial: send_text_message [%s]" % text)
+        start = time.monotonic()
+        yield (DfuSerialProtocol.SEND, text.encode('utf-8'))
+
+        pings = yield from self.__wait_for_bootloader(self.timeout)
+        self.entry_latency = time.monotonic() - start
+        logger.info("Serial: Bootloader answered {:.0f} ms after the DFU start text, {} pings"
+                    .format(self.entry_latency * 1000, pings))
+
+    def __wait_for_bootloader(self, timeout):
+        """
+        Pings the target until the bootloader answers, waiting longer after each unanswered Ping.
+
+        :param float timeout: Overall deadline in seconds.
+        :return int: Number of Ping requests sent.
+        """
+        deadline = time.monotonic() + timeout
+        interval = DfuSerialProtocol.PING_INTERVAL
+        pings    = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise Exception("No ping response after opening COM port")
+
+            pings += 1
+            try:
+                if (yield from self.__ping(min(interval, remaining))):
+                    break
+            except Exception as e:
+                # The port goes away while the target re-enumerates
+                logger.debug("Serial: Port lost while waiting for the bootloader: {}".format(e))
+                yield (DfuSerialProtocol.REOPEN, deadline - time.monotonic())
+            interval = min(interval * 2, DfuSerialProtocol.MAX_PING_INTERVAL)
+        return pings
 
     def send_init_packet(self, init_packet):
+        init_packet = memoryview(init_packet)
+
         def try_to_recover():
             if response['offset'] == 0 or response['offset'] > len(init_packet):
                 # There is no init packet or present init packet is too long.
@@ -243,183 +760,196 @@ class DfuTransportSerial(DfuTransport):
             if len(init_packet) > response['offset']:
                 # Send missing part.
                 try:
-                    self.__stream_data(data     = init_packet[response['offset']:],
-                                       crc      = expected_crc,
-                                       offset   = response['offset'])
+                    yield from self.__stream_data(data        = init_packet[response['offset']:],
+                                                  object_type = 0x01,
+                                                  crc         = expected_crc,
+                                                  offset      = response['offset'])
                 except Exception:
                     return False
 
-            self.__execute()
+            yield from self.__execute_command()
             return True
 
-        response = self.__select_command()
+        response = yield from self.__select_command()
         assert len(init_packet) <= response['max_size'], 'Init command is too long'
 
-        if try_to_recover():
+        if (yield from try_to_recover()):
             return
 
-        try:
-            self.__create_command(len(init_packet))
-            self.__stream_data(data=init_packet)
-            self.__execute()
-        except Exception:
+        for r in range(DfuSerialProtocol.RETRIES_NUMBER):
+            try:
+                yield from self.__create_command(len(init_packet))
+                yield from self.__stream_data(data=init_packet, object_type=0x01)
+                yield from self.__execute_command()
+                break
+            except ValidationException as e:
+                logger.warning("Serial: Init packet validation failed: {}".format(e))
+                self.pacing.on_failure()
+            except Exception:
+                raise Exception("Failed to send init packet")
+        else:
             raise Exception("Failed to send init packet")
 
     def send_firmware(self, firmware):
+        """
+        :param firmware: Image as a bytes-like object, a TransferPlan of it, or a FirmwareSource.
+                         The frames of a plan are sent as is if it was built for the max_size and
+                         MTU of the target. A source is read and encoded one object at a time.
+        """
+        def executed_size(end, size):
+            # Executing the object ending the image makes the target validate the whole image.
+            return image.size if end >= image.size else size
+
         def try_to_recover():
             if response['offset'] == 0:
                 # Nothing to recover
                 return
 
-            expected_crc = binascii.crc32(firmware[:response['offset']]) & 0xFFFFFFFF
+            # CRCs of the image prefixes are extended from the nearest object boundary.
+            expected_crc = image.crc_at(response['offset'])
             remainder    = response['offset'] % response['max_size']
 
             if expected_crc != response['crc']:
                 # Invalid CRC. Remove corrupted data.
                 response['offset'] -= remainder if remainder != 0 else response['max_size']
-                response['crc']     = \
-                        binascii.crc32(firmware[:response['offset']]) & 0xFFFFFFFF
+                response['crc']     = image.crc_at(response['offset'])
                 return
 
-            if (remainder != 0) and (response['offset'] != len(firmware)):
+            if (remainder != 0) and (response['offset'] != image.size):
                 # Send rest of the page.
                 try:
-                    to_send             = firmware[response['offset'] : response['offset']
-                                                + response['max_size'] - remainder]
-                    response['crc']     = self.__stream_data(data   = to_send,
-                                                             crc    = response['crc'],
-                                                             offset = response['offset'])
+                    to_send             = image.read(response['offset'], response['max_size'] - remainder)
+                    response['crc']     = yield from self.__stream_data(data        = to_send,
+                                                                        object_type = 0x02,
+                                                                        crc         = response['crc'],
+                                                                        offset      = response['offset'])
                     response['offset'] += len(to_send)
                 except Exception:
                     # Remove corrupted data.
                     response['offset'] -= remainder
-                    response['crc']     = \
-                        binascii.crc32(firmware[:response['offset']]) & 0xFFFFFFFF
+                    response['crc']     = image.crc_at(response['offset'])
                     return
 
-            self.__execute()
-            self._send_event(event_type=DfuEvent.PROGRESS_EVENT, progress=response['offset'])
-
-        response = self.__select_data()
-        try_to_recover()
-        for i in range(response['offset'], len(firmware), response['max_size']):
-            data = firmware[i:i+response['max_size']]
-            try:
-                self.__create_data(len(data))
-                response['crc'] = self.__stream_data(data=data, crc=response['crc'], offset=i)
-                self.__execute()
-            except Exception:
-                raise Exception("Failed to send firmware")
-
-            self._send_event(event_type=DfuEvent.PROGRESS_EVENT, progress=len(data))
-
-    def __ensure_bootloader(self):
-        lister = DeviceLister()
-
-        device = None
-        start = datetime.now()
-        while not device and datetime.now() - start < timedelta(seconds=self.timeout):
-            time.sleep(0.5)
-            device = lister.get_device(com=self.com_port)
-
-        if device:
-            device_serial_number = device.serial_number
-
-            if not self.__is_device_in_bootloader_mode(device):
-                retry_count = 10
-                wait_time_ms = 500
-
-                trigger = DFUTrigger()
+            yield from self.__execute_data(executed_size(response['offset'], response['max_size']))
+            self.send_event(event_type=DfuEvent.PROGRESS_EVENT, progress=response['offset'])
+
+        response = yield from self.__select_data()
+        image    = self.__firmware_image(firmware, response['max_size'])
+        yield from try_to_recover()
+        for i in range(response['offset'], image.size, response['max_size']):
+            index = i // response['max_size']
+            size  = min(response['max_size'], image.size - i)
+            (plan, plan_index) = self.__object_plan(image, index, response['max_size'], response['crc'])
+            for r in range(DfuSerialProtocol.RETRIES_NUMBER):
                 try:
-                    trigger.enter_bootloader_mode(device)
-                    logger.info("Serial: DFU bootloader was triggered")
-                except Exception as err:
-                    logger.error(err)
-
-
-                for checks in range(retry_count):
-                    logger.info("Serial: Waiting {} ms for device to enter bootloader {}/{} time"\
-                    .format(500, checks + 1, retry_count))
-
-                    time.sleep(wait_time_ms / 1000.0)
-
-                    device = lister.get_device(serial_number=device_serial_number)
-                    if self.__is_device_in_bootloader_mode(device):
-                        self.com_port = device.get_first_available_com_port()
-                        break
-
-                trigger.clean()
-            if not self.__is_device_in_bootloader_mode(device):
-                logger.info("Serial: Device is either not in bootloader mode, or using an unsupported bootloader.")
-
-    def __is_device_in_bootloader_mode(self, device):
-        if not device:
-            return False
+                    yield from self.__create_data(size)
+                    crc = yield from self.__stream_object(plan, plan_index, 0x02)
+                    yield from self.__execute_data(executed_size(i + size, size))
+                    break
+                except ValidationException as e:
+                    logger.warning("Serial: Object at offset {} failed validation: {}".format(i, e))
+                    self.pacing.on_failure()
+                except Exception:
+                    raise Exception("Failed to send firmware")
+            else:
+                raise Exception("Failed to send firmware")
 
-        #  Return true if nrf bootloader or Jlink interface detected.
-        return ((device.vendor_id.lower() == '1915' and device.product_id.lower() == '521f') # nRF52 SDFU USB
-             or (device.vendor_id.lower() == '1366' and device.product_id.lower() == '0105') # JLink CDC UART Port
-             or (device.vendor_id.lower() == '1366' and device.product_id.lower() == '1015'))# JLink CDC UART Port (MSD)
+            response['crc'] = crc
+            self.pacing.on_success()
+            self.send_event(event_type=DfuEvent.PROGRESS_EVENT, progress=size)
+
+    def __firmware_image(self, firmware, max_size):
+        if isinstance(firmware, FirmwareSource):
+            return firmware
+        if isinstance(firmware, TransferPlan):
+            if firmware.matches(max_size, self.mtu):
+                return firmware
+            firmware = firmware.data
+        return TransferPlan.for_image(firmware, max_size, self.mtu)
+
+    def __object_plan(self, image, index, max_size, crc):
+        """
+        Returns the plan holding an object of the image and the index of the object in it.
+
+        The objects of a FirmwareSource are read and planned one at a time, extending crc,
+        the CRC32 of the image up to the object.
+        """
+        if isinstance(image, TransferPlan):
+            return image, index
+        offset = index * max_size
+        return TransferPlan(image.read(offset, max_size), max_size, self.mtu, offset, crc), 0
 
     def __set_prn(self):
         logger.debug("Serial: Set Packet Receipt Notification {}".format(self.prn))
-        self.dfu_adapter.send_message([DfuTransportSerial.OP_CODE['SetPRN']]
-            + list(struct.pack('<H', self.prn)))
-            
-        response = self.__get_response(DfuTransportSerial.OP_CODE['SetPRN'])
+        yield (DfuSerialProtocol.SEND, Slip.encode_bytes(struct.pack('<BH', DfuSerialProtocol.OP_CODE['SetPRN'], self.prn)))
+
+        response = yield from self.__get_response(DfuSerialProtocol.OP_CODE['SetPRN'])
         logger.debug("Serial: SetPRN response: {}".format(response))
 
     def __get_mtu(self):
-        self.dfu_adapter.send_message([DfuTransportSerial.OP_CODE['GetSerialMTU']])
-        response = self.__get_response(DfuTransportSerial.OP_CODE['GetSerialMTU'])
-        
+        yield (DfuSerialProtocol.SEND, Slip.encode_bytes(bytes([DfuSerialProtocol.OP_CODE['GetSerialMTU']])))
+        response = yield from self.__get_response(DfuSerialProtocol.OP_CODE['GetSerialMTU'])
+
         logger.debug("Serial: GetSerialMTU response: {}".format(response))
-        
+
         if response != None:
             self.mtu = struct.unpack('<H', bytearray(response))[0]
 
-    def __ping(self):
+    def __ping(self, timeout=None):
+        """
+        :param float timeout: Seconds to wait for the response, by default the response timeout.
+        :return bool: True if the bootloader answered.
+        """
         self.ping_id = (self.ping_id + 1) % 256
+        start        = time.monotonic()
+        deadline     = start + (timeout or self.rtt.timeout(DfuSerialProtocol.OP_CODE['Ping']))
+
+        yield (DfuSerialProtocol.SEND, Slip.encode_bytes(bytes([DfuSerialProtocol.OP_CODE['Ping'], self.ping_id])))
+        while True:
+            # Receive raw response to check return code
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            resp = yield (DfuSerialProtocol.RECEIVE, DfuSerialProtocol.OP_CODE['Ping'], remaining)
 
-        self.dfu_adapter.send_message([DfuTransportSerial.OP_CODE['Ping'], self.ping_id])
-        resp = self.dfu_adapter.get_message() # Receive raw response to check return code
+            if not resp:
+                logger.debug('Serial: No ping response')
+                return False
 
-        if not resp:
-            logger.debug('Serial: No ping response')
-            return False
+            if resp[0] != DfuSerialProtocol.OP_CODE['Response']:
+                # Output of the application, or a frame cut by the reset
+                logger.debug('Serial: No Response: 0x{:02X}'.format(resp[0]))
+                continue
 
-        if resp[0] != DfuTransportSerial.OP_CODE['Response']:
-            logger.debug('Serial: No Response: 0x{:02X}'.format(resp[0]))
-            return False
+            if resp[1] != DfuSerialProtocol.OP_CODE['Ping']:
+                logger.debug('Serial: Unexpected Executed OP_CODE.\n' \
+                    + 'Expected: 0x{:02X} Received: 0x{:02X}'.format(DfuSerialProtocol.OP_CODE['Ping'], resp[1]))
+                continue
 
-        if resp[1] != DfuTransportSerial.OP_CODE['Ping']:
-            logger.debug('Serial: Unexpected Executed OP_CODE.\n' \
-                + 'Expected: 0x{:02X} Received: 0x{:02X}'.format(DfuTransportSerial.OP_CODE['Ping'], resp[1]))
-            return False
+            if resp[2] != DfuTransport.RES_CODE['Success']:
+                # Returning an error code is seen as good enough. The bootloader is up and running
+                return True
 
-        if resp[2] != DfuTransport.RES_CODE['Success']:
-            # Returning an error code is seen as good enough. The bootloader is up and running
-            return True
-        else:
             if struct.unpack('B', bytearray(resp[3:]))[0] == self.ping_id:
+                self.rtt.sample(DfuSerialProtocol.OP_CODE['Ping'], time.monotonic() - start)
                 return True
-            else:
-                return False
+            # Late response to an earlier Ping, the response to this one follows
 
     def __create_command(self, size):
-        self.__create_object(0x01, size)
+        yield from self.__create_object(0x01, size)
 
     def __create_data(self, size):
-        self.__create_object(0x02, size)
+        yield from self.__create_object(0x02, size)
 
     def __create_object(self, object_type, size):
-        self.dfu_adapter.send_message([DfuTransportSerial.OP_CODE['CreateObject'], object_type]\
-                                            + list(struct.pack('<L', size)))
-        self.__get_response(DfuTransportSerial.OP_CODE['CreateObject'])
+        op_code = DfuSerialProtocol.OP_CODE['CreateObject']
+        yield (DfuSerialProtocol.SEND, Slip.encode_bytes(struct.pack('<BBL', op_code, object_type, size)))
+        yield from self.__get_response(op_code, (op_code, object_type), self.__flash_pages(object_type, size))
 
-    def __calculate_checksum(self):
-        self.dfu_adapter.send_message([DfuTransportSerial.OP_CODE['CalcChecSum']])
-        response = self.__get_response(DfuTransportSerial.OP_CODE['CalcChecSum'])
+    def __calculate_checksum(self, object_type):
+        op_code = DfuSerialProtocol.OP_CODE['CalcChecSum']
+        yield (DfuSerialProtocol.SEND, Slip.encode_bytes(bytes([op_code])))
+        response = yield from self.__get_response(op_code, (op_code, object_type))
 
         if response is None:
             raise Exception('Did not receive checksum response from DFU target. '
@@ -429,76 +959,231 @@ class DfuTransportSerial(DfuTransport):
         (offset, crc) = struct.unpack('<II', bytearray(response))
         return {'offset': offset, 'crc': crc}
 
-    def __execute(self):
-        self.dfu_adapter.send_message([DfuTransportSerial.OP_CODE['Execute']])
-        self.__get_response(DfuTransportSerial.OP_CODE['Execute'])
+    def __execute_command(self):
+        yield from self.__execute_object(0x01, 0)
+
+    def __execute_data(self, size):
+        yield from self.__execute_object(0x02, size)
+
+    def __execute_object(self, object_type, size):
+        op_code = DfuSerialProtocol.OP_CODE['Execute']
+        yield (DfuSerialProtocol.SEND, Slip.encode_bytes(bytes([op_code])))
+        response = yield from self.__get_response(op_code, (op_code, object_type), self.__flash_pages(object_type, size))
+
+        if response is None:
+            raise Exception('Did not receive execute response from DFU target.')
+
+    @staticmethod
+    def __flash_pages(object_type, size):
+        """ Returns the units of flash work done by the target to create or execute an object. """
+        if object_type != 0x02:
+            return 1
+        return max((size + DfuSerialProtocol.FLASH_PAGE_SIZE - 1) // DfuSerialProtocol.FLASH_PAGE_SIZE, 1)
 
     def __select_command(self):
-        return self.__select_object(0x01)
+        return (yield from self.__select_object(0x01))
 
     def __select_data(self):
-        return self.__select_object(0x02)
+        return (yield from self.__select_object(0x02))
 
     def __select_object(self, object_type):
         logger.debug("Serial: Selecting Object: type:{}".format(object_type))
-        self.dfu_adapter.send_message([DfuTransportSerial.OP_CODE['ReadObject'], object_type])
+        yield (DfuSerialProtocol.SEND, Slip.encode_bytes(bytes([DfuSerialProtocol.OP_CODE['ReadObject'], object_type])))
 
-        response = self.__get_response(DfuTransportSerial.OP_CODE['ReadObject'])
+        response = yield from self.__get_response(DfuSerialProtocol.OP_CODE['ReadObject'])
         (max_size, offset, crc)= struct.unpack('<III', bytearray(response))
 
         logger.debug("Serial: Object selected: " +
             " max_size:{} offset:{} crc:{}".format(max_size, offset, crc))
         return {'max_size': max_size, 'offset': offset, 'crc': crc}
 
-    def __get_checksum_response(self):
-        resp = self.__get_response(DfuTransportSerial.OP_CODE['CalcChecSum'])
+    def __get_checksum_response(self, position):
+        # Responses to PRN checkpoints queue behind the frames sent since: their round-trip
+        # time is tracked apart from the one of CalcChecSum requests.
+        resp = yield from self.__get_response(DfuSerialProtocol.OP_CODE['CalcChecSum'], DfuSerialProtocol.PRN_CHECKSUM,
+                                              position=position)
+        if resp is None:
+            raise Exception('Did not receive checksum response from DFU target.')
 
         (offset, crc) = struct.unpack('<II', bytearray(resp))
         return {'offset': offset, 'crc': crc}
 
-    def __stream_data(self, data, crc=0, offset=0):
+    def __poll_checksum_response(self, position):
+        resp = yield (DfuSerialProtocol.POLL, DfuSerialProtocol.OP_CODE['CalcChecSum'])
+        if resp is None:
+            return None
+        self.acknowledged = max(self.acknowledged, position)
+
+        (offset, crc) = struct.unpack('<II', bytearray(
+            DfuSerialProtocol.parse_response(resp, DfuSerialProtocol.OP_CODE['CalcChecSum'])))
+        return {'offset': offset, 'crc': crc}
+
+    def __discard_checksum_responses(self, checkpoints):
+        for (_, _, position) in checkpoints:
+            resp = yield (DfuSerialProtocol.RECEIVE, DfuSerialProtocol.OP_CODE['CalcChecSum'],
+                          self.__response_timeout(DfuSerialProtocol.PRN_CHECKSUM, 1, position))
+            if resp is None:
+                break
+            self.acknowledged = max(self.acknowledged, position)
+
+    def __stream_data(self, data, object_type, crc=0, offset=0):
+        plan = TransferPlan(data, max(len(data), 1), self.mtu, offset, crc)
+        return (yield from self.__stream_object(plan, 0, object_type))
+
+    def __stream_object(self, plan, index, object_type):
+        first, last = plan.object_frames[index], plan.object_frames[index + 1]
+        offset      = plan.object_offset(index)
+        size        = plan.object_size(index)
         logger.debug("Serial: Streaming Data: " +
-            "len:{0} offset:{1} crc:0x{2:08X}".format(len(data), offset, crc))
-        def validate_crc():
-            if (crc != response['crc']):
-                raise Exception('Failed CRC validation.\n'\
-                                + 'Expected: {} Received: {}.'.format(crc, response['crc']))
-            if (offset != response['offset']):
-                raise Exception('Failed offset validation.\n'\
-                                + 'Expected: {} Received: {}.'.format(offset, response['offset']))
-
-        current_pnr     = 0
-
-        for i in range(0, len(data), (self.mtu-1)//2 - 1):
-            # append the write data opcode to the front
-            # here the maximum data size is self.mtu/2,
-            # due to the slip encoding which at maximum doubles the size
-            to_transmit = data[i:i + (self.mtu-1)//2 - 1 ]
-            to_transmit = struct.pack('B',DfuTransportSerial.OP_CODE['WriteObject']) + to_transmit
-
-            time.sleep(0.01)
-            self.dfu_adapter.send_message(list(to_transmit))
-            crc     = binascii.crc32(to_transmit[1:], crc) & 0xFFFFFFFF
-            offset += len(to_transmit) - 1
-            current_pnr    += 1
-            if self.prn == current_pnr:
-                current_pnr = 0
-                response    = self.__get_checksum_response()
-                validate_crc()
-        response = self.__calculate_checksum()
-        validate_crc()
+            "len:{0} offset:{1} crc:0x{2:08X}".format(size, offset, plan.checkpoints[index]))
+        # Offset, CRC and bytes written at every PRN checkpoint whose checksum response is
+        # pending. Up to prn_window checkpoints stay in flight while streaming goes on.
+        checkpoints     = deque()
+        def validate_checkpoints(window):
+            while checkpoints:
+                (expected_offset, expected_crc, position) = checkpoints[0]
+                if len(checkpoints) >= window:
+                    response = yield from self.__get_checksum_response(position)
+                else:
+                    response = yield from self.__poll_checksum_response(position)
+                    if response is None:
+                        return
+                checkpoints.popleft()
+                try:
+                    DfuSerialProtocol.validate_checksum(response, expected_offset, expected_crc)
+                except ValidationException:
+                    # The target can only resume from the start of the object: collect the
+                    # responses still in flight so they are not taken for later ones.
+                    yield from self.__discard_checksum_responses(checkpoints)
+                    raise
+
+        # Paced frames are written one at a time. Otherwise all frames up to the next PRN are
+        # handed over as a single slice of the plan, and written in blocks until a checksum
+        # response is read.
+        send_packet     = DfuSerialProtocol.QUEUE if self.coalesce else DfuSerialProtocol.SEND
+        run             = (self.prn or last - first) if self.coalesce else 1
+        frame           = first
+        while frame < last:
+            end     = min(frame + run, last)
+            delay   = self.pacing.remaining()
+            if delay > 0:
+                yield (DfuSerialProtocol.SLEEP, delay)
+            sent    = yield (send_packet, plan.frames(frame, end))
+            self.pacing.sent(sent)
+            self.written += sent
+            frame   = end
+            if self.prn and (frame - first) % self.prn == 0:
+                checkpoints.append((plan.frame_offsets[frame - 1], plan.frame_crcs[frame - 1], self.written))
+                yield from validate_checkpoints(self.prn_window)
+
+        frames     = last - first
+        wire_bytes = len(plan.frames(first, last)) if frames else 0
+        self.stats['objects']       += 1
+        self.stats['frames']        += frames
+        self.stats['payload_bytes'] += size
+        self.stats['wire_bytes']    += wire_bytes
+        if wire_bytes:
+            logger.debug("Serial: Object streamed in {} frames, payload efficiency {:.1%}"
+                         .format(frames, size / wire_bytes))
+
+        yield from validate_checkpoints(1)
+
+        crc      = plan.checkpoints[index + 1]
+        response = yield from self.__calculate_checksum(object_type)
+        DfuSerialProtocol.validate_checksum(response, offset + size, crc)
         return crc
 
-    def __get_response(self, operation):
-        def get_dict_key(dictionary, value):
-            return next((key for key, val in list(dictionary.items()) if val == value), None)
+    def log_stats(self):
+        if self.stats['frames']:
+            logger.debug("Serial: Transfer stats: {} objects, {} frames, {:.1f} frames/object, "
+                         "payload efficiency {:.1%}".format(self.stats['objects'], self.stats['frames'],
+                                                            self.stats['frames'] / max(self.stats['objects'], 1),
+                                                            self.stats['payload_bytes'] / self.stats['wire_bytes']))
+
+    @staticmethod
+    def frame_payload_size(mtu):
+        """
+        Returns the number of bytes of data to send in a WriteObject frame.
+
+        The nRF bootloader reports the MTU as the SLIP encoded size of its receive buffer in the
+        worst case, where every byte is escaped.
 
-        resp = self.dfu_adapter.get_message()
+        :param int mtu: MTU reported by the target with GetSerialMTU.
+        :return int: Payload size, not limited to the data left.
+        """
+        return (mtu-1)//2 - 1
+
+    @staticmethod
+    def validate_checksum(response, offset, crc):
+        """
+        Raises ValidationException if a checksum response does not match the data sent.
+
+        :param dict response: Checksum response with 'offset' and 'crc' keys.
+        :param int offset: Offset of the data sent.
+        :param int crc: CRC32 of the data sent.
+        """
+        if (crc != response['crc']):
+            raise ValidationException('Failed CRC validation.\n'\
+                            + 'Expected: {} Received: {}.'.format(crc, response['crc']))
+        if (offset != response['offset']):
+            raise ValidationException('Failed offset validation.\n'\
+                            + 'Expected: {} Received: {}.'.format(offset, response['offset']))
+
+    def __wire_time(self, position):
+        """ Returns the seconds needed by the frames written up to position to drain. """
+        if not self.baud_rate:
+            return 0.0
+        pending = max(position - self.acknowledged, 0)
+        return pending * DfuSerialProtocol.BITS_PER_BYTE / self.baud_rate
+
+    def __response_timeout(self, key, units, position):
+        return self.rtt.timeout(key, units) + self.__wire_time(position)
+
+    def __get_response(self, operation, key=None, units=1, position=None):
+        """
+        Waits for the response to a request until its deadline, derived from the round-trip
+        times measured so far. A request timing out gets one more, backed off, deadline.
+
+        The response queues behind the frames written before the request and not answered yet:
+        their time on the wire is added to the deadline, and left out of the round-trip time.
+
+        :param int operation: Opcode of the request.
+        :param key: Kind of request for the round-trip time estimate, by default its opcode.
+        :param int units: Work done by the target for the request, see RttEstimator.
+        :param int position: Bytes written before the request, by default all written so far.
+        """
+        key      = operation if key is None else key
+        position = self.written if position is None else position
+        wire     = self.__wire_time(position)
+        start    = time.monotonic()
+        resp     = yield (DfuSerialProtocol.RECEIVE, operation, self.rtt.timeout(key, units) + wire)
+        if resp:
+            self.rtt.sample(key, max(time.monotonic() - start - wire, 0.0), units)
+        elif self.rtt.backoff(key):
+            logger.warning("Serial: Response to 0x{:02X} is late, waiting {:.3f} s more"
+                           .format(operation, self.rtt.timeout(key, units)))
+            resp = yield (DfuSerialProtocol.RECEIVE, operation, self.rtt.timeout(key, units))
 
         if not resp:
             return None
 
-        if resp[0] != DfuTransportSerial.OP_CODE['Response']:
+        self.acknowledged = max(self.acknowledged, position)
+
+        return DfuSerialProtocol.parse_response(resp, operation)
+
+    @staticmethod
+    def parse_response(resp, operation):
+        """
+        Returns the payload of a response frame, raising an exception if the request failed.
+
+        :param bytes resp: Decoded response frame.
+        :param int operation: Opcode of the request answered by the frame.
+        :return bytes: Response payload following the result code.
+        """
+        def get_dict_key(dictionary, value):
+            return next((key for key, val in list(dictionary.items()) if val == value), None)
+
+        if resp[0] != DfuSerialProtocol.OP_CODE['Response']:
             raise Exception('No Response: 0x{:02X}'.format(resp[0]))
 
         if resp[1] != operation:
@@ -516,4 +1201,289 @@ class DfuTransportSerial(DfuTransport):
             raise Exception('Extended Error 0x{:02X}: {}'.format(resp[3], data))
         else:
             raise Exception('Response Code {}'.format(
-                get_dict_key(DfuTransport.RES_CODE, resp[2])))
\ No newline at end of file
+                get_dict_key(DfuTransport.RES_CODE, resp[2])))
+
+class PortOpener:
+    """
+    Opens a serial port as soon as its device node exists.
+
+    A target resetting into its bootloader re-enumerates: the port is retried on every change of
+    its directory until it opens, see DeviceWatcher. A bootloader entered from a USB application
+    enumerates as another USB device with the same serial number, possibly on another port: once
+    the port is gone, the port of that bootloader is opened instead, see DeviceLister.
+
+    A node created by a re-enumeration is only accessible to root until udev sets its
+    permissions. Opening it is retried for PERMISSION_GRACE seconds before giving up.
+    """
+
+    REENUMERATION_ERRORS = (errno.ENOENT, errno.ENODEV, errno.ENXIO)  # Port not there yet
+    PERMISSION_ERRORS    = (errno.EACCES, errno.EPERM)  # Port there, permissions not set yet
+    PERMISSION_GRACE     = 1.0  # Seconds given to udev to set the permissions of a new node
+
+    def __init__(self, com_port, serial_number=None, **settings):
+        """
+        :param str com_port: Serial port name.
+        :param str serial_number: USB serial number of the device last seen on the port, or None.
+        :param settings: Arguments of the Serial constructor.
+        """
+        self.com_port      = com_port
+        self.serial_number = serial_number
+        self.settings      = settings
+        self.error         = None
+        self.lister        = DeviceLister() if serial_number else None
+        self.denied_since  = None       # Time of the first permission error in a row
+
+    @staticmethod
+    def find_serial_number(com_port):
+        """
+        :return str: USB serial number of the device on a port, None if it is not a USB device
+                     with a serial number.
+        """
+        device = DeviceLister().get_device(com=com_port)
+        return device.serial_number if device and device.serial_number else None
+
+    def try_to_open(self):
+        """
+        :return serial.Serial: The open port, or None if it has not enumerated yet.
+        """
+        try:
+            return Serial(port=self.com_port, **self.settings)
+        except OSError as e:
+            if e.errno in PortOpener.PERMISSION_ERRORS:
+                return self.__permission_denied(e)
+            self.denied_since = None
+            if e.errno not in PortOpener.REENUMERATION_ERRORS:
+                raise
+            if self.__follow_device():
+                return self.try_to_open()
+            if self.error is None:
+                logger.info("Serial: Waiting for {} to enumerate".format(self.com_port))
+            self.error = e
+            return None
+
+    def open(self, timeout):
+        """
+        :param float timeout: Seconds to wait for the port.
+        :return serial.Serial: The open port.
+        """
+        try:
+            with DeviceWatcher(self.com_port) as watcher:
+                return self.__opened(watcher.wait_for(self.try_to_open, max(timeout, 0),
+                                                      PortOpener.PERMISSION_GRACE))
+        except OSError as e:
+            self.error = e
+            return self.__opened(None)
+
+    async def open_async(self, timeout):
+        """
+        Coroutine version of open, waiting on the running event loop.
+        """
+        try:
+            with DeviceWatcher(self.com_port) as watcher:
+                return self.__opened(await watcher.wait_for_async(self.try_to_open, max(timeout, 0),
+                                                                  PortOpener.PERMISSION_GRACE))
+        except OSError as e:
+            self.error = e
+            return self.__opened(None)
+
+    def __permission_denied(self, error):
+        """
+        Waits for the permissions of a new node, raising error once PERMISSION_GRACE is over.
+        """
+        now = time.monotonic()
+        if self.denied_since is None:
+            logger.info("Serial: Waiting for access to {}".format(self.com_port))
+            self.denied_since = now
+        elif now - self.denied_since >= PortOpener.PERMISSION_GRACE:
+            raise error
+        self.error = error
+        return None
+
+    def __follow_device(self):
+        """
+        Switches to the port of the bootloader with the serial number of the device on the port.
+
+        :return bool: True if the port changed.
+        """
+        if self.lister is None:
+            return False
+
+        device = self.lister.get_device(serial_number=self.serial_number, bootloader=True)
+        port   = device.get_first_available_com_port() if device else None
+        if port is None or port in (self.com_port, os.path.realpath(self.com_port)):
+            return False
+
+        logger.info("Serial: Bootloader found on {}".format(port))
+        self.com_port = port
+        return True
+
+    def __opened(self, serial_port):
+        if serial_port is None:
+            raise Exception("Serial port could not be opened on {0}"
+              ". Reason: {1}".format(self.com_port, self.error.strerror or self.error))
+        return serial_port
+
+class DfuTransportSerial(DfuTransport):
+
+    DEFAULT_BAUD_RATE = 115200
+    DEFAULT_FLOW_CONTROL = True
+    DEFAULT_TIMEOUT = 30.0  # Timeout time for board response
+    DEFAULT_SERIAL_PORT_TIMEOUT = DfuSerialProtocol.DEFAULT_RESPONSE_TIMEOUT
+    DEFAULT_PRN                 = 0
+    DEFAULT_DO_PING = True
+    DEFAULT_PACING  = None  # Selected from flow_control, see nordicsemi.dfu.pacing
+    DEFAULT_COALESCE  = None  # Coalesce WriteObject frames whenever frames are not paced
+    DEFAULT_FULL_DUPLEX = False
+    DEFAULT_PRN_WINDOW  = 1  # PRN intervals in flight before waiting for the oldest checksum
+    RESET_TIMEOUT       = DfuSerialProtocol.RESET_TIMEOUT
+
+    OP_CODE = DfuSerialProtocol.OP_CODE
+
+    def __init__(self,
+                 com_port,
+                 baud_rate=DEFAULT_BAUD_RATE,
+                 flow_control=DEFAULT_FLOW_CONTROL,
+                 timeout=DEFAULT_TIMEOUT,
+                 prn=DEFAULT_PRN,
+                 do_ping=DEFAULT_DO_PING,
+                 pacing=DEFAULT_PACING,
+                 coalesce=DEFAULT_COALESCE,
+                 full_duplex=DEFAULT_FULL_DUPLEX,
+                 prn_window=DEFAULT_PRN_WINDOW,
+                 dfu_start=None):
+
+        #super(DfuTransportSerial, self).__init__() #python2
+        super().__init__()
+        self.com_port = com_port
+        self.baud_rate = baud_rate
+        self.flow_control = 1 if flow_control else 0
+        self.timeout = timeout
+        self.serial_port = None
+        self.dfu_adapter = None
+        self.full_duplex = full_duplex
+        self.serial_number = None       # USB serial number of the device on com_port
+        self.protocol    = DfuSerialProtocol(timeout, baud_rate, prn, do_ping, select_pacing(pacing, baud_rate, flow_control),
+                                             coalesce, prn_window, dfu_start, self._send_event)
+
+        """:type: serial.Serial """
+
+    @property
+    def mtu(self):
+        return self.protocol.mtu
+
+    @property
+    def stats(self):
+        """ Objects, frames, payload and wire bytes streamed so far. """
+        return self.protocol.stats
+
+    @property
+    def entry_latency(self):
+        """ Seconds from the DFU start text to the first Ping response. """
+        return self.protocol.entry_latency
+
+    def send_text_message(self, text, flow_control = None):
+        if not text: # nothing to send
+            return
+
+        logger.debug("Serial: send_text_message [%s]" % text)
+        if self.serial_port is None:
+            try:
+                flow_control = flow_control if flow_control is not None else self.flow_control
+                serial = Serial(port=self.com_port,
+                                baudrate=self.baud_rate, rtscts=flow_control, timeout=self.timeout)
+                serial.write(text.encode('utf-8'))
+                serial.close()
+            except Exception as e:
+                logger.exception('send_text_message')
+                raise Exception("Serial port could not be opened on {0}. Reason: {1}".format(self.com_port, e))
+        else:
+            self.serial_port.write(text.encode('utf-8'))
+
+    def open(self):
+        super().open()
+        self.serial_number = PortOpener.find_serial_number(self.com_port)
+        self.serial_port = self.__open_port(self.timeout)
+        self.dfu_adapter = DFUAdapter(self.serial_port)
+
+        if self.full_duplex:
+            self.dfu_adapter.start_receiver()
+
+        self.__run(self.protocol.open())
+
+    def wait_for_reset(self, timeout=RESET_TIMEOUT):
+        """
+        Probes the target after an image was activated, see DfuSerialProtocol.wait_for_reset.
+
+        :param float timeout: Time given to the target to reset.
+        :return bool: True if the target reset and the session was re-established.
+        """
+        return self.__run(self.protocol.wait_for_reset(timeout))
+
+    def __reopen(self, timeout):
+        self.dfu_adapter.stop_receiver()
+        try:
+            self.serial_port.close()
+        except Exception:
+            pass
+
+        self.serial_port = self.__open_port(timeout)
+        self.dfu_adapter = DFUAdapter(self.serial_port)
+        if self.full_duplex:
+            self.dfu_adapter.start_receiver()
+
+    def __open_port(self, timeout):
+        opener = PortOpener(self.com_port, self.serial_number, baudrate=self.baud_rate, rtscts=self.flow_control,
+                            timeout=DFUAdapter.READ_TIMEOUT, write_timeout=self.timeout)
+        serial_port   = opener.open(timeout)
+        self.com_port = opener.com_port
+        return serial_port
+
+    def close(self):
+        super().close()
+        self.dfu_adapter.stop_receiver()
+        self.serial_port.close()
+        self.protocol.log_stats()
+
+    def send_init_packet(self, init_packet):
+        self.__run(self.protocol.send_init_packet(init_packet))
+
+    def send_firmware(self, firmware):
+        """
+        :param firmware: Image as a bytes-like object, a TransferPlan of it, or a FirmwareSource,
+                         see DfuSerialProtocol.send_firmware.
+        """
+        self.__run(self.protocol.send_firmware(firmware))
+
+    def __run(self, operation):
+        """
+        Drives an operation of the protocol, performing its I/O requests on the serial port.
+
+        :return: Result of the operation.
+        """
+        (result, error) = (None, None)
+        while True:
+            try:
+                request = operation.send(result) if error is None else operation.throw(error)
+            except StopIteration as e:
+                return e.value
+
+            try:
+                (result, error) = (self.__perform(*request), None)
+            except Exception as e:
+                (result, error) = (None, e)
+
+    def __perform(self, request, *args):
+        if request == DfuSerialProtocol.SEND:
+            return self.dfu_adapter.send_packet(*args)
+        elif request == DfuSerialProtocol.QUEUE:
+            return self.dfu_adapter.queue_packet(*args)
+        elif request == DfuSerialProtocol.RECEIVE:
+            return self.dfu_adapter.get_message(*args)
+        elif request == DfuSerialProtocol.POLL:
+            return self.dfu_adapter.poll_message(*args)
+        elif request == DfuSerialProtocol.SLEEP:
+            time.sleep(*args)
+        elif request == DfuSerialProtocol.REOPEN:
+            self.__reopen(*args)
+        else:
+            raise Exception("Unknown I/O request {}".format(request))
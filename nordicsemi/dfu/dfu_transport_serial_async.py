@@ -0,0 +1,364 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+asyncio serial DFU transport.
+
+The transport drives the same DfuSerialProtocol as DfuTransportSerial, but waits on the event loop
+instead of blocking in the serial port: the tty file descriptor opened by pyserial is non-blocking and is
+watched with loop.add_reader and loop.add_writer. A single event loop can flash many ports at the
+same time, each one only costing a file descriptor and a few callbacks.
+
+The file descriptor of the port is used directly, so the transport is only available on POSIX
+systems.
+
+USAGE:
+    async def flash(port, init_packet, firmware):
+        transport = DfuTransportSerialAsync(port, prn=8, prn_window=4)
+        await transport.open()
+        try:
+            await transport.send_init_packet(init_packet)
+            await transport.send_firmware(firmware)
+        finally:
+            await transport.close()
+
+    await asyncio.gather(*(flash(port, init_packet, firmware) for port in ports))
+"""
+
+# Python imports
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+
+# Nordic Semiconductor imports
+from nordicsemi.dfu.dfu_transport           import DfuTransport
+from nordicsemi.dfu.dfu_transport_serial    import (DfuTransportSerial, DfuSerialProtocol, DFUAdapter, PortOpener,
+                                                    SlipDecoder)
+from nordicsemi.dfu.pacing                  import select_pacing
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDFUAdapter:
+    """
+    SLIP framing on the non-blocking file descriptor of an open serial port.
+
+    Received bytes are decoded by a reader callback as soon as the event loop sees them, so
+    responses are collected while the transport is still writing, like with a SerialReceiver.
+    """
+
+    def __init__(self, serial_port, write_timeout, write_block_size=DFUAdapter.WRITE_BLOCK_SIZE):
+        try:
+            self.fd = serial_port.fileno()
+        except AttributeError:
+            raise Exception("The asyncio serial transport requires a POSIX serial port")
+
+        self.loop          = asyncio.get_running_loop()
+        self.decoder       = SlipDecoder()
+        self.frames        = deque()
+        self.received      = asyncio.Event()
+        self.error         = None
+        self.tx_buffer     = bytearray()
+        self.write_timeout = write_timeout
+        self.write_block_size = write_block_size
+
+    def start(self):
+        self.loop.add_reader(self.fd, self.__on_readable)
+
+    def stop(self):
+        self.loop.remove_reader(self.fd)
+
+    def __on_readable(self):
+        try:
+            data = os.read(self.fd, DFUAdapter.READ_CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            data = None
+            self.error = e
+
+        if not data:
+            # Hang up: the device is gone
+            self.error = self.error or OSError('serial port closed')
+            self.stop()
+            self.received.set()
+            return
+
+        frames = self.decoder.feed(data)
+        if frames:
+            self.frames.extend(frames)
+            self.received.set()
+
+    async def send_packet(self, packet):
+        """
+        Writes SLIP encoded frames to the serial port, after any queued messages.
+
+        :return int: Number of bytes written to the port.
+        """
+        self.tx_buffer += packet
+        await self.flush()
+        return len(packet)
+
+    async def queue_packet(self, packet):
+        """
+        Queues SLIP encoded frames, writing the queue once a whole block is collected.
+
+        :return int: Number of bytes queued.
+        """
+        self.tx_buffer += packet
+        if len(self.tx_buffer) >= self.write_block_size:
+            await self.flush()
+        return len(packet)
+
+    async def flush(self):
+        """
+        Writes all queued messages, waiting for the port to become writable as needed.
+        """
+        if not self.tx_buffer:
+            return
+
+        written = 0
+        try:
+            with memoryview(self.tx_buffer) as data:
+                while written < len(data):
+                    try:
+                        written += os.write(self.fd, data[written:])
+                    except BlockingIOError:
+                        pass
+                    except OSError as e:
+                        raise Exception('Writing to serial port failed: ' + str(e) + '. '
+                                        'If MSD is enabled on the target device, try to disable it ref. '
+                                        'https://wiki.segger.com/index.php?title=J-Link-OB_SAM3U')
+                    if written < len(data):
+                        await self.__writable()
+        finally:
+            self.tx_buffer.clear()
+
+        # Let the reader and the other transports on the loop run between blocks.
+        await asyncio.sleep(0)
+
+    async def __writable(self):
+        writable = self.loop.create_future()
+        self.loop.add_writer(self.fd, lambda: writable.done() or writable.set_result(None))
+        try:
+            await asyncio.wait_for(writable, self.write_timeout)
+        except asyncio.TimeoutError:
+            raise Exception('Writing to serial port timed out')
+        finally:
+            self.loop.remove_writer(self.fd)
+
+    def poll_message(self, opcode=None):
+        """
+        Returns the oldest received frame answering opcode, without waiting.
+
+        :param int opcode: Request opcode of the response to return, None for any frame.
+        :return bytes: Decoded frame or None if none was received yet.
+        """
+        for frame in self.frames:
+            if opcode is None or (len(frame) > 1 and frame[1] == opcode):
+                self.frames.remove(frame)
+                return frame
+
+        if self.error is not None:
+            raise Exception('Reading from serial port failed: {}'.format(self.error))
+        return None
+
+    async def get_message(self, opcode=None, timeout=None):
+        """
+        Returns the oldest received frame answering opcode, after writing any queued messages.
+
+        :param int opcode: Request opcode of the response to return, None for any frame.
+        :param float timeout: Seconds to wait for the frame.
+        :return bytes: Decoded frame or None if none was received before the deadline.
+        """
+        await self.flush()
+        deadline = time.monotonic() + (timeout or 0)
+        while True:
+            frame = self.poll_message(opcode)
+            if frame is not None:
+                return frame
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error('get_message empty! nothing received!')
+                return None
+
+            self.received.clear()
+            try:
+                await asyncio.wait_for(self.received.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+
+class DfuTransportSerialAsync(DfuTransport):
+    """
+    Serial DFU transport whose operations are coroutines.
+
+    Takes the arguments of DfuTransportSerial, except full_duplex: responses are always received
+    while the transport writes. open, close, send_init_packet and send_firmware must be awaited,
+    and raise the same exceptions as their DfuTransportSerial counterparts. Both transports drive
+    the same DfuSerialProtocol.
+    """
+
+    DEFAULT_BAUD_RATE   = DfuTransportSerial.DEFAULT_BAUD_RATE
+    DEFAULT_FLOW_CONTROL = DfuTransportSerial.DEFAULT_FLOW_CONTROL
+    DEFAULT_TIMEOUT     = DfuTransportSerial.DEFAULT_TIMEOUT
+    DEFAULT_PRN         = DfuTransportSerial.DEFAULT_PRN
+    DEFAULT_DO_PING     = DfuTransportSerial.DEFAULT_DO_PING
+    DEFAULT_PACING      = DfuTransportSerial.DEFAULT_PACING
+    DEFAULT_COALESCE    = DfuTransportSerial.DEFAULT_COALESCE
+    DEFAULT_PRN_WINDOW  = DfuTransportSerial.DEFAULT_PRN_WINDOW
+
+    OP_CODE = DfuSerialProtocol.OP_CODE
+
+    def __init__(self,
+                 com_port,
+                 baud_rate=DEFAULT_BAUD_RATE,
+                 flow_control=DEFAULT_FLOW_CONTROL,
+                 timeout=DEFAULT_TIMEOUT,
+                 prn=DEFAULT_PRN,
+                 do_ping=DEFAULT_DO_PING,
+                 pacing=DEFAULT_PACING,
+                 coalesce=DEFAULT_COALESCE,
+                 prn_window=DEFAULT_PRN_WINDOW,
+                 dfu_start=None):
+        super().__init__()
+        self.com_port     = com_port
+        self.baud_rate    = baud_rate
+        self.flow_control = 1 if flow_control else 0
+        self.timeout      = timeout
+        self.serial_port  = None
+        self.dfu_adapter  = None
+        self.serial_number = None       # USB serial number of the device on com_port
+        self.protocol     = DfuSerialProtocol(timeout, baud_rate, prn, do_ping, select_pacing(pacing, baud_rate, flow_control),
+                                              coalesce, prn_window, dfu_start, self._send_event)
+
+    @property
+    def mtu(self):
+        return self.protocol.mtu
+
+    @property
+    def stats(self):
+        return self.protocol.stats
+
+    @property
+    def entry_latency(self):
+        return self.protocol.entry_latency
+
+    async def open(self):
+        super().open()
+        self.serial_number = PortOpener.find_serial_number(self.com_port)
+        await self.__open_adapter(self.timeout)
+        await self.__run(self.protocol.open())
+
+    async def wait_for_reset(self, timeout=DfuSerialProtocol.RESET_TIMEOUT):
+        """
+        Probes the target after an image was activated, see DfuSerialProtocol.wait_for_reset.
+
+        :param float timeout: Time given to the target to reset.
+        :return bool: True if the target reset and the session was re-established.
+        """
+        return await self.__run(self.protocol.wait_for_reset(timeout))
+
+    async def __open_adapter(self, timeout):
+        opener = PortOpener(self.com_port, self.serial_number, baudrate=self.baud_rate, rtscts=self.flow_control)
+        self.serial_port = await opener.open_async(timeout)
+        self.com_port    = opener.com_port
+
+        try:
+            self.dfu_adapter = AsyncDFUAdapter(self.serial_port, self.timeout)
+        except Exception:
+            self.serial_port.close()
+            raise
+        self.dfu_adapter.start()
+
+    async def __reopen(self, timeout):
+        self.dfu_adapter.stop()
+        self.serial_port.close()
+        await self.__open_adapter(timeout)
+
+    async def close(self):
+        super().close()
+        self.dfu_adapter.stop()
+        self.serial_port.close()
+        self.protocol.log_stats()
+
+    async def send_init_packet(self, init_packet):
+        await self.__run(self.protocol.send_init_packet(init_packet))
+
+    async def send_firmware(self, firmware):
+        """
+        :param firmware: Image as a bytes-like object, a TransferPlan of it, or a FirmwareSource,
+                         see DfuSerialProtocol.send_firmware.
+        """
+        await self.__run(self.protocol.send_firmware(firmware))
+
+    async def __run(self, operation):
+        """
+        Drives an operation of the protocol, performing its I/O requests on the event loop.
+
+        :return: Result of the operation.
+        """
+        (result, error) = (None, None)
+        while True:
+            try:
+                request = operation.send(result) if error is None else operation.throw(error)
+            except StopIteration as e:
+                return e.value
+
+            try:
+                (result, error) = (await self.__perform(*request), None)
+            except Exception as e:
+                (result, error) = (None, e)
+
+    async def __perform(self, request, *args):
+        if request == DfuSerialProtocol.SEND:
+            return await self.dfu_adapter.send_packet(*args)
+        elif request == DfuSerialProtocol.QUEUE:
+            return await self.dfu_adapter.queue_packet(*args)
+        elif request == DfuSerialProtocol.RECEIVE:
+            return await self.dfu_adapter.get_message(*args)
+        elif request == DfuSerialProtocol.POLL:
+            return self.dfu_adapter.poll_message(*args)
+        elif request == DfuSerialProtocol.SLEEP:
+            await asyncio.sleep(*args)
+        elif request == DfuSerialProtocol.REOPEN:
+            await self.__reopen(*args)
+        else:
+            raise Exception("Unknown I/O request {}".format(request))
@@ -0,0 +1,168 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Sources of firmware images read one object at a time by the serial DFU transports.
+
+DfuTransportSerial.send_firmware keeps a bytes-like image in memory together with the
+encoded frames of all of its objects. A FirmwareSource is read and encoded one object at a
+time instead, so the memory used by a DFU does not grow with the size of the image:
+
+    BufferFirmware      image already in memory, e.g. a stored member of a memory-mapped zip
+    StreamedFirmware    seekable file object read on demand, e.g. a deflated zip member
+"""
+
+# Python standard library
+import os
+from abc import ABC, abstractmethod
+
+# Nordic libraries
+from nordicsemi.dfu.crc32 import Crc32Index
+
+
+class FirmwareSource(ABC):
+    """
+    Firmware image of known size, read in parts.
+
+    The CRC32s of the image are kept at every CHECKPOINT_SIZE boundary, see Crc32Index. The
+    CRC32 up to any offset is extended from the checkpoint below it, so resuming a transfer,
+    even at a lower offset, never reads the image again from its start.
+    """
+
+    CHECKPOINT_SIZE = 4096  # Distance between CRC32 checkpoints, the data object size of nRF targets
+
+    def __init__(self, size):
+        """
+        :param int size: Size of the image in bytes.
+        """
+        self.size      = size
+        self.crc_index = Crc32Index(self, FirmwareSource.CHECKPOINT_SIZE)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        """ Returns a part of the image, key being a slice without step. """
+        (start, stop, _) = key.indices(self.size)
+        return self.read(start, max(stop - start, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @abstractmethod
+    def read(self, offset, size):
+        """
+        Returns part of the image.
+
+        :param int offset: Offset of the part.
+        :param int size: Size of the part, cut at the end of the image.
+        :return: Bytes-like object.
+        """
+        pass
+
+    def crc_at(self, offset):
+        """
+        Returns the CRC32 of the image up to offset.
+
+        :param int offset: Length of the prefix, at most the size of the image.
+        :return int: CRC32 of the first offset bytes.
+        """
+        return self.crc_index.crc_at(offset)
+
+    def close(self):
+        pass
+
+
+class BufferFirmware(FirmwareSource):
+    """ Image in memory, parts are returned as views without a copy. """
+
+    def __init__(self, data):
+        """
+        :param data: Image as a bytes-like object.
+        """
+        self.data = memoryview(data)
+        super().__init__(len(self.data))
+
+    def read(self, offset, size):
+        return self.data[offset:offset + size]
+
+    def close(self):
+        self.data.release()
+
+
+class StreamedFirmware(FirmwareSource):
+    """
+    Image read on demand from a seekable file object.
+
+    Reads continuing the previous one do not seek, which keeps compressed streams such as
+    zip members from being decompressed again from their start. The last part read is kept:
+    a transfer resuming in the middle of an object reads that object again from its start.
+    """
+
+    def __init__(self, file, size):
+        """
+        :param file: Seekable binary file object positioned at the start of the image, or a path.
+        :param int size: Size of the image in bytes.
+        """
+        if isinstance(file, (str, bytes, os.PathLike)):
+            file = open(file, 'rb')
+        self.file     = file
+        self.start    = file.tell()
+        self.position = 0
+        self.last     = (0, b'')  # Offset and data of the last part read
+        super().__init__(size)
+
+    def read(self, offset, size):
+        size = max(min(size, self.size - offset), 0)
+        (last_offset, last) = self.last
+        if last_offset <= offset and offset + size <= last_offset + len(last):
+            return memoryview(last)[offset - last_offset:offset - last_offset + size]
+
+        if offset != self.position:
+            self.file.seek(self.start + offset)
+        data = self.file.read(size)
+        if len(data) != size:
+            raise IOError("Image ends at {0} instead of {1} bytes".format(offset + len(data), self.size))
+        self.position = offset + size
+        self.last     = (offset, data)
+        return data
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,157 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Pacing of WriteObject frames for the serial DFU transport.
+
+A pacing strategy decides how long the transport waits before writing the next frame. With
+hardware flow control the UART throttles the host itself and no pacing is needed. Without it
+frames are paced at the line rate, or adaptively slowed down after failed CRC/PRN checks.
+"""
+
+# Python standard library
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NoPacing:
+    """ Writes frames back to back. Used when hardware flow control is enabled. """
+
+    name = 'none'
+
+    def remaining(self):
+        """
+        Returns the seconds left before the next frame may be written.
+        """
+        return 0.0
+
+    def sent(self, size):
+        """
+        Notifies the strategy that a frame was written.
+
+        :param int size: Size of the frame on the wire in bytes.
+        """
+        pass
+
+    def on_success(self):
+        """
+        Notifies the strategy that an object passed the CRC and offset validation.
+        """
+        pass
+
+    def on_failure(self):
+        """
+        Notifies the strategy that a CRC or PRN validation failed.
+        """
+        pass
+
+
+class BaudRatePacing(NoPacing):
+    """
+    Writes frames no faster than the UART can shift them out at the configured baud rate.
+
+    The host never queues data ahead of the line, so the target gets the inter-frame gap it
+    would have with flow control. margin stretches the frame time to leave the target extra
+    time for processing.
+    """
+
+    name = 'baud'
+
+    BITS_PER_BYTE  = 10  # start bit, 8 data bits, stop bit
+    DEFAULT_MARGIN = 1.1
+
+    def __init__(self, baud_rate, margin=DEFAULT_MARGIN):
+        self.byte_time  = float(BaudRatePacing.BITS_PER_BYTE) / baud_rate * margin
+        self.next_frame = 0.0
+
+    def remaining(self):
+        return self.next_frame - time.monotonic()
+
+    def sent(self, size):
+        self.next_frame = max(self.next_frame, time.monotonic()) + size * self.byte_time
+
+
+class AdaptivePacing(NoPacing):
+    """
+    Writes frames back to back until a CRC or PRN validation fails.
+
+    Each failure doubles the delay between frames, up to MAX_DELAY. Each validated object
+    halves it again, so a transient error does not slow down the rest of the transfer.
+    """
+
+    name = 'adaptive'
+
+    MIN_DELAY = 0.0005
+    MAX_DELAY = 0.01
+
+    def __init__(self):
+        self.delay = 0.0
+
+    def remaining(self):
+        return self.delay
+
+    def on_success(self):
+        self.delay = self.delay / 2 if self.delay > AdaptivePacing.MIN_DELAY else 0.0
+
+    def on_failure(self):
+        self.delay = min(max(self.delay * 2, AdaptivePacing.MIN_DELAY), AdaptivePacing.MAX_DELAY)
+        logger.debug("Pacing: frame delay increased to {0:.1f} ms".format(self.delay * 1000))
+
+
+PACING = {pacing.name: pacing for pacing in (NoPacing, BaudRatePacing, AdaptivePacing)}
+
+
+def select_pacing(pacing, baud_rate, flow_control):
+    """
+    Returns the pacing strategy for a serial transport.
+
+    :param str pacing: One of the PACING names, or None to select it from the flow control setting.
+    :param int baud_rate: Baud rate of the serial port.
+    :param bool flow_control: True if hardware flow control is enabled.
+    :return: Pacing strategy instance.
+    """
+    if pacing is None:
+        pacing = NoPacing.name if flow_control else BaudRatePacing.name
+
+    if pacing not in PACING:
+        raise ValueError("Unknown pacing {0}. Use one of: {1}".format(pacing, ", ".join(PACING)))
+
+    if pacing == BaudRatePacing.name:
+        return BaudRatePacing(baud_rate)
+    return PACING[pacing]()
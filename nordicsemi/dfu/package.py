@@ -38,9 +38,14 @@
 
 # Python standard library
 import os
+import mmap
+import zlib
+import struct
 import tempfile
 import shutil
 import binascii
+import threading
+import zipfile
 from enum import Enum
 
 # 3rd party libraries
@@ -54,6 +59,7 @@ from nordicsemi.dfu.init_packet_pb import InitPacketPB, DFUType, CommandTypes, V
 from nordicsemi.dfu.manifest import ManifestGenerator, Manifest
 from nordicsemi.dfu.model import HexType, FirmwareKeys
 from nordicsemi.dfu.crc16 import calc_crc16
+from nordicsemi.dfu.firmware_source import BufferFirmware, StreamedFirmware
 #from nordicsemi.zigbee.ota_file import OTA_file
 
 #from .signing import Signing
@@ -650,3 +656,144 @@ DFU Package: <{0}>:
                 """:type :str """
 
                 return Manifest.from_json(_json)
+
+
+class PackageReader:
+    """
+    Reads the manifest and images of a Nordic DFU package straight from the zip file.
+
+    The zip file is memory-mapped. Stored members are returned as read-only views of the
+    mapping, without a copy. Deflated members are inflated the first time they are read and
+    kept. Members compressed otherwise are read through ZipFile. The CRC32 of a member is
+    checked on its first read.
+
+    Large images can be read one object at a time instead, see firmware_source.
+
+    A reader may be shared by several threads, e.g. by the DFUs of a DfuBatch.
+    """
+
+    LOCAL_HEADER = struct.Struct(zipfile.structFileHeader)
+    LOCAL_HEADER_SIGNATURE = zipfile.stringFileHeader
+
+    def __init__(self, package_path):
+        """
+        :param str package_path: Path to the package
+        """
+        if not os.path.isfile(package_path):
+            raise PackageException("Package {0} not found.".format(package_path))
+
+        self.package_path = package_path
+        try:
+            with ZipFile(package_path, 'r') as pkg:
+                self.members = {info.filename: info for info in pkg.infolist()}
+        except zipfile.BadZipFile as e:
+            raise PackageException("Package {0} is not a valid zip file: {1}".format(package_path, e))
+
+        with open(package_path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mmap)
+
+        self.__inflated = {}            # Name -> contents of members read so far
+        self.__lock     = threading.Lock()
+
+        self.manifest = Manifest.from_json(bytes(self.read(Package.MANIFEST_FILENAME)).decode('utf-8'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Releases the mapping of the zip file. Views of stored members must not be used anymore.
+        """
+        self.__inflated.clear()
+        self.view.release()
+        try:
+            self.mmap.close()
+        except BufferError:
+            # Views of stored members are still referenced, the mapping goes with the last one
+            pass
+
+    def size(self, name):
+        """
+        Returns the uncompressed size of a member without reading it.
+
+        :param str name: Name of the member
+        :return int: Size in bytes.
+        """
+        return self.__member(name).file_size
+
+    def read(self, name):
+        """
+        Returns the contents of a member.
+
+        :param str name: Name of the member
+        :return: memoryview of the mapping for a stored member, bytes otherwise.
+        """
+        with self.__lock:
+            contents = self.__inflated.get(name)
+            if contents is None:
+                info     = self.__member(name)
+                contents = self.__read(info)
+                if (binascii.crc32(contents) & 0xFFFFFFFF) != info.CRC:
+                    raise PackageException("Package file {0} is corrupted, CRC32 mismatch.".format(name))
+                self.__inflated[name] = contents
+        return contents
+
+    def firmware_source(self, name):
+        """
+        Returns a member as a FirmwareSource, read one object at a time by the serial transports.
+
+        A stored member is a view of the mapping. Any other member not read yet is decompressed
+        as the transport reads it, and its CRC32 is checked by ZipFile once its end is read.
+
+        :param str name: Name of the member
+        :return: nordicsemi.dfu.firmware_source.FirmwareSource of the member.
+        """
+        info = self.__member(name)
+        with self.__lock:
+            contents = self.__inflated.get(name)
+        if contents is not None:
+            return BufferFirmware(contents)
+        if self.__is_mapped(info) and info.compress_type == zipfile.ZIP_STORED:
+            return BufferFirmware(self.__mapped_data(info))
+
+        with ZipFile(self.package_path, 'r') as pkg:
+            # The member keeps the zip file open until the source is closed
+            return StreamedFirmware(pkg.open(info), info.file_size)
+
+    def __member(self, name):
+        info = self.members.get(name) if name else None
+        if info is None:
+            raise PackageException("Package file {0} not found.".format(name))
+        return info
+
+    def __read(self, info):
+        if not self.__is_mapped(info):
+            with ZipFile(self.package_path, 'r') as pkg:
+                return pkg.read(info)
+
+        data = self.__mapped_data(info)
+        if info.compress_type == zipfile.ZIP_STORED:
+            return data
+
+        contents = zlib.decompress(data, -zlib.MAX_WBITS, max(info.file_size, 1))
+        data.release()
+        return contents
+
+    @staticmethod
+    def __is_mapped(info):
+        """ Returns True if the member is read from the mapping: neither encrypted nor compressed otherwise. """
+        return not info.flag_bits & 0x1 and info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+
+    def __mapped_data(self, info):
+        """ Returns the view of the mapping holding the compressed data of the member. """
+        header = PackageReader.LOCAL_HEADER.unpack_from(self.view, info.header_offset)
+        if header[0] != PackageReader.LOCAL_HEADER_SIGNATURE:
+            raise PackageException("Package file {0} has a bad local header.".format(info.filename))
+        # File name and extra field lengths of the local header, which may differ from the
+        # central directory.
+        start = info.header_offset + PackageReader.LOCAL_HEADER.size + header[-2] + header[-1]
+        return self.view[start:start + info.compress_size]
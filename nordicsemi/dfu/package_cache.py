@@ -0,0 +1,364 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+On-disk cache of loaded DFU packages, keyed by the SHA-256 of the package file.
+
+Opening a package reads its zip directory, parses its manifest and inflates its images.
+A PackageCache does it once per package: the init packets and firmware images are stored
+uncompressed in a file of the cache, in the layout of a SharedPackage, next to a JSON file
+with the manifest and the size, offset and SHA-256 of every member. Opening an unchanged
+package again maps the cached images, nothing else, and Preflight uses the SHA-256 of the
+entry instead of hashing the firmware. The SHA-256 of a package file is itself remembered with
+the size, modification time and inode of the file, so it is only computed again once the file
+changed.
+
+The cache is bounded in size, the least recently used packages are removed first. Entries
+are written to temporary files and renamed into place under a lock on the cache directory,
+so several processes can share a cache.
+
+USAGE:
+    package = PackageCache().open('app_dfu_package.zip')
+    dfu     = Dfu(None, transport, connect_delay, package=package)
+"""
+
+# Python standard library
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# Nordic libraries
+from nordicsemi.dfu.package        import Package, PackageReader, PackageException
+from nordicsemi.dfu.shared_package import SharedPackage, SharedPackageDescriptor
+from nordicsemi.dfu.manifest       import Manifest
+
+logger = logging.getLogger(__name__)
+
+
+class CachedPackage(SharedPackage):
+    """
+    Package mapped from a PackageCache entry, with the metadata computed when it was added.
+
+    Has the interface of PackageReader used by Dfu and DfuBatch.
+    """
+
+    def __init__(self, descriptor, metadata):
+        """
+        :param SharedPackageDescriptor descriptor: Data file, manifest and members of the entry.
+        :param dict metadata: Metadata of the entry, see PackageCache.
+        """
+        super().__init__(descriptor)
+        self.metadata = metadata
+        self.sha256   = metadata['sha256']
+
+    def __reduce__(self):
+        return (CachedPackage, (self.descriptor, self.metadata))
+
+    def digest(self, name):
+        """
+        Returns the SHA-256 of a member, computed when the entry was added. Entries whose images
+        were modified since are not opened, so it is the SHA-256 of the mapped contents.
+
+        :param str name: Name of the member
+        :return bytes: SHA-256 digest of the contents.
+        """
+        return bytes.fromhex(self.__member_metadata(name)['sha256'])
+
+    def __member_metadata(self, name):
+        member = self.metadata['members'].get(name) if name else None
+        if member is None:
+            raise PackageException("Package file {0} not found.".format(name))
+        return member
+
+
+class PackageCache:
+    """
+    Directory of loaded DFU packages, see the module documentation.
+
+    Every entry is a pair of files named after the SHA-256 of the package: <sha256>.pkg holds
+    the images, <sha256>.json their metadata. The metadata is renamed into place after the
+    images, so an entry exists once its JSON file does. The metadata also holds the stat of the
+    images file: an entry whose images were modified is added again. The modification time of
+    the JSON file is the last use of the entry. A <hash of path>.path file holds the SHA-256
+    last computed for a package path, with the stat of the file it was computed from.
+    """
+
+    VERSION       = 2                   # Of the metadata, entries of other versions are rebuilt
+    MAX_SIZE      = 512 * 1024 * 1024   # bytes of images
+    HASH_CHUNK    = 1024 * 1024
+    STALE_TIME    = 3600                # seconds after which a temporary file is left over
+    RACY_TIME     = 2                   # seconds, files modified more recently may change unnoticed
+    LOCK_FILENAME = '.lock'
+
+    def __init__(self, cache_dir=None, max_size=MAX_SIZE):
+        """
+        :param str cache_dir: Directory of the cache, created if needed. Defaults to default_dir().
+        :param int max_size: Maximum total size of the cached images in bytes. Larger packages are
+                             read from their zip file and not cached.
+        """
+        self.cache_dir = cache_dir or PackageCache.default_dir()
+        self.max_size  = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def default_dir():
+        """ Returns nrfutil-dfu in the user's cache directory, $XDG_CACHE_HOME or ~/.cache. """
+        cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(cache_home, 'nrfutil-dfu')
+
+    @staticmethod
+    def package_hash(package_path):
+        """
+        Returns the SHA-256 of a package file.
+
+        :param str package_path: Path to the package
+        :return str: Hex digest.
+        """
+        sha256 = hashlib.sha256()
+        buffer = bytearray(PackageCache.HASH_CHUNK)
+        view   = memoryview(buffer)
+        try:
+            with open(package_path, 'rb', buffering=0) as f:
+                size = f.readinto(buffer)
+                while size:
+                    sha256.update(view[:size])
+                    size = f.readinto(buffer)
+        except OSError as e:
+            raise PackageException("Package {0} cannot be read: {1}".format(package_path, e))
+        return sha256.hexdigest()
+
+    def open(self, package_path):
+        """
+        Opens a package from the cache, adding it first if needed.
+
+        :param str package_path: Path to the package
+        :return: CachedPackage, or a PackageReader for a package larger than max_size.
+        """
+        key = self.__package_key(package_path)
+        with self.__locked():
+            package = self.__lookup(key)
+        if package is not None:
+            logger.debug("Package cache: {0} found as {1}".format(package_path, key))
+            return package
+
+        logger.debug("Package cache: Adding {0} as {1}".format(package_path, key))
+        return self.__add(key, package_path)
+
+    @staticmethod
+    def __stamp(stat):
+        """ Returns the size, modification time and inode of a stat result, which change with the file. """
+        return [stat.st_size, stat.st_mtime_ns, stat.st_ino, stat.st_dev]
+
+    def __path(self, key, extension):
+        return os.path.join(self.cache_dir, key + extension)
+
+    def __package_key(self, package_path):
+        """ Returns the SHA-256 of a package file, hashing it only if it changed since last time. """
+        try:
+            stat = os.stat(package_path)
+        except OSError as e:
+            raise PackageException("Package {0} cannot be read: {1}".format(package_path, e))
+        stamp     = PackageCache.__stamp(stat)
+        path_hash = hashlib.sha256(os.path.abspath(package_path).encode('utf-8')).hexdigest()
+        try:
+            with open(self.__path(path_hash, '.path'), 'r') as f:
+                recorded = json.load(f)
+            if recorded['stamp'] == stamp:
+                return recorded['sha256']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        key = PackageCache.package_hash(package_path)
+        # A file modified within the resolution of its modification time could be modified
+        # again without changing it.
+        if time.time() - stat.st_mtime > PackageCache.RACY_TIME:
+            (fd, temporary_path) = tempfile.mkstemp(prefix='.' + path_hash, suffix='.tmp', dir=self.cache_dir)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({'stamp': stamp, 'sha256': key}, f)
+                os.replace(temporary_path, self.__path(path_hash, '.path'))
+            except OSError:
+                with contextlib.suppress(OSError):
+                    os.remove(temporary_path)
+        return key
+
+    def __lookup(self, key):
+        """ Returns the CachedPackage of an entry, None if there is no valid entry. Called locked. """
+        metadata_path = self.__path(key, '.json')
+        try:
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if metadata.get('version') != PackageCache.VERSION or metadata.get('sha256') != key:
+            return None
+
+        try:
+            if PackageCache.__stamp(os.stat(self.__path(key, '.pkg'))) != metadata['stamp']:
+                return None
+        except OSError:
+            return None
+
+        members    = {name: (member['offset'], member['size']) for (name, member) in metadata['members'].items()}
+        descriptor = SharedPackageDescriptor(self.__path(key, '.pkg'), Manifest.from_json(metadata['manifest']),
+                                             members)
+        try:
+            package = CachedPackage(descriptor, metadata)
+        except PackageException:
+            return None
+
+        os.utime(metadata_path)
+        return package
+
+    def __add(self, key, package_path):
+        reader = PackageReader(package_path)
+        names  = SharedPackage.member_names(reader.manifest)
+        if sum(reader.size(name) for name in names) > self.max_size:
+            logger.info("Package cache: {0} is larger than the cache, not cached".format(package_path))
+            return reader
+
+        temporary = []
+        try:
+            with reader:
+                (fd, data_path) = tempfile.mkstemp(prefix='.' + key, suffix='.tmp', dir=self.cache_dir)
+                temporary.append(data_path)
+                with os.fdopen(fd, 'wb') as f:
+                    members = SharedPackage.write_members(reader, f)
+
+                metadata = {
+                    'version':  PackageCache.VERSION,
+                    'sha256':   key,
+                    'stamp':    PackageCache.__stamp(os.stat(data_path)),
+                    'manifest': bytes(reader.read(Package.MANIFEST_FILENAME)).decode('utf-8'),
+                    'members':  {name: {'offset': offset,
+                                        'size':   member_size,
+                                        'sha256': hashlib.sha256(reader.read(name)).hexdigest()}
+                                 for (name, (offset, member_size)) in members.items()},
+                }
+                (fd, metadata_path) = tempfile.mkstemp(prefix='.' + key, suffix='.tmp', dir=self.cache_dir)
+                temporary.append(metadata_path)
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(metadata, f)
+
+            with self.__locked():
+                os.replace(data_path, self.__path(key, '.pkg'))
+                os.replace(metadata_path, self.__path(key, '.json'))
+                temporary = []
+                self.__evict(key)
+                package = self.__lookup(key)
+        finally:
+            for path in temporary:
+                os.remove(path)
+
+        if package is None:
+            raise PackageException("Package cache: Entry {0} of {1} cannot be read back".format(key, package_path))
+        return package
+
+    def __evict(self, keep):
+        """ Removes the least recently used entries until the cache fits in max_size. Called locked. """
+        now     = time.time()
+        entries = []
+        paths   = []
+        for filename in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                if filename.endswith('.tmp'):
+                    if now - os.stat(path).st_mtime > PackageCache.STALE_TIME:
+                        os.remove(path)
+                elif filename.endswith('.path'):
+                    paths.append(path)
+                elif filename.endswith('.json'):
+                    key = filename[:-len('.json')]
+                    entries.append((os.stat(path).st_mtime, key, os.stat(self.__path(key, '.pkg')).st_size))
+            except OSError:
+                # Removed meanwhile, or an entry without images
+                continue
+
+        total = sum(size for (_, _, size) in entries)
+        for (_, key, size) in sorted(entries):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            logger.debug("Package cache: Evicting {0}".format(key))
+            # Processes still mapping the images keep them until they close the package
+            for extension in ('.json', '.pkg'):
+                with contextlib.suppress(OSError):
+                    os.remove(self.__path(key, extension))
+            total -= size
+
+        # Hashes of package paths whose entry is gone
+        for path in paths:
+            try:
+                with open(path, 'r') as f:
+                    key = json.load(f)['sha256']
+                if not os.path.exists(self.__path(key, '.json')):
+                    os.remove(path)
+            except (OSError, ValueError, KeyError, TypeError):
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+
+    @contextlib.contextmanager
+    def __locked(self):
+        """ Holds an exclusive lock on the cache directory, shared by all processes. """
+        with open(os.path.join(self.cache_dir, PackageCache.LOCK_FILENAME), 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                elif msvcrt is not None:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,191 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Pre-flight verification of a DFU package, before any byte of it is sent to a device.
+
+The bootloader only checks the firmware of an image against the hash and sizes of its init
+packet once the whole firmware has been received. A package whose firmware does not match
+its init packet is rejected here instead, before the first device is even connected.
+"""
+
+# Python standard library
+import zlib
+import hashlib
+import logging
+import zipfile
+import threading
+import weakref
+
+# 3rd party libraries
+from google.protobuf.message import DecodeError
+
+# Nordic libraries
+from nordicsemi.dfu.init_packet_pb import InitPacketPB, DFUType, HashTypes
+from nordicsemi.dfu.package        import PackageException
+
+logger = logging.getLogger(__name__)
+
+
+class Preflight:
+    """
+    Checks every image of a package: its init packet is decoded with InitPacketPB, and its hash
+    type, hash and sizes are checked against the firmware.
+
+    The result is kept for as long as the package is open, so the DFUs of a batch sharing a
+    package verify it once.
+    """
+
+    HASH_CHUNK = 1024 * 1024
+
+    # The bootloader rejects init packets with other hash types
+    SUPPORTED_HASH_TYPES = (HashTypes.SHA256,)
+
+    # Init packet types allowed in each entry of the manifest
+    DFU_TYPES = {
+        'softdevice_bootloader': (DFUType.SOFTDEVICE_BOOTLOADER,),
+        'softdevice':            (DFUType.SOFTDEVICE,),
+        'bootloader':            (DFUType.BOOTLOADER,),
+        'application':           (DFUType.APPLICATION, DFUType.EXTERNAL_APPLICATION),
+    }
+
+    __results = weakref.WeakKeyDictionary()  # Package -> errors found in it
+    __lock    = threading.Lock()
+
+    @staticmethod
+    def verify(package):
+        """
+        Verifies a package, once.
+
+        :param package: Package to verify, e.g. a nordicsemi.dfu.package.PackageReader.
+        :return: None
+        :raises PackageException: If an image does not match its init packet.
+        """
+        with Preflight.__lock:
+            errors = Preflight.__results.get(package)
+            if errors is None:
+                errors = Preflight.__results[package] = Preflight.errors(package)
+                if not errors:
+                    logger.info("Pre-flight: Package verified.")
+
+        if errors:
+            raise PackageException("Package failed pre-flight verification: {0}".format("; ".join(errors)))
+
+    @staticmethod
+    def errors(package):
+        """
+        Returns the mismatches between the images of a package and their init packets.
+
+        :param package: Package to verify.
+        :return list: Description of every mismatch found, empty if the package is valid.
+        """
+        errors = []
+        for (entry, dfu_types) in Preflight.DFU_TYPES.items():
+            firmware = getattr(package.manifest, entry)
+            if firmware:
+                errors.extend("{0}: {1}".format(firmware.bin_file, error)
+                              for error in Preflight.image_errors(package, firmware, dfu_types))
+        return errors
+
+    @staticmethod
+    def image_errors(package, firmware, dfu_types):
+        """
+        Returns the mismatches between an image of a package and its init packet.
+
+        :param package: Package holding the image.
+        :param firmware: Image of the manifest, e.g. manifest.application
+        :param tuple dfu_types: Init packet types allowed for the image.
+        :return list: Description of every mismatch found.
+        """
+        try:
+            init_command = InitPacketPB(from_bytes=bytes(package.read(firmware.dat_file))).init_command
+        except (DecodeError, RuntimeError) as e:
+            return ["init packet {0} cannot be decoded: {1}".format(firmware.dat_file, e)]
+
+        errors = []
+        try:
+            dfu_type = DFUType(init_command.type)
+        except ValueError:
+            dfu_type = init_command.type
+        if dfu_type not in dfu_types:
+            errors.append("init packet is for a {0} image".format(getattr(dfu_type, 'name', dfu_type)))
+
+        size      = package.size(firmware.bin_file)
+        init_size = {
+            DFUType.APPLICATION:           init_command.app_size,
+            DFUType.EXTERNAL_APPLICATION:  init_command.app_size,
+            DFUType.SOFTDEVICE:            init_command.sd_size,
+            DFUType.BOOTLOADER:            init_command.bl_size,
+            DFUType.SOFTDEVICE_BOOTLOADER: init_command.sd_size + init_command.bl_size,
+        }.get(dfu_type)
+        if init_size is not None and init_size != size:
+            errors.append("firmware is {0} bytes, the init packet expects {1}".format(size, init_size))
+
+        try:
+            hash_type = HashTypes(init_command.hash.hash_type)
+        except ValueError:
+            hash_type = init_command.hash.hash_type
+        if hash_type not in Preflight.SUPPORTED_HASH_TYPES:
+            errors.append("hash type {0} is not supported".format(getattr(hash_type, 'name', hash_type)))
+        else:
+            try:
+                digest = Preflight.__digest(package, firmware.bin_file)
+            except (zipfile.BadZipFile, zlib.error, IOError) as e:
+                errors.append("firmware cannot be read: {0}".format(e))
+            else:
+                if digest != bytes(init_command.hash.hash):
+                    errors.append("SHA-256 does not match the hash of the init packet")
+        return errors
+
+    @staticmethod
+    def __digest(package, name):
+        """
+        Returns the SHA-256 of a member in the little endian order of init packets.
+
+        A package keeping the SHA-256 of its members, a CachedPackage, returns it: its entry is
+        only opened while its images are unchanged. Other members are read HASH_CHUNK bytes at a
+        time through firmware_source, so a deflated member is not kept inflated by the package
+        and is still streamed by the transports.
+        """
+        if hasattr(package, 'digest'):
+            return package.digest(name)[::-1]
+
+        sha256 = hashlib.sha256()
+        with package.firmware_source(name) as source:
+            for offset in range(0, source.size, Preflight.HASH_CHUNK):
+                sha256.update(source.read(offset, Preflight.HASH_CHUNK))
+        return sha256.digest()[::-1]
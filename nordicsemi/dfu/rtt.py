@@ -0,0 +1,136 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Response deadlines of the serial DFU transport derived from measured round-trip times.
+
+Each kind of request keeps a smoothed round-trip time and its variation, as the TCP
+retransmission timer does (RFC 6298). The deadline of a request is a few variations above
+the smoothed time, so a dead link is detected within a few round trips while a target
+that is slow but steady is not timed out.
+
+Requests working on flash, such as Execute of a data object, take time in proportion to
+the object size. Their samples and deadlines are per unit of work, e.g. per flash page.
+"""
+
+# Python standard library
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RttEstimator:
+    """
+    Smoothed round-trip time and deadline of each kind of request.
+
+    :param float initial_timeout: Deadline per unit before the first sample of a request.
+    :param float min_timeout: Lower bound of a deadline, covering host scheduling jitter.
+    :param float max_timeout: Upper bound of a deadline.
+    """
+
+    ALPHA = 1 / 8   # Gain of the smoothed round-trip time
+    BETA  = 1 / 4   # Gain of the round-trip time variation
+    K     = 4       # Variations added to the smoothed round-trip time
+
+    DEFAULT_MIN_TIMEOUT = 0.1
+    MAX_BACKOFF         = 64
+
+    def __init__(self, initial_timeout, min_timeout=DEFAULT_MIN_TIMEOUT, max_timeout=None):
+        self.initial_timeout = initial_timeout
+        self.min_timeout     = min_timeout
+        self.max_timeout     = max_timeout
+        self.estimates       = {}  # key -> (smoothed round-trip time, variation), per unit
+        self.backoffs        = {}  # key -> factor applied to the deadline since the last timeout
+
+    def timeout(self, key, units=1):
+        """
+        Returns the deadline in seconds for the response to a request.
+
+        :param key: Kind of request, e.g. its opcode.
+        :param int units: Work done by the target for the request, e.g. flash pages.
+        :return float: Seconds to wait for the response.
+        """
+        estimate = self.estimates.get(key)
+        if estimate is None:
+            timeout = self.initial_timeout * units
+        else:
+            (srtt, rttvar) = estimate
+            timeout = (srtt + RttEstimator.K * rttvar) * units * self.backoffs.get(key, 1)
+
+        timeout = max(timeout, self.min_timeout)
+        if self.max_timeout is not None:
+            timeout = min(timeout, self.max_timeout)
+        return timeout
+
+    def sample(self, key, rtt, units=1):
+        """
+        Updates the estimate of a request with a measured round-trip time.
+
+        Only responses to requests that did not time out may be sampled: a late response
+        cannot be told apart from the response to a repeated request (Karn's algorithm).
+
+        :param key: Kind of request.
+        :param float rtt: Seconds from the request to its response.
+        :param int units: Work done by the target for the request.
+        """
+        rtt      = rtt / max(units, 1)
+        estimate = self.estimates.get(key)
+        self.backoffs.pop(key, None)
+        if estimate is None:
+            self.estimates[key] = (rtt, rtt / 2)
+            return
+
+        (srtt, rttvar) = estimate
+        rttvar = (1 - RttEstimator.BETA) * rttvar + RttEstimator.BETA * abs(srtt - rtt)
+        srtt   = (1 - RttEstimator.ALPHA) * srtt + RttEstimator.ALPHA * rtt
+        self.estimates[key] = (srtt, rttvar)
+
+    def backoff(self, key):
+        """
+        Doubles the deadline of a request after it timed out, until the next sample.
+
+        Requests without any sample already wait for the initial timeout, which is not
+        backed off.
+
+        :param key: Kind of request.
+        :return bool: True if the deadline was backed off and waiting longer is worth it.
+        """
+        if key not in self.estimates:
+            return False
+        self.backoffs[key] = min(self.backoffs.get(key, 1) * 2, RttEstimator.MAX_BACKOFF)
+        logger.debug("RTT: Deadline of {} backed off to {:.3f} s".format(key, self.timeout(key)))
+        return True
@@ -0,0 +1,246 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+DFU package loaded once and shared by several processes.
+
+A PackageReader opened in each worker process of a multi-process batch parses the manifest
+and inflates the images of the package again, and keeps its own copy of them. A SharedPackage
+is loaded by the parent process instead: the images are written once, uncompressed, to a
+file memory-mapped by every process. Workers attach to it from a small descriptor and read
+the images as views of the mapping, whose pages are shared by all processes.
+
+    with SharedPackage.create('app_dfu_package.zip') as package:
+        with multiprocessing.Pool(processes) as pool:
+            pool.starmap(flash, [(package.descriptor, ports) for ports in shards])
+
+    def flash(descriptor, ports):
+        with SharedPackage.attach(descriptor) as package:
+            return DfuBatch(None, ports, package=package).run()
+
+A SharedPackage can also be passed to a worker directly, it is pickled as its descriptor.
+"""
+
+# Python standard library
+import os
+import mmap
+import tempfile
+
+# Nordic libraries
+from nordicsemi.dfu.package         import PackageReader, PackageException
+from nordicsemi.dfu.firmware_source import BufferFirmware
+
+
+class SharedPackageDescriptor:
+    """ Everything a process needs to attach to a SharedPackage. Small and picklable. """
+
+    def __init__(self, path, manifest, members):
+        """
+        :param str path: Path of the file holding the images.
+        :param manifest: Parsed manifest of the package, nordicsemi.dfu.manifest.Manifest.
+        :param dict members: Name of a member -> (offset, size) of its contents in the file.
+        """
+        self.path     = path
+        self.manifest = manifest
+        self.members  = members
+
+
+class SharedPackage:
+    """
+    Manifest, init packets and firmware images of a DFU package, memory-mapped from a file
+    shared between processes.
+
+    Has the interface of PackageReader used by Dfu and DfuBatch. Members are returned as
+    read-only views of the mapping, without a copy.
+    """
+
+    # tmpfs where available, the file then never reaches a disk
+    SHARED_DIR = '/dev/shm'
+
+    def __init__(self, descriptor, owner=False):
+        """
+        Attaches to a package created by SharedPackage.create.
+
+        :param SharedPackageDescriptor descriptor: Descriptor of the package.
+        :param bool owner: Remove the file on close. Only set by SharedPackage.create.
+        """
+        self.descriptor = descriptor
+        self.manifest   = descriptor.manifest
+        self.owner      = owner
+
+        try:
+            with open(descriptor.path, 'rb') as f:
+                self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise PackageException("Shared package {0} cannot be mapped: {1}".format(descriptor.path, e))
+        self.view    = memoryview(self.mmap)
+        self.__views = {}   # Name -> view returned by read, the same for every DFU of the process
+
+    @staticmethod
+    def create(package_path):
+        """
+        Loads a package to share it with other processes.
+
+        The CRC32 of every member is checked once, here. The file holding the images is
+        removed when the returned package is closed.
+
+        :param str package_path: Path to the package
+        :return SharedPackage: Package owning the shared file.
+        """
+        with PackageReader(package_path) as reader:
+            shared_dir = SharedPackage.SHARED_DIR if os.path.isdir(SharedPackage.SHARED_DIR) else None
+            (fd, path) = tempfile.mkstemp(prefix="nrf_dfu_", suffix=".pkg", dir=shared_dir)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    members = SharedPackage.write_members(reader, f)
+                return SharedPackage(SharedPackageDescriptor(path, reader.manifest, members), owner=True)
+            except:
+                os.remove(path)
+                raise
+
+    @staticmethod
+    def member_names(manifest):
+        """
+        Returns the names of the init packets and firmware images of a manifest, in update order.
+
+        :param manifest: Parsed manifest, nordicsemi.dfu.manifest.Manifest.
+        :return list: Names of the members, without duplicates.
+        """
+        names = []
+        for firmware in (manifest.softdevice_bootloader,
+                         manifest.softdevice,
+                         manifest.bootloader,
+                         manifest.application):
+            if firmware:
+                names.extend(name for name in (firmware.dat_file, firmware.bin_file) if name not in names)
+        return names
+
+    @staticmethod
+    def write_members(reader, f):
+        """
+        Writes the init packets and firmware images of a package back to back, in the layout
+        mapped by SharedPackage.
+
+        :param PackageReader reader: Package to write.
+        :param f: Binary file object to write to.
+        :return dict: Name of a member -> (offset, size) of its contents in the file.
+        """
+        members = {}
+        for name in SharedPackage.member_names(reader.manifest):
+            contents      = reader.read(name)
+            members[name] = (f.tell(), len(contents))
+            f.write(contents)
+        if not f.tell():
+            # Empty files cannot be mapped
+            f.write(b'\0')
+        return members
+
+    @staticmethod
+    def attach(descriptor):
+        """
+        Attaches to a package created by another process.
+
+        :param SharedPackageDescriptor descriptor: SharedPackage.descriptor of the package.
+        :return SharedPackage: Package, to be closed once done with.
+        """
+        return SharedPackage(descriptor)
+
+    def __reduce__(self):
+        return (SharedPackage.attach, (self.descriptor,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Releases the mapping, and removes the file if the package was created by this process.
+        Views of members must not be used anymore.
+        """
+        self.__views.clear()
+        self.view.release()
+        try:
+            self.mmap.close()
+        except BufferError:
+            # Views of members are still referenced, the mapping goes with the last one
+            pass
+        if self.owner:
+            self.owner = False
+            try:
+                os.remove(self.descriptor.path)
+            except OSError:
+                # Still mapped by another process on Windows
+                pass
+
+    def size(self, name):
+        """
+        Returns the size of a member.
+
+        :param str name: Name of the member
+        :return int: Size in bytes.
+        """
+        return self.__member(name)[1]
+
+    def read(self, name):
+        """
+        Returns the contents of a member.
+
+        :param str name: Name of the member
+        :return memoryview: Read-only view of the mapping.
+        """
+        view = self.__views.get(name)
+        if view is None:
+            (offset, size) = self.__member(name)
+            view = self.__views.setdefault(name, self.view[offset:offset + size])
+        return view
+
+    def firmware_source(self, name):
+        """
+        Returns a member as a FirmwareSource, read one object at a time by the serial transports.
+
+        :param str name: Name of the member
+        :return BufferFirmware: View of the mapping.
+        """
+        return BufferFirmware(self.read(name))
+
+    def __member(self, name):
+        member = self.descriptor.members.get(name) if name else None
+        if member is None:
+            raise PackageException("Package file {0} not found.".format(name))
+        return member
@@ -0,0 +1,456 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Simulated nRF DFU serial bootloader served on a Linux pseudo-terminal.
+
+The simulator implements the serial DFU opcodes used by DfuTransportSerial with real
+object/offset/CRC32 state, so the unmodified transport can flash against it and throughput
+work can be measured without hardware. Flash operations are modelled as a fixed latency per
+page erase and page write on Execute.
+
+USAGE:
+    python -m nordicsemi.dfu.sim_bootloader [--mtu 131] [--max-size 4096] [--baud-rate 115200]
+                                            [--latency 0.002] [--page-erase-time 0] [--page-write-time 0]
+                                            [--dfu-start TEXT] [--boot-time 0.2] [--reset-time 0.3]
+
+    The path of the pseudo-terminal is printed on stdout, pass it to nrfutil-dfu-serial with -p.
+"""
+
+# Python standard library
+import os
+import pty
+import tty
+import time
+import errno
+import select
+import struct
+import logging
+import argparse
+import binascii
+import queue
+import threading
+
+# Nordic libraries
+from nordicsemi.dfu.dfu_transport_serial import Slip, SlipDecoder, DfuTransportSerial
+from nordicsemi.dfu.dfu_transport import DfuTransport
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedObject:
+    """ Object/offset/CRC32 state of either the command or the data object type. """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.data     = bytearray()
+        self.executed = 0
+        self.size     = 0
+        self.crc      = 0
+
+    @property
+    def offset(self):
+        return len(self.data)
+
+    def create(self, size):
+        # Data of an object which was not executed is discarded.
+        del self.data[self.executed:]
+        self.crc  = binascii.crc32(self.data) & 0xFFFFFFFF
+        self.size = size
+
+    def write(self, data):
+        self.data += data
+        self.crc   = binascii.crc32(data, self.crc) & 0xFFFFFFFF
+
+
+class SimulatedBootloader:
+    """
+    Serial DFU bootloader answering on the slave side of a pseudo-terminal.
+
+    :param int mtu: MTU reported by GetSerialMTU, as the size of a SLIP encoded frame.
+    :param int max_size: Maximum size of a data object.
+    :param int command_max_size: Maximum size of the command object (init packet).
+    :param int page_size: Flash page size used by the timing model.
+    :param float page_erase_time: Seconds spent erasing a flash page on Execute.
+    :param float page_write_time: Seconds spent writing a flash page on Execute.
+    :param int baud_rate: If set, received data is delayed as if it was sent over a UART line.
+    :param float latency: Seconds each response takes to reach the host, as on a USB-serial bridge.
+    :param int rx_buffer_size: Size of the decoded WriteObject payload the target accepts. By default
+        the MTU is the worst case SLIP encoding of this buffer, as on the nRF bootloader.
+    :param str dfu_start: If set, the target starts in its application, which ignores DFU requests
+        until it receives this text and resets into the bootloader.
+    :param float boot_time: Seconds from the DFU start text to the bootloader answering requests.
+    :param float reset_time: If set, the target resets after receiving the last data object of a
+        SoftDevice or bootloader image, as sized by its init packet, and ignores requests for this
+        many seconds while activating it. Images with an init packet that cannot be parsed never
+        reset the target.
+    """
+
+    DEFAULT_MTU              = 131
+    DEFAULT_MAX_SIZE         = 4096
+    DEFAULT_COMMAND_MAX_SIZE = 512
+    DEFAULT_PAGE_SIZE        = 4096
+    DEFAULT_PAGE_ERASE_TIME  = 0.085
+    DEFAULT_PAGE_WRITE_TIME  = 0.041
+
+    OBJECT_COMMAND = 0x01
+    OBJECT_DATA    = 0x02
+
+    def __init__(self,
+                 mtu=DEFAULT_MTU,
+                 max_size=DEFAULT_MAX_SIZE,
+                 command_max_size=DEFAULT_COMMAND_MAX_SIZE,
+                 page_size=DEFAULT_PAGE_SIZE,
+                 page_erase_time=DEFAULT_PAGE_ERASE_TIME,
+                 page_write_time=DEFAULT_PAGE_WRITE_TIME,
+                 baud_rate=None,
+                 latency=0.0,
+                 rx_buffer_size=None,
+                 dfu_start=None,
+                 boot_time=0.0,
+                 reset_time=None):
+        self.mtu              = mtu
+        self.max_size         = max_size
+        self.command_max_size = command_max_size
+        self.page_size        = page_size
+        self.page_erase_time  = page_erase_time
+        self.page_write_time  = page_write_time
+        self.baud_rate        = baud_rate
+        self.latency          = latency
+        self.rx_buffer_size   = rx_buffer_size if rx_buffer_size is not None else (mtu - 1) // 2 - 1
+        self.dfu_start        = dfu_start.encode('utf-8') if dfu_start else None
+        self.boot_time        = boot_time
+        self.reset_time       = reset_time
+
+        self.master_fd   = None
+        self.slave_fd    = None
+        self.port        = None
+        self.thread      = None
+        self.running     = False
+        self.responses   = queue.Queue()
+        self.responder   = None
+
+        self.decoder     = SlipDecoder()
+        self.stats       = {'frames': 0, 'bytes': 0, 'objects': 0}
+        self.application = bytearray()
+        self.booted_at   = None if self.dfu_start else 0.0
+        self.activated   = []  # (init packet, firmware) of every image activated by a reset
+        self.__reset_state()
+
+    def __reset_state(self):
+        self.prn         = 0
+        self.prn_count   = 0
+        self.objects     = {SimulatedBootloader.OBJECT_COMMAND: SimulatedObject(self.command_max_size),
+                            SimulatedBootloader.OBJECT_DATA:    SimulatedObject(self.max_size)}
+        self.selected    = None
+        self.image_size  = None  # Size of an image activated by a reset, from its init packet
+
+    @property
+    def firmware(self):
+        """ Data received and executed so far. """
+        data = self.objects[SimulatedBootloader.OBJECT_DATA]
+        return bytes(data.data[:data.executed])
+
+    @property
+    def init_packet(self):
+        command = self.objects[SimulatedBootloader.OBJECT_COMMAND]
+        return bytes(command.data[:command.executed])
+
+    def start(self):
+        """
+        Creates the pseudo-terminal and starts answering on it.
+
+        :return str: Path of the serial port to open.
+        """
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        tty.setraw(self.master_fd)
+        self.port    = os.ttyname(self.slave_fd)
+        self.running = True
+        self.thread  = threading.Thread(target=self.__run, name='sim-bootloader', daemon=True)
+        self.thread.start()
+        if self.latency:
+            self.responder = threading.Thread(target=self.__deliver, name='sim-bootloader-tx', daemon=True)
+            self.responder.start()
+        return self.port
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        if self.responder:
+            self.responses.put(None)
+            self.responder.join()
+            self.responder = None
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self.master_fd = self.slave_fd = self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def __run(self):
+        while self.running:
+            readable, _, _ = select.select([self.master_fd], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                data = os.read(self.master_fd, 65536)
+            except OSError as e:
+                if e.errno == errno.EIO:
+                    continue
+                raise
+
+            if self.baud_rate:
+                time.sleep(len(data) * 10.0 / self.baud_rate)
+
+            if not self.__bootloader_running(data):
+                continue
+
+            self.stats['bytes'] += len(data)
+            for frame in self.decoder.feed(data):
+                self.stats['frames'] += 1
+                self.__handle(frame)
+
+    def __bootloader_running(self, data):
+        """
+        Returns False while data is received by the application or during the reset.
+        """
+        if self.booted_at is None:
+            self.application += data
+            if self.dfu_start in self.application:
+                logger.debug("Sim: DFU start text received, resetting into the bootloader")
+                self.booted_at = time.monotonic() + self.boot_time
+            return False
+        if time.monotonic() < self.booted_at:
+            return False
+        return True
+
+    def __deliver(self):
+        while True:
+            item = self.responses.get()
+            if item is None:
+                return
+            (due, packet) = item
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.__write(packet)
+
+    def __send(self, payload):
+        packet = Slip.encode_bytes(payload)
+        if self.latency:
+            self.responses.put((time.monotonic() + self.latency, packet))
+        else:
+            self.__write(packet)
+
+    def __write(self, packet):
+        while packet:
+            written = os.write(self.master_fd, packet)
+            packet  = packet[written:]
+
+    def __respond(self, op_code, result=DfuTransport.RES_CODE['Success'], payload=b''):
+        self.__send(bytes([DfuTransportSerial.OP_CODE['Response'], op_code, result]) + payload)
+
+    def __handle(self, frame):
+        op_code = frame[0]
+        op      = DfuTransportSerial.OP_CODE
+
+        if op_code == op['WriteObject']:
+            self.__write_object(frame[1:])
+        elif op_code == op['Ping']:
+            self.__respond(op_code, payload=frame[1:2])
+        elif op_code == op['SetPRN']:
+            (self.prn,)    = struct.unpack('<H', frame[1:3])
+            self.prn_count = 0
+            self.__respond(op_code)
+        elif op_code == op['GetSerialMTU']:
+            self.__respond(op_code, payload=struct.pack('<H', self.mtu))
+        elif op_code == op['ReadObject']:
+            self.__select(frame[1])
+        elif op_code == op['CreateObject']:
+            (object_type, size) = struct.unpack('<BL', frame[1:6])
+            self.__create(object_type, size)
+        elif op_code == op['CalcChecSum']:
+            self.__checksum(op_code)
+        elif op_code == op['Execute']:
+            self.__execute()
+        else:
+            self.__respond(op_code, DfuTransport.RES_CODE['InvalidCode'])
+
+    def __select(self, object_type):
+        obj = self.objects.get(object_type)
+        if obj is None:
+            self.__respond(DfuTransportSerial.OP_CODE['ReadObject'], DfuTransport.RES_CODE['UnsupportedType'])
+            return
+        self.selected = object_type
+        self.__respond(DfuTransportSerial.OP_CODE['ReadObject'],
+                       payload=struct.pack('<III', obj.max_size, obj.offset, obj.crc))
+
+    def __create(self, object_type, size):
+        obj = self.objects.get(object_type)
+        if obj is None:
+            self.__respond(DfuTransportSerial.OP_CODE['CreateObject'], DfuTransport.RES_CODE['UnsupportedType'])
+            return
+        if size > obj.max_size:
+            self.__respond(DfuTransportSerial.OP_CODE['CreateObject'], DfuTransport.RES_CODE['InsufficientResources'])
+            return
+        if object_type == SimulatedBootloader.OBJECT_COMMAND:
+            # A new init packet restarts the transfer.
+            obj.executed = 0
+            self.objects[SimulatedBootloader.OBJECT_DATA] = SimulatedObject(self.max_size)
+        obj.create(size)
+        self.selected  = object_type
+        self.prn_count = 0
+        self.__respond(DfuTransportSerial.OP_CODE['CreateObject'])
+
+    def __write_object(self, data):
+        obj = self.objects.get(self.selected)
+        if obj is None:
+            return
+        if len(data) > self.rx_buffer_size or obj.offset + len(data) > obj.executed + obj.size:
+            logger.debug("Sim: WriteObject of {} bytes dropped".format(len(data)))
+            return
+        obj.write(data)
+        self.prn_count += 1
+        if self.prn and self.prn_count >= self.prn:
+            self.prn_count = 0
+            self.__checksum(DfuTransportSerial.OP_CODE['CalcChecSum'])
+
+    def __checksum(self, op_code):
+        obj = self.objects.get(self.selected)
+        if obj is None:
+            self.__respond(op_code, DfuTransport.RES_CODE['OperationNotPermitted'])
+            return
+        self.__respond(op_code, payload=struct.pack('<II', obj.offset, obj.crc))
+
+    def __execute(self):
+        op_code = DfuTransportSerial.OP_CODE['Execute']
+        obj = self.objects.get(self.selected)
+        if obj is None:
+            self.__respond(op_code, DfuTransport.RES_CODE['OperationNotPermitted'])
+            return
+
+        if self.selected == SimulatedBootloader.OBJECT_DATA:
+            size  = obj.offset - obj.executed
+            pages = (size + self.page_size - 1) // self.page_size
+            time.sleep(pages * (self.page_erase_time + self.page_write_time))
+
+        obj.executed = obj.offset
+        self.stats['objects'] += 1
+        self.__respond(op_code)
+
+        if self.reset_time is None:
+            return
+        if self.selected == SimulatedBootloader.OBJECT_COMMAND:
+            self.image_size = self.__activated_size(self.init_packet)
+        elif self.image_size is not None and obj.executed >= self.image_size:
+            self.__reset()
+
+    @staticmethod
+    def __activated_size(init_packet):
+        """
+        Returns the size of the image described by init_packet if it is activated by a reset.
+        """
+        try:
+            from nordicsemi.dfu.init_packet_pb import InitPacketPB, DFUType
+            init_command = InitPacketPB(from_bytes=init_packet).init_command
+        except Exception:
+            return None
+        if init_command.type not in (DFUType.SOFTDEVICE.value, DFUType.BOOTLOADER.value,
+                                     DFUType.SOFTDEVICE_BOOTLOADER.value):
+            return None
+        return init_command.sd_size + init_command.bl_size
+
+    def __reset(self):
+        logger.debug("Sim: Image received, resetting to activate it")
+        self.activated.append((self.init_packet, self.firmware))
+        self.booted_at = time.monotonic() + self.reset_time
+        self.decoder.reset()
+        self.__reset_state()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulated nRF DFU serial bootloader on a pseudo-terminal.')
+    parser.add_argument('--mtu', type=int, default=SimulatedBootloader.DEFAULT_MTU,
+                        help="MTU reported by GetSerialMTU (default: %(default)s).")
+    parser.add_argument('--max-size', type=int, default=SimulatedBootloader.DEFAULT_MAX_SIZE,
+                        help="Maximum size of a data object (default: %(default)s).")
+    parser.add_argument('--rx-buffer-size', type=int, default=None,
+                        help="Largest WriteObject payload accepted (default: derived from the MTU).")
+    parser.add_argument('--page-size', type=int, default=SimulatedBootloader.DEFAULT_PAGE_SIZE,
+                        help="Flash page size (default: %(default)s).")
+    parser.add_argument('--page-erase-time', type=float, default=SimulatedBootloader.DEFAULT_PAGE_ERASE_TIME,
+                        help="Seconds per page erase on Execute (default: %(default)s).")
+    parser.add_argument('--page-write-time', type=float, default=SimulatedBootloader.DEFAULT_PAGE_WRITE_TIME,
+                        help="Seconds per page write on Execute (default: %(default)s).")
+    parser.add_argument('--baud-rate', type=int, default=None,
+                        help="Delay received data as if sent over a UART at this rate (default: no delay).")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Seconds each response is delayed (default: %(default)s).")
+    parser.add_argument('--dfu-start', type=str, default=None,
+                        help="Start in the application, entering the bootloader on this text (default: bootloader).")
+    parser.add_argument('--boot-time', type=float, default=0.0,
+                        help="Seconds from the DFU start text to the bootloader answering (default: %(default)s).")
+    parser.add_argument('--reset-time', type=float, default=None,
+                        help="Reset for this many seconds after a SoftDevice or bootloader image (default: no reset).")
+    args = parser.parse_args(argv)
+
+    sim = SimulatedBootloader(mtu=args.mtu, max_size=args.max_size, page_size=args.page_size,
+                              page_erase_time=args.page_erase_time, page_write_time=args.page_write_time,
+                              baud_rate=args.baud_rate, latency=args.latency,
+                              rx_buffer_size=args.rx_buffer_size, dfu_start=args.dfu_start,
+                              boot_time=args.boot_time, reset_time=args.reset_time)
+    print(sim.start(), flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+        logger.info("Sim: {} frames, {} bytes, {} objects executed".format(
+            sim.stats['frames'], sim.stats['bytes'], sim.stats['objects']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+# Python standard library
+import os
+
+# Nordic libraries
+from nordicsemi.lister.sysfs_lister    import SysfsLister
+from nordicsemi.lister.pyserial_lister import PySerialLister
+
+
+class DeviceLister:
+    """
+    Finds connected USB serial devices by USB ID, serial number or serial port.
+    """
+
+    BOOTLOADER_IDS = (('1915', '521f'),     # nRF52 SDFU USB
+                      ('1366', '0105'),     # JLink CDC UART Port
+                      ('1366', '1015'))     # JLink CDC UART Port (MSD)
+
+    def __init__(self, backend=None):
+        """
+        :param backend: AbstractLister to use, by default the sysfs when available.
+        """
+        if backend is None:
+            backend = SysfsLister() if SysfsLister.is_available() else PySerialLister()
+        self.backend = backend
+
+    def enumerate(self):
+        return self.backend.enumerate()
+
+    def get_device(self, get_all=False, **kwargs):
+        """
+        Returns the connected device matching all of the given attributes.
+
+        :param bool get_all: Return the list of all matching devices instead of the first one.
+        :param kwargs: vendor_id, product_id and serial_number of the device, com for one of its
+                       serial ports, bootloader=True to only match devices in bootloader mode.
+        :return: EnumeratedDevice, None if no device matches, or a list if get_all is set.
+        """
+        if kwargs.get('com') is not None:
+            # A port may be given through a link, e.g. in /dev/serial/by-id
+            kwargs['com'] = (kwargs['com'], os.path.realpath(kwargs['com']))
+
+        devices = [device for device in self.enumerate() if DeviceLister.__match(device, **kwargs)]
+        if get_all:
+            return devices
+        return devices[0] if devices else None
+
+    @staticmethod
+    def is_bootloader(device):
+        """
+        Returns True if device is an nRF bootloader or a J-Link interface.
+        """
+        if not device:
+            return False
+        return (device.vendor_id.lower(), device.product_id.lower()) in DeviceLister.BOOTLOADER_IDS
+
+    @staticmethod
+    def __match(device, vendor_id=None, product_id=None, serial_number=None, com=None, bootloader=None):
+        if vendor_id is not None and device.vendor_id != vendor_id.lower():
+            return False
+        if product_id is not None and device.product_id != product_id.lower():
+            return False
+        if serial_number is not None and device.serial_number.lower() != serial_number.lower():
+            return False
+        if com is not None and not any(port in device.com_ports for port in com):
+            return False
+        if bootloader is not None and DeviceLister.is_bootloader(device) != bootloader:
+            return False
+        return True
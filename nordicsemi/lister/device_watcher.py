@@ -0,0 +1,232 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Hotplug notifications for device nodes.
+
+A USB device re-enumerates when it resets into or out of its bootloader: its tty disappears and
+appears again, possibly under another name. DeviceWatcher wakes up as soon as a node is added,
+removed or gets its permissions set by udev, using inotify on the directory of the nodes. Where
+inotify is not available it falls back to polling every POLL_INTERVAL.
+
+USAGE:
+    with DeviceWatcher('/dev/ttyACM0') as watcher:
+        if not watcher.wait_for(lambda: os.path.exists('/dev/ttyACM0'), timeout=10):
+            raise Exception("Device did not enumerate")
+"""
+
+# Python standard library
+import os
+import time
+import errno
+import select
+import ctypes
+import ctypes.util
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceWatcher:
+    """
+    Waits for changes in the directory of a device node, e.g. /dev for /dev/ttyACM0.
+
+    The nearest existing ancestor of the directory is watched, so a /dev/serial/by-id link is
+    followed from the creation of its directory on. Events only wake waiters up: callers check
+    their own condition again after every event, and events are never reported individually.
+    """
+
+    DEV_ROOT      = '/dev'
+    POLL_INTERVAL = 0.05  # seconds, without inotify
+
+    # From <sys/inotify.h>
+    IN_ATTRIB     = 0x00000004
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO   = 0x00000080
+    IN_CREATE     = 0x00000100
+    IN_DELETE     = 0x00000200
+    IN_NONBLOCK   = 0o4000
+    IN_CLOEXEC    = 0o2000000
+
+    EVENTS = IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    __libc = None
+
+    def __init__(self, path=DEV_ROOT):
+        """
+        :param str path: Device node, or directory, to watch for.
+        """
+        self.directory = path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+        self.watched   = set()
+        self.fd        = DeviceWatcher.__inotify_init()
+        self.__watch()
+
+    @staticmethod
+    def __inotify_init():
+        if DeviceWatcher.__libc is None:
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+                libc.inotify_init1
+                libc.inotify_add_watch
+            except (OSError, AttributeError):
+                libc = False
+            DeviceWatcher.__libc = libc
+
+        if not DeviceWatcher.__libc:
+            return None
+
+        fd = DeviceWatcher.__libc.inotify_init1(DeviceWatcher.IN_NONBLOCK | DeviceWatcher.IN_CLOEXEC)
+        if fd < 0:
+            logger.debug("Hotplug: inotify not available ({}), polling".format(
+                os.strerror(ctypes.get_errno())))
+            return None
+        return fd
+
+    def __watch(self):
+        """
+        Adds a watch on the nearest existing ancestor of the directory, if not watched yet.
+        """
+        if self.fd is None:
+            return
+
+        path = self.directory
+        while not os.path.isdir(path) and os.path.dirname(path) != path:
+            path = os.path.dirname(path)
+        if path in self.watched:
+            return
+
+        if DeviceWatcher.__libc.inotify_add_watch(self.fd, os.fsencode(path), DeviceWatcher.EVENTS) < 0:
+            logger.debug("Hotplug: Cannot watch {} ({}), polling".format(
+                path, os.strerror(ctypes.get_errno())))
+            self.close()
+            return
+        self.watched.add(path)
+
+    def fileno(self):
+        return self.fd
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __drain(self):
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+        self.__watch()
+
+    def wait(self, timeout):
+        """
+        Blocks until the next change of the watched directory.
+
+        :param float timeout: Maximum time to wait in seconds.
+        :return bool: False if nothing changed before the timeout. Always True when polling.
+        """
+        if self.fd is None:
+            time.sleep(max(min(timeout, DeviceWatcher.POLL_INTERVAL), 0))
+            return True
+
+        (readable, _, _) = select.select([self.fd], [], [], max(timeout, 0))
+        if not readable:
+            return False
+        self.__drain()
+        return True
+
+    def wait_for(self, condition, timeout, interval=None):
+        """
+        Blocks until condition() returns a true value, checking it again after every change.
+
+        :param condition: Function without parameters.
+        :param float timeout: Maximum time to wait in seconds.
+        :param float interval: Seconds after which condition is checked again without a change,
+                               None to only check it after changes.
+        :return: Last value returned by condition.
+        """
+        deadline = time.monotonic() + timeout
+        result   = condition()
+        while not result:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self.wait(min(remaining, interval) if interval else remaining)
+            result = condition()
+        return result
+
+    async def wait_async(self, timeout):
+        """
+        Waits on the running event loop for the next change of the watched directory, see wait.
+        """
+        if self.fd is None:
+            await asyncio.sleep(max(min(timeout, DeviceWatcher.POLL_INTERVAL), 0))
+            return True
+
+        loop    = asyncio.get_running_loop()
+        changed = loop.create_future()
+        loop.add_reader(self.fd, lambda: changed.done() or changed.set_result(True))
+        try:
+            await asyncio.wait_for(changed, max(timeout, 0))
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            loop.remove_reader(self.fd)
+        self.__drain()
+        return True
+
+    async def wait_for_async(self, condition, timeout, interval=None):
+        """
+        Waits on the running event loop until condition() returns a true value, see wait_for.
+        """
+        deadline = time.monotonic() + timeout
+        result   = condition()
+        while not result:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await self.wait_async(min(remaining, interval) if interval else remaining)
+            result = condition()
+        return result
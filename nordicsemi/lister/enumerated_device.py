@@ -0,0 +1,65 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+class EnumeratedDevice:
+    """
+    USB device with the serial ports it exposes, as found by a lister backend.
+    """
+
+    def __init__(self, vendor_id, product_id, serial_number, com_ports=None, location=None):
+        """
+        :param str vendor_id: USB vendor ID as 4 lowercase hex digits.
+        :param str product_id: USB product ID as 4 lowercase hex digits.
+        :param str serial_number: USB serial number, empty if the device has none.
+        :param list com_ports: Serial ports of the device, in interface order.
+        :param str location: Position of the device in the USB tree, e.g. 1-1.4.
+        """
+        self.vendor_id     = vendor_id
+        self.product_id    = product_id
+        self.serial_number = serial_number
+        self.com_ports     = com_ports if com_ports is not None else []
+        self.location      = location
+
+    def add_com_port(self, port):
+        self.com_ports.append(port)
+
+    def get_first_available_com_port(self):
+        return self.com_ports[0] if self.com_ports else None
+
+    def __repr__(self):
+        return "EnumeratedDevice({0}:{1} serial_number={2} com_ports={3})".format(
+            self.vendor_id, self.product_id, self.serial_number, self.com_ports)
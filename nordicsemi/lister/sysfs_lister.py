@@ -0,0 +1,192 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+USB serial device enumeration from the Linux sysfs.
+
+Every tty in /sys/class/tty backed by a USB interface is resolved to the directories of the
+interface and of the USB device, which hold bInterfaceNumber, idVendor, idProduct and serial.
+No udev database or ioctl is involved, so a scan only costs a few small reads per USB port.
+"""
+
+# Python standard library
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Nordic libraries
+from nordicsemi.lister.lister_backend    import AbstractLister
+from nordicsemi.lister.enumerated_device import EnumeratedDevice
+
+
+class SysfsLister(AbstractLister):
+    """
+    Lists USB serial devices by reading the sysfs, grouping the ports of every USB device.
+
+    The result of a scan is cached until the modification time of the tty class directory or of
+    the device node directory changes, which happens whenever a port is added or removed. A
+    directory modified less than RACY_INTERVAL ago may still change within the same timestamp,
+    so its scan is not cached.
+    """
+
+    SYSFS_ROOT    = '/sys'
+    DEV_ROOT      = '/dev'
+    RACY_INTERVAL = 1.0  # seconds
+
+    __cache = {}
+    __lock  = threading.Lock()
+
+    def __init__(self, sysfs_root=SYSFS_ROOT, dev_root=DEV_ROOT):
+        """
+        :param str sysfs_root: Mount point of the sysfs, or the root of a fake sysfs tree.
+        :param str dev_root: Directory of the device nodes named after the ttys.
+        """
+        self.sysfs_root = os.path.realpath(sysfs_root)
+        self.dev_root   = dev_root
+        self.tty_class  = os.path.join(self.sysfs_root, 'class', 'tty')
+
+    @staticmethod
+    def is_available(sysfs_root=SYSFS_ROOT):
+        return os.path.isdir(os.path.join(sysfs_root, 'class', 'tty'))
+
+    def enumerate(self):
+        key   = (self.sysfs_root, self.dev_root)
+        stamp = self.__stamp()
+        with SysfsLister.__lock:
+            cached = SysfsLister.__cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return list(cached[1])
+
+        devices = self.scan()
+        if None not in stamp and time.time_ns() - max(stamp) > SysfsLister.RACY_INTERVAL * 1e9:
+            with SysfsLister.__lock:
+                SysfsLister.__cache[key] = (stamp, devices)
+        return list(devices)
+
+    def __stamp(self):
+        stamp = []
+        for path in (self.tty_class, self.dev_root):
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def scan(self):
+        """
+        Reads the USB serial devices from the sysfs, bypassing the cache.
+
+        :return list: EnumeratedDevice of every USB device with serial ports, by USB location.
+        """
+        try:
+            names = os.listdir(self.tty_class)
+        except OSError:
+            return []
+
+        # USB device directory -> (EnumeratedDevice, [(interface number, port)])
+        devices = OrderedDict()
+        for name in names:
+            device = self.__tty_device(name)
+            if device is None:
+                continue
+
+            (interface, usb_device) = self.__find_usb_device(device)
+            if usb_device is None:
+                continue
+
+            if usb_device not in devices:
+                devices[usb_device] = (EnumeratedDevice(
+                    vendor_id     = SysfsLister.__read_attribute(usb_device, 'idVendor').lower(),
+                    product_id    = SysfsLister.__read_attribute(usb_device, 'idProduct').lower(),
+                    serial_number = SysfsLister.__read_attribute(usb_device, 'serial'),
+                    location      = os.path.basename(usb_device)), [])
+            devices[usb_device][1].append((interface, os.path.join(self.dev_root, name)))
+
+        result = []
+        for usb_device in sorted(devices):
+            (device, ports) = devices[usb_device]
+            for (interface, port) in sorted(ports):
+                device.add_com_port(port)
+            result.append(device)
+        return result
+
+    def __tty_device(self, name):
+        """
+        Returns the device directory of a tty if it is below a USB host controller.
+
+        Links are resolved one at a time as sysfs links never point to other links, which is much
+        cheaper than os.path.realpath on deep USB trees.
+        """
+        path = os.path.join(self.tty_class, name)
+        try:
+            path = os.path.normpath(os.path.join(self.tty_class, os.readlink(path)))
+        except OSError:
+            # Class entries are directories on old kernels
+            pass
+
+        try:
+            device = os.path.normpath(os.path.join(path, os.readlink(os.path.join(path, 'device'))))
+        except OSError:
+            # Virtual terminals have no device link
+            return None
+
+        # USB devices always sit below a root hub, named usb<bus number>
+        if os.sep + 'usb' not in device:
+            return None
+        return device
+
+    def __find_usb_device(self, path):
+        """
+        Returns the interface number and the USB device directory above a tty device directory.
+        """
+        interface = None
+        while path.startswith(self.sysfs_root) and path != self.sysfs_root:
+            if interface is None and os.path.exists(os.path.join(path, 'bInterfaceNumber')):
+                interface = int(SysfsLister.__read_attribute(path, 'bInterfaceNumber') or '0', 16)
+            if os.path.exists(os.path.join(path, 'idVendor')):
+                return (interface or 0, path)
+            path = os.path.dirname(path)
+        return (None, None)
+
+    @staticmethod
+    def __read_attribute(path, name):
+        try:
+            with open(os.path.join(path, name)) as f:
+                return f.read().strip()
+        except (OSError, UnicodeDecodeError):
+            return ''
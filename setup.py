@@ -58,7 +58,7 @@ setup(
     url="https://github.com/serhiySchindler/pc-nrfutil-dfu-serial",
     description="Nordic Semiconductor / theporttechnology.com nrfutil-dfu-serial utility",
     long_description=description,
-    packages=find_packages(exclude=["tests.*", "tests"]),
+    packages=find_packages(exclude=["tests.*", "tests", "benchmarks.*", "benchmarks"]),
     package_data = {
         '': ['../requirements.txt',]
     },
@@ -0,0 +1,124 @@
+#
+# Copyright (c) 2019 Nordic Semiconductor ASA
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#   1. Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+#   2. Redistributions in binary form must reproduce the above copyright notice, this
+#   list of conditions and the following disclaimer in the documentation and/or
+#   other materials provided with the distribution.
+#
+#   3. Neither the name of Nordic Semiconductor ASA nor the names of other
+#   contributors to this software may be used to endorse or promote products
+#   derived from this software without specific prior written permission.
+#
+#   4. This software must only be used in or with a processor manufactured by Nordic
+#   Semiconductor ASA, or in or with a processor manufactured by a third party that
+#   is used in combination with a processor manufactured by Nordic Semiconductor.
+#
+#   5. Any software provided in binary or object form under this license must not be
+#   reverse engineered, decompiled, modified and/or disassembled.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON
+# ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+"""
+Tests of PortOpener on device nodes whose permissions are set after they appear, as udev does.
+
+The serial port is faked: opening it fails with EACCES while its node is only accessible to its
+owner, as it does for users other than root, so the tests also run as root.
+"""
+
+# Python standard library
+import os
+import time
+import errno
+import asyncio
+import threading
+
+# 3rd party libraries
+import pytest
+from serial.serialutil import SerialException
+
+# Nordic libraries
+import nordicsemi.dfu.dfu_transport_serial as dfu_transport_serial
+from nordicsemi.dfu.dfu_transport_serial import PortOpener
+
+
+class FakeSerial:
+    """ Opens a plain file standing for a tty, failing like pyserial does. """
+
+    def __init__(self, port, **settings):
+        if not os.path.exists(port):
+            raise SerialException(errno.ENOENT, "could not open port {}".format(port))
+        if not os.stat(port).st_mode & 0o066:
+            raise SerialException(errno.EACCES, "could not open port {}".format(port))
+        self.port = port
+
+
+@pytest.fixture
+def node(tmp_path, monkeypatch):
+    """ Returns the path of a new node, accessible to its owner only. """
+    monkeypatch.setattr(dfu_transport_serial, 'Serial', FakeSerial)
+    path = tmp_path / 'ttyACM0'
+    path.touch(mode=0o600)
+    os.chmod(path, 0o600)
+    return str(path)
+
+
+def set_permissions_later(path, delay=0.1):
+    """ Makes the node accessible to the dialout group after delay seconds, as udev would. """
+    timer = threading.Timer(delay, os.chmod, (path, 0o660))
+    timer.start()
+    return timer
+
+
+def test_open_waits_for_permissions(node):
+    timer = set_permissions_later(node)
+    start = time.monotonic()
+    port  = PortOpener(node).open(timeout=5)
+    timer.join()
+
+    assert port.port == node
+    assert time.monotonic() - start < PortOpener.PERMISSION_GRACE
+
+
+def test_open_async_waits_for_permissions(node):
+    timer = set_permissions_later(node)
+    port  = asyncio.run(PortOpener(node).open_async(timeout=5))
+    timer.join()
+
+    assert port.port == node
+
+
+def test_open_fails_once_permissions_are_not_granted(node, monkeypatch):
+    monkeypatch.setattr(PortOpener, 'PERMISSION_GRACE', 0.2)
+    start = time.monotonic()
+    with pytest.raises(Exception, match='could not be opened'):
+        PortOpener(node).open(timeout=5)
+
+    assert time.monotonic() - start < 1.0
+
+
+def test_open_fails_at_once_on_other_errors(node, monkeypatch):
+    def broken(port, **settings):
+        raise SerialException(errno.EIO, "could not open port {}".format(port))
+    monkeypatch.setattr(dfu_transport_serial, 'Serial', broken)
+    start = time.monotonic()
+    with pytest.raises(Exception, match='could not be opened'):
+        PortOpener(node).open(timeout=5)
+
+    assert time.monotonic() - start < 0.1